@@ -13,7 +13,7 @@ echo.
 echo Running migration...
 echo.
 
-mysql -u root -p purchase_slips_db < migration_schema_update.sql
+python backend\manage.py migrate
 
 echo.
 echo ================================================================
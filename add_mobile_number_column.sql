@@ -1,3 +1,6 @@
+-- SUPERSEDED: folded into backend/migrations/versions.py (migration 002).
+-- Prefer: python backend/manage.py migrate
+
 -- Migration: Add new columns to purchase_slips table
 -- Run this SQL file against your MySQL database before using the updated application
 
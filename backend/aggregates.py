@@ -0,0 +1,309 @@
+"""
+Incrementally maintained aggregate tables
+
+party_ledger holds one row per party with the running slip count, weight,
+payable, paid and balance. slip_rollups holds day and month totals per
+(period, dimension, value) for the intake reports. The slip write routes
+call apply_slip_aggregates() with the old and new version of a row inside
+their own transaction, so both tables move by the difference only and
+reading them never touches purchase_slips. The rebuild_* functions
+recompute everything from purchase_slips for repair / backfill.
+
+A row whose slip_count drops to 0 (the party's or period's last slip was
+deleted or moved) is deleted, so the ledger and reports only list parties
+and periods that have slips. updated_at is IST wall-clock time, bound from
+Python: CURRENT_TIMESTAMP would be UTC on SQLite.
+"""
+
+from datetime import date, datetime
+
+from database import is_sqlite
+from slip_schema import ist_now
+
+LEDGER_FIELDS = ('slip_count', 'total_weight_kg', 'total_payable', 'total_paid', 'balance')
+
+# Measure column -> purchase_slips source column
+ROLLUP_MEASURES = {
+    'slip_count': None,
+    'bags': 'bags',
+    'final_weight_kg': 'final_weight_kg',
+    'weight_quintal': 'weight_quintal',
+    'total_purchase_amount': 'total_purchase_amount',
+    'total_deduction': 'total_deduction',
+    'payable_amount': 'payable_amount',
+}
+
+# Report dimension -> purchase_slips column ('all' is the grand total)
+ROLLUP_DIMENSIONS = {
+    'all': None,
+    'material': 'material_name',
+    'party': 'party_name',
+    'broker': 'broker',
+    'godown': 'paddy_unloading_godown',
+}
+
+ROLLUP_GRAINS = ('day', 'month')
+
+# Columns a write route must read before deleting a slip
+AGGREGATE_SOURCE_COLUMNS = (
+    'date', 'party_name', 'material_name', 'broker', 'paddy_unloading_godown',
+    'bags', 'final_weight_kg', 'weight_quintal', 'total_purchase_amount',
+    'total_deduction', 'payable_amount', 'total_paid_amount',
+)
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _text(value):
+    return (value or '').strip()
+
+
+def business_date(value):
+    """Calendar date of a slip's date column (datetime, date or ISO string)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _apply_deltas(cursor, table, key_columns, deltas, precision):
+    """
+    Add each {key tuple: {column: delta}} to its row, creating missing rows.
+    Two executemany() calls however many rows a batch touches: INSERT IGNORE
+    the keys (a no-op for existing rows), then UPDATE every key by its delta.
+    Keys that lost slips are deleted once their slip_count reaches 0.
+    """
+    changed = [(key, totals) for key, totals in deltas.items()
+               if any(round(value, 3) for value in totals.values())]
+    if not changed:
+        return
+
+    columns = list(changed[0][1])
+    assignments = ', '.join(
+        f'{column} = {column} + %s' if column == 'slip_count'
+        else f'{column} = ROUND({column} + %s, {precision.get(column, 2)})'
+        for column in columns
+    )
+    condition = ' AND '.join(f'{column} = %s' for column in key_columns)
+    insert_ignore = 'INSERT OR IGNORE' if is_sqlite() else 'INSERT IGNORE'
+    placeholders = ', '.join(['%s'] * len(key_columns))
+
+    now = ist_now()
+
+    cursor.executemany(
+        f'{insert_ignore} INTO {table} ({", ".join(key_columns)}, updated_at) '
+        f'VALUES ({placeholders}, %s)',
+        [(*key, now) for key, _ in changed]
+    )
+    cursor.executemany(
+        f'UPDATE {table} SET {assignments}, updated_at = %s WHERE {condition}',
+        [[totals[column] for column in columns] + [now] + list(key) for key, totals in changed]
+    )
+
+    emptied = [key for key, totals in changed if totals.get('slip_count', 0) < 0]
+    if emptied:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE {condition} AND slip_count <= 0',
+            emptied
+        )
+
+
+def _collect(signed_slips, contributions):
+    """Sum of sign * contribution per key over [(slip, +1 / -1)]"""
+    deltas = {}
+    for slip, sign in signed_slips:
+        if slip is None:
+            continue
+        for key, values in contributions(slip):
+            totals = deltas.setdefault(key, dict.fromkeys(values, 0))
+            for column, value in values.items():
+                totals[column] += sign * value
+    return deltas
+
+
+# PARTY LEDGER
+
+def ledger_contribution(slip):
+    """(party_name, {field: value}) that one slip adds to the ledger"""
+    payable = _number(slip.get('payable_amount'))
+    paid = _number(slip.get('total_paid_amount'))
+    return _text(slip.get('party_name')), {
+        'slip_count': 1,
+        'total_weight_kg': _number(slip.get('final_weight_kg')),
+        'total_payable': payable,
+        'total_paid': paid,
+        'balance': payable - paid,
+    }
+
+
+def apply_party_ledger_delta(cursor, signed_slips):
+    """
+    Apply [(slip, +1 / -1)] to the ledger: +1 adds a slip's contribution,
+    -1 removes it. Call inside the transaction that wrote the slips.
+    """
+    def contributions(slip):
+        party, values = ledger_contribution(slip)
+        return [((party,), values)]
+
+    _apply_deltas(cursor, 'party_ledger', ('party_name',),
+                  _collect(signed_slips, contributions),
+                  {'total_weight_kg': 3})
+
+
+def get_party_ledger(cursor, party_name):
+    """Ledger row for one party (primary-key lookup), or None"""
+    cursor.execute(f'''
+        SELECT party_name, {', '.join(LEDGER_FIELDS)}, updated_at
+        FROM party_ledger
+        WHERE party_name = %s AND slip_count > 0
+    ''', (party_name.strip(),))
+    return cursor.fetchone()
+
+
+def rebuild_party_ledger(cursor):
+    """Recompute party_ledger from purchase_slips (repair tool); returns the party count"""
+    cursor.execute('DELETE FROM party_ledger')
+    cursor.execute('''
+        INSERT INTO party_ledger (
+            party_name, slip_count, total_weight_kg, total_payable,
+            total_paid, balance, updated_at
+        )
+        SELECT TRIM(COALESCE(party_name, '')), COUNT(*),
+               ROUND(SUM(COALESCE(final_weight_kg, 0)), 3),
+               ROUND(SUM(COALESCE(payable_amount, 0)), 2),
+               ROUND(SUM(COALESCE(total_paid_amount, 0)), 2),
+               ROUND(SUM(COALESCE(payable_amount, 0) - COALESCE(total_paid_amount, 0)), 2),
+               %s
+        FROM purchase_slips
+        GROUP BY TRIM(COALESCE(party_name, ''))
+    ''', (ist_now(),))
+    return cursor.rowcount
+
+
+# DAILY / MONTHLY ROLLUPS
+
+def period_start(day, grain):
+    """First day of the day / month period containing `day`"""
+    return day if grain == 'day' else day.replace(day=1)
+
+
+def rollup_contributions(slip):
+    """[((grain, period_start, dimension, value), {measure: value})] for one slip"""
+    day = business_date(slip.get('date'))
+    if day is None:
+        return []
+
+    measures = {
+        measure: 1 if column is None else _number(slip.get(column))
+        for measure, column in ROLLUP_MEASURES.items()
+    }
+    keys = []
+    for grain in ROLLUP_GRAINS:
+        start = period_start(day, grain)
+        for dimension, column in ROLLUP_DIMENSIONS.items():
+            value = '' if column is None else _text(slip.get(column))
+            keys.append(((grain, start, dimension, value), measures))
+    return keys
+
+
+def apply_rollup_delta(cursor, signed_slips):
+    """Apply [(slip, +1 / -1)] to the rollup rows"""
+    _apply_deltas(cursor, 'slip_rollups',
+                  ('grain', 'period_start', 'dimension', 'dimension_value'),
+                  _collect(signed_slips, rollup_contributions),
+                  {'bags': 3, 'final_weight_kg': 3, 'weight_quintal': 3})
+
+
+def apply_slip_aggregates_batch(cursor, signed_slips):
+    """Apply [(slip, +1 / -1)] to every maintained aggregate in one pass"""
+    apply_party_ledger_delta(cursor, signed_slips)
+    apply_rollup_delta(cursor, signed_slips)
+
+
+def apply_slip_aggregates(cursor, old_slip=None, new_slip=None):
+    """
+    Update every maintained aggregate for one slip write: old_slip is the
+    row before the write (None for insert), new_slip after it (None for delete).
+    """
+    apply_slip_aggregates_batch(cursor, [(old_slip, -1), (new_slip, 1)])
+
+
+def apply_inserted_slips_aggregates(cursor, slips):
+    """Add a batch of newly inserted slips with one upsert per touched row"""
+    apply_slip_aggregates_batch(cursor, [(slip, 1) for slip in slips])
+
+
+def rebuild_rollups(cursor):
+    """Recompute slip_rollups from purchase_slips (backfill / repair); returns the row count"""
+    if is_sqlite():
+        period_sql = {'day': "DATE(date)", 'month': "strftime('%Y-%m-01', date)"}
+    else:
+        period_sql = {'day': "DATE(date)", 'month': "DATE_FORMAT(date, '%Y-%m-01')"}
+
+    measures = ', '.join(
+        'COUNT(*)' if column is None else f'ROUND(SUM(COALESCE({column}, 0)), 3)'
+        for column in ROLLUP_MEASURES.values()
+    )
+
+    cursor.execute('DELETE FROM slip_rollups')
+    total = 0
+    for grain in ROLLUP_GRAINS:
+        for dimension, column in ROLLUP_DIMENSIONS.items():
+            value_sql = "''" if column is None else f"TRIM(COALESCE({column}, ''))"
+            cursor.execute(f'''
+                INSERT INTO slip_rollups (
+                    grain, period_start, dimension, dimension_value,
+                    {', '.join(ROLLUP_MEASURES)}, updated_at
+                )
+                SELECT '{grain}', {period_sql[grain]}, '{dimension}', {value_sql},
+                       {measures}, NULL
+                FROM purchase_slips
+                WHERE date IS NOT NULL
+                GROUP BY {period_sql[grain]}, {value_sql}
+            ''')
+            total += cursor.rowcount
+    # Set afterwards: the month format's % signs can't share a statement with parameters
+    cursor.execute('UPDATE slip_rollups SET updated_at = %s', (ist_now(),))
+    return total
+
+
+def fetch_rollups(cursor, grain='day', dimension='all', date_from=None, date_to=None, value=None):
+    """
+    Rollup rows for one grain / dimension, oldest period first.
+    date_from / date_to are dates matched against the period start.
+    """
+    if grain not in ROLLUP_GRAINS:
+        raise ValueError(f"grain must be one of: {', '.join(ROLLUP_GRAINS)}")
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"dimension must be one of: {', '.join(ROLLUP_DIMENSIONS)}")
+
+    conditions = ['grain = %s', 'dimension = %s']
+    params = [grain, dimension]
+    if date_from is not None:
+        conditions.append('period_start >= %s')
+        params.append(period_start(date_from, grain))
+    if date_to is not None:
+        conditions.append('period_start <= %s')
+        params.append(date_to)
+    if value is not None:
+        conditions.append('dimension_value = %s')
+        params.append(value.strip())
+
+    cursor.execute(f'''
+        SELECT period_start, dimension_value, {', '.join(ROLLUP_MEASURES)}
+        FROM slip_rollups
+        WHERE {' AND '.join(conditions)} AND slip_count <> 0
+        ORDER BY period_start, dimension_value
+    ''', params)
+    return cursor.fetchall()
@@ -1,24 +1,57 @@
-from flask import Flask, send_from_directory, jsonify
-from flask_cors import CORS
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import init_db, get_next_bill_no
-from routes.slips import slips_bp
-from routes.auth import auth_bp
+# First import: its import time is "launch" for the startup profile
+from startup import startup
 
-app = Flask(__name__,
-            static_folder='../frontend/static',
-            template_folder='templates')
+with startup.phase('imports: flask'):
+    from flask import Flask, send_from_directory, jsonify, request
+    from flask_cors import CORS
 
-CORS(app)
+with startup.phase('imports: app modules'):
+    from database import init_db_engine, init_db, get_next_bill_no, bill_series_for
+    from routes.metrics import metrics_bp
+    from routes.health import health_bp
+    from routes.slips import slips_bp
+    from routes.auth import auth_bp
+    from routes.reports import reports_bp
 
-app.register_blueprint(slips_bp)
-app.register_blueprint(auth_bp)
+with startup.phase('blueprints'):
+    app = Flask(__name__,
+                static_folder='../frontend/static',
+                template_folder='templates')
 
-init_db()
+    CORS(app)
+
+    # First, so its request timer also covers requests the health gate answers
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(slips_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(reports_bp)
+
+
+def initialize():
+    """Database work that doesn't need to block binding the server"""
+    with startup.phase('pool'):
+        init_db_engine()
+    with startup.phase('schema'):
+        init_db()
+
+
+def warm_up():
+    """Load the IST zone data now rather than on the first slip request"""
+    from slip_schema import ist_timezone
+    ist_timezone()
+
+
+# Runs while the server starts; /api requests wait for it (routes/health.py).
+# Imported by a WSGI server or a test client: start now. Run as a script:
+# started below, once we know whether this is the reloader's parent process
+if __name__ != '__main__':
+    startup.run_in_background(initialize, warm_up)
 
 @app.route('/')
 def index():
@@ -32,14 +65,40 @@ def reports():
 
 @app.route('/api/next-bill-no')
 def next_bill_no_route():
-    """Get next bill number"""
-    return jsonify({'bill_no': get_next_bill_no()})
+    """Peek at the next bill number (reserved only when the slip is saved)"""
+    from routes.slips import parse_datetime_to_ist
+
+    series = bill_series_for(parse_datetime_to_ist(request.args.get('date')))
+    return jsonify({'bill_no': get_next_bill_no(series), 'series': series})
 
 if __name__ == '__main__':
+    from server import parse_server_args, run_server
+
+    options = parse_server_args()
+    url = f"http://{options.host}:{options.port}"
+
     print("\n" + "="*60)
     print("🌾 RICE MILL PURCHASE SLIP MANAGER")
     print("="*60)
     print("\n✅ Server starting...")
-    print("📍 Open your browser and go to: http://127.0.0.1:5000")
+    print(f"📍 Open your browser and go to: {url}")
     print("\n💡 Press CTRL+C to stop the server\n")
-    app.run(debug=True, host='127.0.0.1', port=5000)
+
+    def on_ready():
+        if options.profile_startup:
+            startup.print_profile()
+        startup.print_ready_line(url)
+
+    startup.on_ready(on_ready)
+
+    if options.debug:
+        # Development only: reloader + interactive debugger, single process.
+        # The reloader re-runs this script in a child (WERKZEUG_RUN_MAIN=true)
+        # that serves the requests; the watching parent must not migrate too
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            startup.run_in_background(initialize, warm_up)
+        startup.mark_listening()
+        app.run(debug=True, host=options.host, port=options.port)
+    else:
+        startup.run_in_background(initialize, warm_up)
+        sys.exit(run_server(app, options, on_listening=startup.mark_listening))
@@ -0,0 +1,143 @@
+"""
+Micro-benchmark: Slip records vs the dict pipeline on the slip write path
+
+Runs the in-process part of POST /api/add-slip and PUT /api/slip/<id> (no
+database) both ways and checks they produce the same SQL parameters:
+
+  dict  calculate_fields() on a copied / merged dict, slip_row() for the
+        parameters, another dict for the aggregates (the pre-Slip routes)
+  slip  Slip.from_payload() / from_row() + update(), calculate(),
+        insert_values() / update_values(); the Slip itself feeds the aggregates
+
+Usage:
+    python backend/bench_slip_record.py [--number 20000]
+
+Reports the best time per request, the peak memory allocated during one
+request (tracemalloc) and the size of the record object itself.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from slip_schema import (
+    SLIP_COLUMNS, SLIP_SELECT_COLUMNS, SLIP_UPDATE_COLUMNS, safe_float, slip_row, parse_datetime_to_ist,
+)
+from slip_record import Slip
+from slip_calc import calculate_fields, slip_insert_params
+
+NOW = datetime(2025, 4, 1, 10, 30)
+
+# Form submission as the frontend sends it: numbers arrive as strings
+PAYLOAD = {
+    'company_name': 'Shri Balaji Rice Mill', 'company_address': 'Main Road, Raipur',
+    'document_type': 'Purchase Slip', 'vehicle_no': 'CG04AB1234', 'date': '2025-04-01T10:30',
+    'party_name': 'Ram Traders', 'mobile_number': '9876543210', 'material_name': 'Paddy',
+    'ticket_no': 'T-118', 'broker': 'Mohan', 'terms_of_delivery': 'Ex-godown',
+    'sup_inv_no': 'INV-77', 'gst_no': '22AAAAA0000A1Z5', 'bags': '100',
+    'net_weight_kg': '5000', 'gunny_weight_kg': '100', 'rate_basis': 'Quintal', 'rate_value': '2200',
+    'bank_commission': '50', 'postage': '20', 'batav_percent': '1', 'shortage_percent': '0.5',
+    'dalali_rate': '10', 'hammali_rate': '5', 'freight': '300', 'rate_diff': '0', 'quality_diff': '0',
+    'quality_diff_comment': '', 'moisture_ded': '0', 'moisture_ded_comment': '', 'tds': '0',
+    'prepared_by': 'Clerk', 'authorised_sign': 'Manager', 'paddy_unloading_godown': 'Godown 2',
+    **{f'instalment_{i}_{field}': '' for i in range(1, 6)
+       for field in ('date', 'amount', 'comment', 'payment_method', 'payment_bank_account')},
+}
+
+# The stored row a PUT starts from, typed as the driver returns it
+ROW = {name: col.default for name, col in zip(SLIP_SELECT_COLUMNS[1:], SLIP_COLUMNS)}
+ROW.update(calculate_fields(slip_row(PAYLOAD)), id=42, bill_no=7, bill_series='2025-26',
+           date=datetime(2025, 4, 1, 10, 30), total_paid_amount=0.0, balance_amount=0.0,
+           row_version=3, updated_at=NOW)
+
+EDIT = dict(PAYLOAD, rate_value='2250', party_name='Ram Traders & Sons')
+
+
+def add_dict():
+    data = calculate_fields(dict(PAYLOAD))
+    slip_date = parse_datetime_to_ist(data.get('date'))
+    params = slip_insert_params(data, slip_date, '2025-26', 8, 0.0, data['payable_amount'])
+    return params, dict(data, date=slip_date, total_paid_amount=0.0)
+
+
+def add_slip():
+    slip = Slip.from_payload(PAYLOAD).calculate()
+    slip.bill_series, slip.bill_no, slip.updated_at = '2025-26', 8, NOW
+    slip.total_paid_amount, slip.balance_amount = 0.0, slip.payable_amount
+    return slip.insert_values(), slip
+
+
+def put_dict():
+    merged_data = dict(ROW)
+    merged_data.update(EDIT)
+    merged_data = calculate_fields(merged_data)
+    total_paid = safe_float(ROW.get('total_paid_amount', 0), 0)
+    balance_amount = round(safe_float(merged_data.get('payable_amount', 0), 0) - total_paid, 2)
+    row = slip_row(merged_data)
+    row.update(total_paid_amount=total_paid, balance_amount=balance_amount)
+    params = (*(row[name] for name in SLIP_UPDATE_COLUMNS), NOW, 42)
+    return params, dict(merged_data, date=parse_datetime_to_ist(merged_data.get('date')),
+                        total_paid_amount=total_paid)
+
+
+def put_slip():
+    slip = Slip.from_row(ROW)
+    slip.update(EDIT)
+    slip.calculate()
+    slip.total_paid_amount = safe_float(ROW.get('total_paid_amount', 0), 0)
+    slip.balance_amount = round(slip.payable_amount - slip.total_paid_amount, 2)
+    return (*slip.update_values(), NOW, 42), slip
+
+
+def _naive(values):
+    return tuple(value.replace(tzinfo=None) if isinstance(value, datetime) else value for value in values)
+
+
+def check_same_parameters():
+    assert _naive(add_dict()[0][:-1]) == _naive(add_slip()[0][:-1]), 'INSERT parameters differ'
+    assert _naive(put_dict()[0]) == _naive(put_slip()[0]), 'UPDATE parameters differ'
+
+
+def best_microseconds(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def peak_bytes(func):
+    """Peak memory allocated while func runs (median of a few runs)"""
+    func()
+    peaks = []
+    tracemalloc.start()
+    for _ in range(7):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+    return sorted(peaks)[len(peaks) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Slip records against dict rows')
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing run')
+    args = parser.parse_args(argv)
+
+    check_same_parameters()
+
+    print(f"{'':12}{'µs/request':>12}{'peak bytes':>12}")
+    for label, func in (('add  dict', add_dict), ('add  Slip', add_slip),
+                        ('put  dict', put_dict), ('put  Slip', put_slip)):
+        print(f"{label:12}{best_microseconds(func, args.number):12.1f}{peak_bytes(func):12,d}")
+
+    print()
+    print(f"record size: dict row {sys.getsizeof(dict(ROW)):,d} bytes, "
+          f"Slip {sys.getsizeof(Slip.from_row(ROW)):,d} bytes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
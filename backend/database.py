@@ -1,6 +1,32 @@
-import mysql.connector
-from mysql.connector.pooling import MySQLConnectionPool
 import os
+import sqlite3
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Storage engine: 'mysql' (default) or 'sqlite' for single-weighbridge installs
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql').strip().lower()
+SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', os.path.join(PROJECT_ROOT, 'purchase_slips_db.sqlite3'))
+
+# Bill numbering: 'global' (one running series) or 'financial_year'
+# (restart at 1 every April, e.g. series FY2025-26)
+BILL_NO_SERIES = os.getenv('BILL_NO_SERIES', 'global').strip().lower()
+DEFAULT_BILL_SERIES = 'default'
+
+from db_breaker import CircuitBreaker, DatabaseUnavailable
+from metrics import timed
+
+if DB_ENGINE == 'sqlite':
+    # mysql-connector is only imported when MySQL is the engine (faster startup)
+    DB_ERRORS = (sqlite3.Error,)
+else:
+    # Imported with this module, not on first use: the routes catch
+    # DB_ERRORS, which needs the driver's exception classes up front
+    import mysql.connector
+    from mysql_pool import MySQLPool, PoolTimeout, PoolExhausted
+
+    # Exceptions raised by either engine's driver (or instead of it by the breaker)
+    DB_ERRORS = (mysql.connector.Error, sqlite3.Error, DatabaseUnavailable)
 
 # MySQL Configuration
 DB_CONFIG = {
@@ -8,35 +34,72 @@ DB_CONFIG = {
     'port': 1396,
     'user': 'root',
     'password': 'root',
-    'database': 'purchase_slips_db'
+    'database': 'purchase_slips_db',
+    # Seconds to wait for the server when opening a connection
+    'connection_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5))
 }
 
+# MySQL connection pool (mysql_pool.py); sizes and timeouts in seconds
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_WAIT = float(os.getenv('DB_POOL_WAIT', 10))
+DB_POOL_MAX_WAITERS = int(os.getenv('DB_POOL_MAX_WAITERS', 32))
+DB_POOL_VALIDATE_IDLE = float(os.getenv('DB_POOL_VALIDATE_IDLE', 30))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+# Statements run once on every new MySQL connection, separated by ';'
+# (e.g. "SET SESSION innodb_lock_wait_timeout = 10")
+DB_SESSION_SQL = tuple(stmt.strip() for stmt in os.getenv('DB_SESSION_SQL', '').split(';') if stmt.strip())
+
+# Circuit breaker (db_breaker.py): after DB_BREAKER_FAILURES connection
+# failures in a row, fail fast for DB_BREAKER_COOLDOWN seconds between probes
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', 3))
+DB_BREAKER_COOLDOWN = float(os.getenv('DB_BREAKER_COOLDOWN', 10))
+
 # Global connection pool
 connection_pool = None
 
+# Global SQLite engine (per-thread connection cache)
+sqlite_engine = None
+
+def is_sqlite():
+    """True when the embedded SQLite engine is selected"""
+    return DB_ENGINE == 'sqlite'
+
+def init_sqlite_engine():
+    """
+    Initialize the embedded SQLite engine (WAL mode, per-thread connections)
+    """
+    global sqlite_engine
+    from sqlite_engine import SQLiteEngine
+
+    sqlite_engine = SQLiteEngine(SQLITE_DB_PATH)
+    print(f"✓ SQLite engine ready: {SQLITE_DB_PATH}")
+
+def _new_connection_pool():
+    return MySQLPool(
+        lambda: mysql.connector.connect(**DB_CONFIG),
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX,
+        wait_timeout=DB_POOL_WAIT,
+        max_waiters=DB_POOL_MAX_WAITERS,
+        validate_after=DB_POOL_VALIDATE_IDLE,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        session_sql=DB_SESSION_SQL
+    )
+
 def init_connection_pool():
     """
-    Initialize MySQL connection pool using mysql.connector
+    Initialize the MySQL connection pool (mysql_pool.MySQLPool)
     """
     global connection_pool
     try:
-        connection_pool = MySQLConnectionPool(
-            pool_name="purchase_pool",
-            pool_size=10,
-            pool_reset_session=True,
-            **DB_CONFIG
-        )
-        print("✓ MySQL connection pool created successfully (size: 10)")
+        connection_pool = _new_connection_pool()
+        print(f"✓ MySQL connection pool created successfully (size: {DB_POOL_MIN}-{DB_POOL_MAX})")
     except mysql.connector.Error as err:
         if err.errno == 1049:
             print("Database doesn't exist. Creating database...")
             create_database()
-            connection_pool = MySQLConnectionPool(
-                pool_name="purchase_pool",
-                pool_size=10,
-                pool_reset_session=True,
-                **DB_CONFIG
-            )
+            connection_pool = _new_connection_pool()
         else:
             print(f"❌ Error creating connection pool: {err}")
             raise
@@ -68,272 +131,228 @@ def get_db_connection():
     ALWAYS returns a connection with dictionary cursor support
     """
     global connection_pool
-    if connection_pool is None:
-        init_connection_pool()
+    if is_sqlite():
+        if sqlite_engine is None:
+            init_sqlite_engine()
+        return sqlite_engine.get_connection()
 
+    database_breaker.before_call()
     try:
-        conn = connection_pool.get_connection()
-        conn.ping(reconnect=True, attempts=3, delay=2)
-        return conn
+        if connection_pool is None:
+            init_connection_pool()
+        # Idle connections are validated by the pool, not pinged here
+        with timed('db'):
+            conn = connection_pool.get_connection()
+    except (PoolTimeout, PoolExhausted) as e:
+        # Busy, not down: doesn't count towards the breaker
+        print(f"⚠️ {e}")
+        raise
     except mysql.connector.Error as e:
         print(f"❌ Error getting connection from pool: {e}")
+        database_breaker.record_failure(e)
         raise
+    database_breaker.record_success()
+    return conn
+
+def probe_database():
+    """Breaker recovery probe: open one fresh connection and ping it"""
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        conn.ping()
+    finally:
+        conn.close()
+    # Pooled connections from before the outage are most likely dead
+    if connection_pool is not None:
+        connection_pool.close_idle()
+
+database_breaker = CircuitBreaker(
+    probe_database, failure_threshold=DB_BREAKER_FAILURES, cooldown=DB_BREAKER_COOLDOWN
+)
+
+def database_status():
+    """Breaker state for /api/health/ready (None for SQLite, which has no server)"""
+    if is_sqlite():
+        return None
+    return database_breaker.status()
+
+def close_db_connections():
+    """Close the pooled connections (server shutdown, or before forking workers)"""
+    global connection_pool, sqlite_engine
+    if sqlite_engine is not None:
+        sqlite_engine.close_all()
+        sqlite_engine = None
+    if connection_pool is not None:
+        # Idle connections; ones still checked out close when released
+        connection_pool.close_all()
+        connection_pool = None
+    # Workers forked after this start with a closed breaker (no probe thread)
+    database_breaker.reset()
+
+def pool_stats():
+    """Connection pool size and checkout-wait counters (None before the pool exists)"""
+    if is_sqlite():
+        return sqlite_engine.stats() if sqlite_engine is not None else None
+    return connection_pool.stats() if connection_pool is not None else None
+
+def init_db_engine():
+    """Open the SQLite engine / MySQL connection pool (once)"""
+    if is_sqlite():
+        if sqlite_engine is None:
+            init_sqlite_engine()
+    elif connection_pool is None:
+        init_connection_pool()
+        print(f"✓ Initializing database: {DB_CONFIG['database']}")
 
 def init_db():
     """
-    Initialize the database and create tables if they don't exist
+    Initialize the database and bring the schema up to date.
+    When the schema is current this is a single schema_migrations lookup.
     """
+    from migrations import run_migrations
+
     conn = None
-    cursor = None
     try:
-        init_connection_pool()
+        init_db_engine()
 
-        print(f"✓ Initializing database: {DB_CONFIG['database']}")
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Create purchase_slips table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS purchase_slips (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                company_name TEXT,
-                company_address TEXT,
-                document_type VARCHAR(255) DEFAULT 'Purchase Slip',
-                vehicle_no VARCHAR(255),
-                date DATETIME NOT NULL,
-                bill_no INT NOT NULL,
-                party_name TEXT,
-                material_name TEXT,
-                ticket_no VARCHAR(255),
-                broker VARCHAR(255),
-                terms_of_delivery TEXT,
-                sup_inv_no VARCHAR(255),
-                gst_no VARCHAR(255),
-                bags DOUBLE DEFAULT 0,
-                avg_bag_weight DOUBLE DEFAULT 0,
-                net_weight DOUBLE DEFAULT 0,
-                net_weight_kg DOUBLE DEFAULT 0,
-                gunny_weight_kg DOUBLE DEFAULT 0,
-                final_weight_kg DOUBLE DEFAULT 0,
-                weight_quintal DOUBLE DEFAULT 0,
-                weight_khandi DOUBLE DEFAULT 0,
-                shortage_kg DOUBLE DEFAULT 0,
-                rate DOUBLE DEFAULT 0,
-                rate_basis VARCHAR(50) DEFAULT 'Quintal',
-                rate_value DOUBLE DEFAULT 0,
-                calculated_rate DOUBLE DEFAULT 0,
-                total_purchase_amount DOUBLE DEFAULT 0,
-                amount DOUBLE DEFAULT 0,
-                bank_commission DOUBLE DEFAULT 0,
-                postage DOUBLE DEFAULT 0,
-                batav_percent DOUBLE DEFAULT 0,
-                batav DOUBLE DEFAULT 0,
-                shortage_percent DOUBLE DEFAULT 0,
-                shortage DOUBLE DEFAULT 0,
-                dalali_rate DOUBLE DEFAULT 0,
-                dalali DOUBLE DEFAULT 0,
-                hammali_rate DOUBLE DEFAULT 0,
-                hammali DOUBLE DEFAULT 0,
-                freight DOUBLE DEFAULT 0,
-                rate_diff DOUBLE DEFAULT 0,
-                quality_diff DOUBLE DEFAULT 0,
-                quality_diff_comment TEXT,
-                moisture_ded DOUBLE DEFAULT 0,
-                moisture_ded_percent DOUBLE DEFAULT 0,
-                tds DOUBLE DEFAULT 0,
-                total_deduction DOUBLE DEFAULT 0,
-                payable_amount DOUBLE DEFAULT 0,
-                payment_method VARCHAR(255),
-                payment_date DATETIME,
-                payment_amount DOUBLE DEFAULT 0,
-                payment_bank_account TEXT,
-                payment_due_date DATETIME,
-                payment_due_comment TEXT,
-                instalment_1_date DATETIME,
-                instalment_1_amount DOUBLE DEFAULT 0,
-                instalment_1_comment TEXT,
-                instalment_1_payment_method VARCHAR(255),
-                instalment_1_payment_bank_account TEXT,
-                instalment_2_date DATETIME,
-                instalment_2_amount DOUBLE DEFAULT 0,
-                instalment_2_comment TEXT,
-                instalment_2_payment_method VARCHAR(255),
-                instalment_2_payment_bank_account TEXT,
-                instalment_3_date DATETIME,
-                instalment_3_amount DOUBLE DEFAULT 0,
-                instalment_3_comment TEXT,
-                instalment_3_payment_method VARCHAR(255),
-                instalment_3_payment_bank_account TEXT,
-                instalment_4_date DATETIME,
-                instalment_4_amount DOUBLE DEFAULT 0,
-                instalment_4_comment TEXT,
-                instalment_4_payment_method VARCHAR(255),
-                instalment_4_payment_bank_account TEXT,
-                instalment_5_date DATETIME,
-                instalment_5_amount DOUBLE DEFAULT 0,
-                instalment_5_comment TEXT,
-                instalment_5_payment_method VARCHAR(255),
-                instalment_5_payment_bank_account TEXT,
-                prepared_by VARCHAR(255),
-                authorised_sign VARCHAR(255),
-                paddy_unloading_godown TEXT,
-                INDEX idx_date (date),
-                INDEX idx_party_name (party_name(255)),
-                INDEX idx_bill_no (bill_no)
-            )
-        ''')
-
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                full_name VARCHAR(255),
-                role VARCHAR(50) DEFAULT 'user',
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP NULL
-            )
-        ''')
-
-        # Create unloading_godowns table for dynamic dropdown
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS unloading_godowns (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Check and add missing columns to purchase_slips
-        cursor.execute("SHOW COLUMNS FROM purchase_slips")
-        existing_columns = {row['Field'] for row in cursor.fetchall()}
-
-        columns_to_add = {
-            'shortage_kg': "DOUBLE DEFAULT 0",
-            'rate_basis': "VARCHAR(50) DEFAULT 'Quintal'",
-            'calculated_rate': "DOUBLE DEFAULT 0",
-            'postage': "DOUBLE DEFAULT 0",
-            'payment_due_comment': "TEXT",
-            'payment_bank_account': "TEXT",
-            'instalment_1_amount': "DOUBLE DEFAULT 0",
-            'instalment_1_comment': "TEXT",
-            'instalment_1_payment_method': "VARCHAR(255)",
-            'instalment_1_payment_bank_account': "TEXT",
-            'instalment_2_amount': "DOUBLE DEFAULT 0",
-            'instalment_2_comment': "TEXT",
-            'instalment_2_payment_method': "VARCHAR(255)",
-            'instalment_2_payment_bank_account': "TEXT",
-            'instalment_3_amount': "DOUBLE DEFAULT 0",
-            'instalment_3_comment': "TEXT",
-            'instalment_3_payment_method': "VARCHAR(255)",
-            'instalment_3_payment_bank_account': "TEXT",
-            'instalment_4_amount': "DOUBLE DEFAULT 0",
-            'instalment_4_comment': "TEXT",
-            'instalment_4_payment_method': "VARCHAR(255)",
-            'instalment_4_payment_bank_account': "TEXT",
-            'instalment_5_amount': "DOUBLE DEFAULT 0",
-            'instalment_5_comment': "TEXT",
-            'instalment_5_payment_method': "VARCHAR(255)",
-            'instalment_5_payment_bank_account': "TEXT",
-            'quality_diff_comment': "TEXT",
-            'moisture_ded_percent': "DOUBLE DEFAULT 0",
-            'prepared_by': "VARCHAR(255)",
-            'authorised_sign': "VARCHAR(255)",
-            'paddy_unloading_godown': "TEXT",
-            'net_weight_kg': "DOUBLE DEFAULT 0",
-            'gunny_weight_kg': "DOUBLE DEFAULT 0",
-            'final_weight_kg': "DOUBLE DEFAULT 0",
-            'weight_quintal': "DOUBLE DEFAULT 0",
-            'weight_khandi': "DOUBLE DEFAULT 0",
-            'rate_value': "DOUBLE DEFAULT 0",
-            'total_purchase_amount': "DOUBLE DEFAULT 0"
-        }
-
-        # Convert date columns to DATETIME
-        date_columns_to_convert = [
-            'date', 'payment_date', 'payment_due_date',
-            'instalment_1_date', 'instalment_2_date', 'instalment_3_date',
-            'instalment_4_date', 'instalment_5_date'
-        ]
-
-        for col_name in date_columns_to_convert:
-            if col_name in existing_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE purchase_slips MODIFY COLUMN {col_name} DATETIME")
-                    print(f"✓ Converted column {col_name} to DATETIME")
-                except mysql.connector.Error as err:
-                    print(f"Warning: Could not convert column {col_name}: {err}")
-
-        for col_name, col_type in columns_to_add.items():
-            if col_name not in existing_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE purchase_slips ADD COLUMN {col_name} {col_type}")
-                    print(f"✓ Added column: {col_name}")
-                except mysql.connector.Error as err:
-                    if err.errno != 1060:  # Ignore duplicate column error
-                        print(f"Warning: Could not add column {col_name}: {err}")
-
-        # Create default admin user if no users exist
-        cursor.execute("SELECT COUNT(*) as count FROM users")
-        result = cursor.fetchone()
-        user_count = result['count']
-
-        if user_count == 0:
-            cursor.execute('''
-                INSERT INTO users (username, password, full_name, role)
-                VALUES (%s, %s, %s, %s)
-            ''', ('admin', 'admin', 'Administrator', 'admin'))
-            print("✓ Default admin user created (username: admin, password: admin)")
-
-        # Add default unloading godowns if table is empty
-        cursor.execute("SELECT COUNT(*) as count FROM unloading_godowns")
-        result = cursor.fetchone()
-        godown_count = result['count']
-
-        if godown_count == 0:
-            default_godowns = [
-                'Godown A',
-                'Godown B',
-                'Main Warehouse',
-                'Storage Unit 1'
-            ]
-            for godown in default_godowns:
-                cursor.execute('INSERT IGNORE INTO unloading_godowns (name) VALUES (%s)', (godown,))
-            print(f"✓ Added {len(default_godowns)} default unloading godowns")
-
-        conn.commit()
-        print("✓ Database tables initialized successfully")
+        applied = run_migrations(conn)
+        if applied:
+            print(f"✓ Database schema migrated ({len(applied)} migration(s) applied)")
+        else:
+            print("✓ Database schema is up to date")
 
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         print(f"❌ Error initializing database: {err}")
-        if conn:
-            conn.rollback()
         raise
     finally:
-        if cursor:
-            cursor.close()
         if conn:
             conn.close()
 
-def get_next_bill_no():
+def bill_series_for(slip_date=None):
+    """
+    Return the bill number series a slip belongs to.
+    Financial years run April-March (Indian FY).
+    """
+    if BILL_NO_SERIES != 'financial_year' or slip_date is None:
+        return DEFAULT_BILL_SERIES
+
+    start_year = slip_date.year if slip_date.month >= 4 else slip_date.year - 1
+    return f"FY{start_year}-{(start_year + 1) % 100:02d}"
+
+def allocate_bill_numbers(cursor, series=DEFAULT_BILL_SERIES, count=1):
+    """
+    Atomically reserve `count` consecutive bill numbers from a series and
+    return the first one.
+
+    Must be called on the same connection/transaction as the INSERT that
+    uses the numbers: the UPDATE takes the sequence row lock, so a second
+    terminal saving at the same moment waits until this transaction commits
+    (or rolls back, releasing the numbers) instead of reading a stale MAX.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    cursor.execute(
+        'UPDATE bill_sequences SET next_value = next_value + %s WHERE series = %s',
+        (count, series)
+    )
+    if cursor.rowcount == 0:
+        # First bill of a new series (e.g. a new financial year)
+        insert_ignore = 'INSERT OR IGNORE' if is_sqlite() else 'INSERT IGNORE'
+        cursor.execute(
+            f'{insert_ignore} INTO bill_sequences (series, next_value) VALUES (%s, %s)',
+            (series, 1)
+        )
+        cursor.execute(
+            'UPDATE bill_sequences SET next_value = next_value + %s WHERE series = %s',
+            (count, series)
+        )
+
+    cursor.execute('SELECT next_value FROM bill_sequences WHERE series = %s', (series,))
+    row = cursor.fetchone()
+    next_value = row['next_value'] if isinstance(row, dict) else row[0]
+    return next_value - count
+
+def utc_now():
+    """Naive UTC timestamp (whole seconds, as HTTP dates) for updated_at columns"""
+    return datetime.utcnow().replace(microsecond=0)
+
+def adjust_row_counter(cursor, table_name, delta):
     """
-    Get the next bill number
+    Apply a row-count delta to the maintained counter for a table (and
+    bump its version). Call inside the transaction that inserted/deleted the rows.
+    """
+    if delta:
+        cursor.execute(
+            '''UPDATE row_counters
+               SET row_count = row_count + %s, version = version + 1, updated_at = %s
+               WHERE table_name = %s''',
+            (delta, utc_now(), table_name)
+        )
+
+def bump_table_version(cursor, table_name):
+    """
+    Mark a table as changed without changing its row count (updates).
+    The version and updated_at are the validators for list ETags.
+    """
+    cursor.execute(
+        'UPDATE row_counters SET version = version + 1, updated_at = %s WHERE table_name = %s',
+        (utc_now(), table_name)
+    )
+
+def get_table_version(cursor, table_name):
+    """(version, updated_at) of a table's maintained counter (primary-key lookup)"""
+    cursor.execute('SELECT version, updated_at FROM row_counters WHERE table_name = %s', (table_name,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0, None
+    return (row['version'], row['updated_at']) if isinstance(row, dict) else (row[0], row[1])
+
+def get_row_count(cursor, table_name):
+    """Read the maintained row count for a table (primary-key lookup)"""
+    cursor.execute('SELECT row_count FROM row_counters WHERE table_name = %s', (table_name,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    return row['row_count'] if isinstance(row, dict) else row[0]
+
+def rebuild_row_counter(cursor, table_name):
+    """Recount a table with COUNT(*) and store the result (repair tool)"""
+    cursor.execute(f'SELECT COUNT(*) AS total FROM {table_name}')
+    row = cursor.fetchone()
+    total = row['total'] if isinstance(row, dict) else row[0]
+    # Update in place so the table's version survives a recount
+    cursor.execute('SELECT table_name FROM row_counters WHERE table_name = %s', (table_name,))
+    if cursor.fetchone() is None:
+        cursor.execute(
+            'INSERT INTO row_counters (table_name, row_count) VALUES (%s, %s)',
+            (table_name, total)
+        )
+    else:
+        cursor.execute(
+            'UPDATE row_counters SET row_count = %s WHERE table_name = %s',
+            (total, table_name)
+        )
+    return total
+
+def get_next_bill_no(series=DEFAULT_BILL_SERIES):
+    """
+    Peek at the next bill number (primary-key lookup on bill_sequences).
+    The number is only reserved when a slip is saved.
     """
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT MAX(bill_no) as max_bill FROM purchase_slips')
+        cursor.execute('SELECT next_value FROM bill_sequences WHERE series = %s', (series,))
         result = cursor.fetchone()
 
-        if result['max_bill'] is None:
+        if result is None:
             return 1
-        return result['max_bill'] + 1
+        return result['next_value']
 
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         print(f"❌ Error getting next bill number: {err}")
         raise
     finally:
@@ -0,0 +1,145 @@
+"""
+Circuit breaker for the MySQL connection
+
+Without it, every request during a MySQL outage tries to connect, waits
+for the driver to give up and answers with the driver's error text, so each
+click in the UI hangs and requests pile up in the server.
+
+- closed: normal operation. get_db_connection() reports each checkout to
+  the breaker, and FAILURE_THRESHOLD connection failures in a row trip it
+- open: get_db_connection() raises DatabaseUnavailable at once, and the
+  API answers 503 with Retry-After (routes/health.py) without touching the
+  database. A background thread probes the server every COOLDOWN seconds
+- half_open: a probe is running; requests still fail fast. A successful
+  probe closes the breaker, a failed one keeps it open for another cool-down
+
+Pool timeouts (all connections busy) don't count as failures: the database
+is up, just busy.
+"""
+
+import threading
+import time
+
+
+class DatabaseUnavailable(Exception):
+    """Raised instead of connecting while the breaker is open"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a background recovery probe"""
+
+    def __init__(self, probe, failure_threshold=3, cooldown=10.0, name='database'):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.name = name
+
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self.last_error = None
+        self.opened_at = None
+        self.next_probe_at = None
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        return self.state != 'closed'
+
+    def retry_after(self):
+        """Seconds until the next recovery probe (at least 1)"""
+        return _seconds_until(self.next_probe_at)
+
+    def before_call(self):
+        """Raise DatabaseUnavailable while the breaker is open"""
+        if self.state != 'closed':
+            raise DatabaseUnavailable(
+                f'The {self.name} is unavailable ({self.last_error}); '
+                f'retrying in {self.retry_after()}s', self.retry_after())
+
+    def record_success(self):
+        if self.failures:
+            with self._lock:
+                if self.state == 'closed':
+                    self.failures = 0
+
+    def record_failure(self, error):
+        with self._lock:
+            self.last_error = f'{type(error).__name__}: {error}'
+            if self.state != 'closed':
+                return
+            self.failures += 1
+            if self.failures < self.failure_threshold:
+                return
+            self.state = 'open'
+            self.trips += 1
+            self.opened_at = time.time()
+            self.next_probe_at = time.monotonic() + self.cooldown
+            trip = self.trips
+        print(f"❌ {self.name.capitalize()} unreachable after {self.failures} attempts; "
+              f"failing fast, probing every {self.cooldown:g}s ({self.last_error})")
+        threading.Thread(target=self._probe_until_closed, args=(trip,),
+                         name=f'{self.name}-probe', daemon=True).start()
+
+    def _probe_until_closed(self, trip):
+        # The timestamps are read under the lock: reset() clears them, and a
+        # later trip starts its own probe thread, so this one then just ends
+        while True:
+            with self._lock:
+                if self.state == 'closed' or self.trips != trip:
+                    return
+                next_probe_at = self.next_probe_at
+            time.sleep(max(0.0, next_probe_at - time.monotonic()))
+            with self._lock:
+                if self.state == 'closed' or self.trips != trip:
+                    return
+                self.state = 'half_open'
+                opened_at = self.opened_at
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    if self.state == 'closed' or self.trips != trip:
+                        return
+                    self.last_error = f'{type(e).__name__}: {e}'
+                    self.state = 'open'
+                    self.next_probe_at = time.monotonic() + self.cooldown
+                continue
+            self.reset()
+            print(f"✓ {self.name.capitalize()} reachable again after {time.time() - opened_at:.0f}s")
+            return
+
+    def reset(self):
+        """Back to closed (recovered, or a fresh process after fork)"""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+            self.next_probe_at = None
+
+    def status(self):
+        """Dict for /api/health/ready"""
+        with self._lock:
+            state, failures, trips = self.state, self.failures, self.trips
+            last_error, opened_at, next_probe_at = self.last_error, self.opened_at, self.next_probe_at
+        status = {
+            'state': state,
+            'consecutive_failures': failures,
+            'trips': trips,
+        }
+        if last_error:
+            status['last_error'] = last_error
+        if state != 'closed':
+            status['open_for_s'] = round(time.time() - opened_at, 1) if opened_at is not None else 0.0
+            status['retry_after_s'] = _seconds_until(next_probe_at)
+        return status
+
+
+def _seconds_until(next_probe_at):
+    """Whole seconds (at least 1) until a monotonic probe time; 1 when unknown"""
+    if next_probe_at is None:
+        return 1
+    return max(1, round(next_probe_at - time.monotonic()))
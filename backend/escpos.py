@@ -0,0 +1,215 @@
+"""
+ESC/POS output for 80mm thermal printers
+
+build_slip_receipt() turns a slip row into the raw byte stream a
+weighbridge thermal printer understands: header, party details, weights,
+deductions, payable and instalments, then a paper cut. The row is expected
+in the same shape print_template_new.html gets (date_formatted and a
+formatted payments list), so both print paths show the same values.
+
+send_to_printer() writes the bytes to THERMAL_PRINTER:
+
+- a device such as /dev/usb/lp0 (Linux) or a shared printer path
+- tcp://host:9100 for network printers (raw port 9100)
+- any other path is written as a file (useful to inspect the output)
+
+Text is encoded as code page 437, the default of most ESC/POS printers;
+characters outside it are printed as '?', and the rupee sign as 'Rs.'.
+"""
+
+import os
+import socket
+import textwrap
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+CODEPAGE_PC437 = ESC + b't\x00'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+SIZE_NORMAL = GS + b'!\x00'
+SIZE_DOUBLE = GS + b'!\x11'
+FEED_AND_CUT = GS + b'V\x42\x03'
+
+# Characters per line in font A: 48 on 80mm paper, 32 on 58mm
+LINE_WIDTH = int(os.environ.get('THERMAL_LINE_WIDTH') or 48)
+ENCODING = 'cp437'
+
+THERMAL_PRINTER = os.environ.get('THERMAL_PRINTER', '')
+PRINTER_TIMEOUT = 5
+
+
+def _printable(value):
+    """str(value) with the rupee sign spelled out (code page 437 has none)"""
+    return str(value).replace('₹', 'Rs.')
+
+
+def _amount(value):
+    try:
+        return f'{float(value or 0):.2f}'
+    except (TypeError, ValueError):
+        return '0.00'
+
+
+def _weight(value, places=2):
+    try:
+        return f'{float(value or 0):.{places}f}'
+    except (TypeError, ValueError):
+        return f'{0:.{places}f}'
+
+
+class Receipt:
+    """Accumulates ESC/POS commands and text lines"""
+
+    def __init__(self, width=LINE_WIDTH):
+        self.width = width
+        self.parts = [INIT, CODEPAGE_PC437]
+
+    def raw(self, command):
+        self.parts.append(command)
+
+    def text(self, value):
+        self.parts.append(_printable(value).encode(ENCODING, errors='replace'))
+
+    def line(self, value=''):
+        """
+        Text and a newline. Longer text wraps at spaces onto further lines,
+        keeping its indent; words longer than a line are split.
+        """
+        value = _printable(value)
+        if len(value) <= self.width:
+            lines = [value]
+        else:
+            indent = value[:len(value) - len(value.lstrip())][:self.width // 2]
+            lines = textwrap.wrap(value.strip(), self.width, initial_indent=indent, subsequent_indent=indent)
+        for part in lines:
+            self.text(part)
+            self.parts.append(b'\n')
+
+    def pair(self, label, value):
+        """
+        'label ...... value' across the full width; when both don't fit,
+        the value goes right-aligned on the next line
+        """
+        label, value = _printable(label), _printable(value)
+        if len(label) + 1 + len(value) > self.width:
+            self.line(label)
+            self.line(value.rjust(self.width))
+        else:
+            self.line(label + ' ' * (self.width - len(label) - len(value)) + value)
+
+    def rule(self, char='-'):
+        self.line(char * self.width)
+
+    def heading(self, value):
+        self.raw(BOLD_ON)
+        self.line(value)
+        self.raw(BOLD_OFF)
+
+    def to_bytes(self):
+        return b''.join(self.parts)
+
+
+def build_slip_receipt(slip, width=LINE_WIDTH):
+    """ESC/POS bytes for one slip (row dict with date_formatted and payments)"""
+    receipt = Receipt(width)
+
+    receipt.raw(ALIGN_CENTER)
+    receipt.raw(BOLD_ON + SIZE_DOUBLE)
+    receipt.line((slip.get('company_name') or 'COMPANY NAME')[:width // 2])
+    receipt.raw(SIZE_NORMAL + BOLD_OFF)
+    if slip.get('company_address'):
+        receipt.line(slip['company_address'])
+    receipt.heading(slip.get('document_type') or 'PURCHASE SLIP')
+    receipt.raw(ALIGN_LEFT)
+    receipt.rule('=')
+
+    receipt.pair(f"Bill No: {slip.get('bill_no') or '-'}",
+                 f"Date: {slip.get('date_formatted') or slip.get('date') or '-'}")
+    for label, field in (('Vehicle No', 'vehicle_no'), ('Party', 'party_name'),
+                         ('Mobile', 'mobile_number'), ('Material', 'material_name'),
+                         ('Broker', 'broker'), ('Ticket No', 'ticket_no'), ('GST No', 'gst_no')):
+        if slip.get(field):
+            receipt.pair(label, slip[field])
+    receipt.rule()
+
+    receipt.heading('WEIGHT')
+    receipt.pair('Bags', _weight(slip.get('bags'), 0))
+    receipt.pair('Net Weight (kg)', _weight(slip.get('net_weight_kg')))
+    receipt.pair('Gunny Weight (kg)', _weight(slip.get('gunny_weight_kg')))
+    receipt.pair('Final Weight (kg)', _weight(slip.get('final_weight_kg')))
+    receipt.pair('Avg Bag Weight (kg)', _weight(slip.get('avg_bag_weight')))
+    receipt.pair('Weight (Quintal)', _weight(slip.get('weight_quintal'), 3))
+    receipt.pair('Weight (Khandi)', _weight(slip.get('weight_khandi'), 3))
+    receipt.pair(f"Rate / {slip.get('rate_basis') or 'Quintal'}", _amount(slip.get('rate_value')))
+    receipt.raw(BOLD_ON)
+    receipt.pair('Total Purchase Amount', _amount(slip.get('total_purchase_amount')))
+    receipt.raw(BOLD_OFF)
+    receipt.rule()
+
+    receipt.heading('DEDUCTIONS')
+    deductions = (
+        ('Bank Commission', 'bank_commission', None),
+        ('Postage', 'postage', None),
+        ('Freight', 'freight', None),
+        ('Rate Difference', 'rate_diff', None),
+        ('Quality Difference', 'quality_diff', None),
+        ('Moisture Deduction', 'moisture_ded', 'moisture_ded_percent'),
+        ('TDS', 'tds', None),
+        ('Batav', 'batav', 'batav_percent'),
+        ('Shortage', 'shortage', 'shortage_percent'),
+        ('Dalali', 'dalali', None),
+        ('Hammali', 'hammali', None),
+    )
+    for label, field, percent_field in deductions:
+        if float(slip.get(field) or 0) > 0:
+            if percent_field and float(slip.get(percent_field) or 0) > 0:
+                label = f'{label} ({_amount(slip[percent_field])}%)'
+            receipt.pair(label, _amount(slip[field]))
+    receipt.pair('Total Deduction', _amount(slip.get('total_deduction')))
+    receipt.rule('=')
+
+    receipt.raw(BOLD_ON)
+    receipt.pair('PAYABLE (Rs.)', _amount(slip.get('payable_amount')))
+    receipt.raw(BOLD_OFF)
+    receipt.pair('Total Paid', _amount(slip.get('total_paid_amount')))
+    receipt.pair('Balance', _amount(slip.get('balance_amount')))
+
+    payments = slip.get('payments') or []
+    if payments:
+        receipt.rule()
+        receipt.heading('INSTALMENTS')
+        for number, payment in enumerate(payments, start=1):
+            receipt.pair(f"{number}. {payment.get('date') or '-'}", _amount(payment.get('amount')))
+            details = ' / '.join(str(payment[field]) for field in ('payment_method', 'payment_bank_account', 'comment')
+                                 if payment.get(field))
+            if details:
+                receipt.line(f'   {details}')
+
+    receipt.rule()
+    if slip.get('paddy_unloading_godown'):
+        receipt.pair('Unloading Godown', slip['paddy_unloading_godown'])
+    receipt.line()
+    receipt.line()
+    receipt.pair('Prepared By', 'Authorized Signatory')
+    receipt.raw(FEED_AND_CUT)
+    return receipt.to_bytes()
+
+
+def send_to_printer(data, target=None):
+    """Write ESC/POS bytes to a device, file or tcp://host:port; returns the target"""
+    target = target or THERMAL_PRINTER
+    if not target:
+        raise ValueError('No thermal printer configured (set THERMAL_PRINTER)')
+
+    if target.startswith('tcp://'):
+        host, _, port = target[len('tcp://'):].partition(':')
+        with socket.create_connection((host, int(port or 9100)), timeout=PRINTER_TIMEOUT) as connection:
+            connection.sendall(data)
+    else:
+        with open(target, 'wb') as printer:
+            printer.write(data)
+    return target
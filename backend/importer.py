@@ -0,0 +1,340 @@
+"""
+Bulk import of purchase slips from CSV / XLSX
+
+Rows are streamed from the file, run through calculate_fields() and
+inserted with executemany() in chunks of IMPORT_BATCH_SIZE, one
+transaction per chunk. Each chunk reserves its bill numbers with a single
+allocate_bill_numbers() call and applies its row counter, party ledger and
+rollup deltas once, so the per-row cost is the Python calculation plus one
+row of a batched INSERT.
+
+If a chunk fails in the database (e.g. a duplicate bill number), it is
+rolled back and retried in halves until the error is pinned to a line.
+Rows that fail validation are reported and skipped; the rest are imported.
+
+The new slip ids are looked up by (bill_series, bill_no) after the
+batched INSERT, so that key must identify one slip: a bill number used
+twice in the file is reported on its second line, and the import is
+refused while the UNIQUE (bill_series, bill_no) index is missing
+(migration 5 skips it on databases that already held duplicates).
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from database import allocate_bill_numbers, bill_series_for, adjust_row_counter, is_sqlite, DB_ERRORS
+from migrations import index_exists
+from slip_schema import ist_timezone, SLIP_INSERT_SQL
+from aggregates import apply_inserted_slips_aggregates
+from slip_calc import (
+    calculate_fields, slip_insert_params, calculate_payment_totals,
+    payments_from_instalment_fields, mirror_payments_to_instalment_fields,
+)
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# ISO first, then the day-first formats used by weighbridge exports and Indian spreadsheets
+IMPORT_DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y %H:%M', '%d-%m-%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+# Created by migration 5 unless the table already held duplicate bill numbers
+BILL_UNIQUE_INDEX = 'uq_bill_series_no'
+
+
+def normalize_header(name):
+    """'Party Name' -> 'party_name'"""
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def iter_csv_rows(stream):
+    """Yield (line_number, row dict) from a text or binary CSV stream"""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    header = [normalize_header(name) for name in next(reader, [])]
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield reader.line_num, dict(zip(header, row))
+
+
+def iter_xlsx_rows(stream):
+    """Yield (row_number, row dict) from the first sheet of an XLSX workbook"""
+    if not OPENPYXL_AVAILABLE:
+        raise ValueError('XLSX import requires openpyxl (pip install openpyxl)')
+
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [normalize_header(name) for name in next(rows, ())]
+        for number, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield number, dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(stream, filename='', file_format=None):
+    """Pick the reader from an explicit format or the file extension"""
+    file_format = (file_format or filename.rsplit('.', 1)[-1]).lower()
+    if file_format == 'xlsx':
+        return iter_xlsx_rows(stream)
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    raise ValueError(f"Unsupported import format '{file_format}' (use csv or xlsx)")
+
+
+def parse_import_date(value):
+    """
+    ISO dates/datetimes, Excel datetimes or DD-MM-YYYY [HH:MM] -> naive IST.
+    Same result as parse_datetime_to_ist() for strings, without localizing
+    naive values (the common case) through pytz on every row.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            parsed = None
+            for fmt in IMPORT_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+    else:
+        return None
+
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone(ist_timezone()).replace(tzinfo=None)
+    return parsed
+
+
+def prepare_row(raw):
+    """
+    Turn one file row into an insert-ready entry.
+    Raises ValueError with a message for the error report.
+    """
+    data = {}
+    for key, value in raw.items():
+        if not key or key == 'id':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        data[key] = '' if value is None else value
+
+    slip_date = parse_import_date(data.get('date'))
+    if slip_date is None:
+        raise ValueError(f"Missing or invalid date: {data.get('date')!r}")
+
+    bill_no = None
+    if data.get('bill_no') not in (None, ''):
+        try:
+            bill_no = int(float(data['bill_no']))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid bill_no: {data['bill_no']!r}")
+
+    for i in range(1, 6):
+        key = f'instalment_{i}_date'
+        if data.get(key) not in (None, ''):
+            data[key] = parse_import_date(data[key])
+
+    data = calculate_fields(data)
+    payments = payments_from_instalment_fields(data)
+    mirror_payments_to_instalment_fields(data, payments)
+    total_paid, balance_amount = calculate_payment_totals(dict(data, payments=payments))
+
+    return {
+        'data': data,
+        'date': slip_date,
+        'series': bill_series_for(slip_date),
+        'bill_no': bill_no,
+        'payments': payments,
+        'total_paid': total_paid,
+        'balance_amount': balance_amount,
+    }
+
+
+def advance_bill_sequence(cursor, series, last_bill_no):
+    """Make sure the sequence hands out numbers after an imported bill_no"""
+    insert_ignore = 'INSERT OR IGNORE' if is_sqlite() else 'INSERT IGNORE'
+    cursor.execute(
+        f'{insert_ignore} INTO bill_sequences (series, next_value) VALUES (%s, %s)',
+        (series, 1)
+    )
+    cursor.execute(
+        'UPDATE bill_sequences SET next_value = %s WHERE series = %s AND next_value <= %s',
+        (last_bill_no + 1, series, last_bill_no)
+    )
+
+
+def insert_chunk(cursor, entries):
+    """Insert prepared entries in the current transaction; returns the slip ids"""
+    by_series = {}
+    for entry in entries:
+        by_series.setdefault(entry['series'], []).append(entry)
+
+    # Explicit bill numbers first, so reserved numbers land after them
+    for series, series_entries in by_series.items():
+        explicit = [entry['bill_no'] for entry in series_entries if entry['bill_no'] is not None]
+        if explicit:
+            advance_bill_sequence(cursor, series, max(explicit))
+
+        pending = [entry for entry in series_entries if entry['bill_no'] is None]
+        if pending:
+            first = allocate_bill_numbers(cursor, series, len(pending))
+            for offset, entry in enumerate(pending):
+                entry['bill_no'] = first + offset
+
+    cursor.executemany(SLIP_INSERT_SQL, [
+        slip_insert_params(entry['data'], entry['date'], entry['series'], entry['bill_no'],
+                           entry['total_paid'], entry['balance_amount'])
+        for entry in entries
+    ])
+
+    # executemany() has no per-row lastrowid; look the ids up by bill key
+    ids = {}
+    for series, series_entries in by_series.items():
+        numbers = [entry['bill_no'] for entry in series_entries]
+        placeholders = ', '.join(['%s'] * len(numbers))
+        cursor.execute(f'''
+            SELECT id, bill_no FROM purchase_slips
+            WHERE bill_series = %s AND bill_no IN ({placeholders})
+        ''', (series, *numbers))
+        for row in cursor.fetchall():
+            ids[(series, row['bill_no'])] = row['id']
+
+    payment_rows = []
+    for entry in entries:
+        entry['slip_id'] = ids[(entry['series'], entry['bill_no'])]
+        for number, payment in enumerate(entry['payments'], start=1):
+            payment_rows.append((
+                entry['slip_id'], number, payment['date'], payment['amount'],
+                payment['payment_method'], payment['payment_bank_account'], payment['comment']
+            ))
+    if payment_rows:
+        cursor.executemany('''
+            INSERT INTO purchase_slip_payments (
+                slip_id, instalment_no, payment_date, amount,
+                payment_method, payment_bank_account, comment
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ''', payment_rows)
+
+    adjust_row_counter(cursor, 'purchase_slips', len(entries))
+    apply_inserted_slips_aggregates(cursor, [
+        dict(entry['data'], date=entry['date'], total_paid_amount=entry['total_paid'])
+        for entry in entries
+    ])
+    return [entry['slip_id'] for entry in entries]
+
+
+def require_unique_bill_numbers(conn):
+    """Raise ValueError unless (bill_series, bill_no) is guarded by a UNIQUE index"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if not index_exists(cursor, 'purchase_slips', BILL_UNIQUE_INDEX):
+            raise ValueError(
+                'Import refused: purchase_slips has duplicate bill numbers, so the UNIQUE '
+                f'(bill_series, bill_no) index {BILL_UNIQUE_INDEX} is missing. Resolve the '
+                'duplicates and run manage.py migrate, then import again.'
+            )
+    finally:
+        cursor.close()
+
+
+def iter_import(conn, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Import (line_number, row dict) pairs chunk by chunk.
+    Returns a generator that yields a progress dict after every chunk; the
+    last one has done=True. With dry_run every chunk is rolled back after it
+    is inserted. Raises ValueError straight away (before any row is read)
+    when the bill number index is missing.
+    """
+    require_unique_bill_numbers(conn)
+    return _iter_import(conn, rows, batch_size, dry_run)
+
+
+def _iter_import(conn, rows, batch_size, dry_run):
+    summary = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': [], 'done': False}
+    # (series, bill_no) -> line, for the bill numbers given in the file
+    explicit_lines = {}
+
+    def record_error(line, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': line, 'message': message})
+
+    def finish(count):
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        summary['imported'] += count
+
+    def flush(chunk):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            insert_chunk(cursor, [entry for _, entry in chunk])
+            finish(len(chunk))
+            return
+        except DB_ERRORS as e:
+            conn.rollback()
+            if len(chunk) == 1:
+                record_error(chunk[0][0], str(e))
+                return
+        finally:
+            cursor.close()
+
+        # Split the failed chunk in halves until the offending lines are isolated
+        for _, entry in chunk:
+            entry['bill_no'] = entry['original_bill_no']
+        middle = len(chunk) // 2
+        flush(chunk[:middle])
+        flush(chunk[middle:])
+
+    chunk = []
+    for line, raw in rows:
+        summary['rows'] += 1
+        try:
+            entry = prepare_row(raw)
+        except (ValueError, TypeError) as e:
+            record_error(line, str(e))
+            continue
+
+        if entry['bill_no'] is not None:
+            key = (entry['series'], entry['bill_no'])
+            if key in explicit_lines:
+                record_error(line, f"Duplicate bill_no {entry['bill_no']} in series {entry['series']} "
+                                   f"(also on row {explicit_lines[key]})")
+                continue
+            explicit_lines[key] = line
+
+        entry['original_bill_no'] = entry['bill_no']
+        chunk.append((line, entry))
+        if len(chunk) >= batch_size:
+            flush(chunk)
+            chunk = []
+            yield dict(summary)
+
+    if chunk:
+        flush(chunk)
+
+    summary['done'] = True
+    yield summary
+
+
+def import_slips(conn, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False, progress=None):
+    """Run iter_import() to completion; progress(summary) is called per chunk"""
+    summary = None
+    for summary in iter_import(conn, rows, batch_size, dry_run):
+        if progress and not summary['done']:
+            progress(summary)
+    return summary
@@ -0,0 +1,223 @@
+"""
+Maintenance commands for the purchase slip backend
+
+Usage:
+    python backend/manage.py migrate            Apply pending schema migrations
+    python backend/manage.py migrate --status   Show applied / pending migrations
+    python backend/manage.py rebuild-counters   Recount maintained row counters
+    python backend/manage.py rebuild-totals     Recompute stored total paid / balance
+    python backend/manage.py rebuild-ledger     Recompute the party_ledger table
+    python backend/manage.py rebuild-rollups    Recompute the daily/monthly report rollups
+    python backend/manage.py import FILE        Bulk import slips from CSV / XLSX
+    python backend/manage.py recalc --set hammali_rate=6 --filter date_from=2025-04-01 [--apply]
+                                                Recalculate slip financials in bulk
+"""
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import get_db_connection
+
+
+def cmd_migrate(args):
+    from migrations import run_migrations, migration_status
+
+    conn = get_db_connection()
+    try:
+        if args.status:
+            for version, name, applied_at in migration_status(conn):
+                state = f"applied {applied_at}" if applied_at else "pending"
+                print(f"  {version:03d}_{name:40} {state}")
+            return 0
+
+        applied = run_migrations(conn, target=args.target)
+        if applied:
+            print(f"✅ Applied {len(applied)} migration(s)")
+        else:
+            print("✅ Schema is already up to date")
+        return 0
+    finally:
+        conn.close()
+
+
+def cmd_rebuild_counters(args):
+    from database import rebuild_row_counter
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        total = rebuild_row_counter(cursor, 'purchase_slips')
+        conn.commit()
+        print(f"✅ purchase_slips: {total} rows")
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cmd_rebuild_totals(args):
+    from routes.slips import refresh_payment_totals
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        updated = refresh_payment_totals(cursor)
+        conn.commit()
+        print(f"✅ Recomputed payment totals on {updated} slip(s)")
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cmd_rebuild_ledger(args):
+    from aggregates import rebuild_party_ledger
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        parties = rebuild_party_ledger(cursor)
+        conn.commit()
+        print(f"✅ party_ledger: {parties} parties")
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cmd_rebuild_rollups(args):
+    from aggregates import rebuild_rollups
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        rows = rebuild_rollups(cursor)
+        conn.commit()
+        print(f"✅ slip_rollups: {rows} rows")
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def cmd_import(args):
+    from database import init_db
+    from importer import iter_file_rows, import_slips
+
+    # Importing into a fresh install is common; make sure the tables exist
+    init_db()
+
+    def progress(summary):
+        print(f"  … {summary['rows']} rows read, {summary['imported']} imported, {summary['failed']} failed")
+
+    conn = get_db_connection()
+    try:
+        with open(args.file, 'rb') as stream:
+            rows = iter_file_rows(stream, args.file, args.format)
+            try:
+                summary = import_slips(conn, rows, args.batch_size, args.dry_run, progress)
+            except ValueError as e:
+                raise SystemExit(f"❌ {e}")
+    finally:
+        conn.close()
+
+    for error in summary['errors'][:50]:
+        print(f"  ❌ row {error['row']}: {error['message']}")
+    if summary['failed'] > 50:
+        print(f"  … and {summary['failed'] - 50} more error(s)")
+
+    verb = 'Validated' if args.dry_run else 'Imported'
+    print(f"✅ {verb} {summary['imported']} of {summary['rows']} rows ({summary['failed']} failed)")
+    return 1 if summary['failed'] else 0
+
+
+def parse_assignments(pairs):
+    """['key=value', ...] -> {key: value}"""
+    result = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected key=value, got '{pair}'")
+        result[key.strip()] = value.strip()
+    return result
+
+
+def cmd_recalc(args):
+    from recalc import recalculate_slips
+
+    def progress(summary):
+        print(f"  … {summary['matched']} slips checked, {summary['changed']} changed")
+
+    conn = get_db_connection()
+    try:
+        summary = recalculate_slips(
+            conn, parse_assignments(args.filter), parse_assignments(args.set),
+            apply=args.apply, verify=args.verify, progress=progress
+        )
+    finally:
+        conn.close()
+
+    for row in summary['changes'][:args.show]:
+        changes = ', '.join(f"{column} {old} → {new}" for column, (old, new) in row['changes'].items())
+        print(f"  #{row['bill_no']} {row['party_name']}: {changes}")
+
+    verb = 'Updated' if args.apply else 'Would update'
+    print(f"✅ {verb} {summary['changed'] - summary['skipped']} of {summary['matched']} slips; "
+          f"payable {summary['payable_before']:.2f} → {summary['payable_after']:.2f}")
+    if summary['skipped']:
+        print(f"⚠️ Skipped {summary['skipped']} slips edited during the recalc "
+              f"(ids {', '.join(map(str, summary['conflicts']))}); run it again to update them")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Purchase slip backend maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help='Apply schema migrations')
+    migrate.add_argument('--status', action='store_true', help='List migrations and exit')
+    migrate.add_argument('--target', type=int, default=None, help='Stop at this version')
+    migrate.set_defaults(func=cmd_migrate)
+
+    counters = subparsers.add_parser('rebuild-counters', help='Recount maintained row counters')
+    counters.set_defaults(func=cmd_rebuild_counters)
+
+    totals = subparsers.add_parser('rebuild-totals', help='Recompute stored total paid / balance columns')
+    totals.set_defaults(func=cmd_rebuild_totals)
+
+    ledger = subparsers.add_parser('rebuild-ledger', help='Recompute the party_ledger table')
+    ledger.set_defaults(func=cmd_rebuild_ledger)
+
+    rollups = subparsers.add_parser('rebuild-rollups', help='Recompute the daily/monthly report rollups')
+    rollups.set_defaults(func=cmd_rebuild_rollups)
+
+    bulk = subparsers.add_parser('import', help='Bulk import slips from CSV / XLSX')
+    bulk.add_argument('file', help='CSV or XLSX file with a header row of slip field names')
+    bulk.add_argument('--format', choices=['csv', 'xlsx'], default=None, help='Override the file extension')
+    bulk.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction')
+    bulk.add_argument('--dry-run', action='store_true', help='Validate and roll back')
+    bulk.set_defaults(func=cmd_import)
+
+    recalc = subparsers.add_parser('recalc', help='Recalculate slip financials in bulk')
+    recalc.add_argument('--set', action='append', metavar='COLUMN=VALUE',
+                        help='Input to change before recalculating, e.g. hammali_rate=6')
+    recalc.add_argument('--filter', action='append', metavar='PARAM=VALUE',
+                        help='Same filters as /api/slips, e.g. date_from=2025-04-01 or party=Ram')
+    recalc.add_argument('--apply', action='store_true', help='Write the changes (default: preview only)')
+    recalc.add_argument('--verify', action='store_true', help='Cross-check every row against calculate_fields')
+    recalc.add_argument('--show', type=int, default=20, help='Changed slips to print')
+    recalc.set_defaults(func=cmd_recalc)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Request metrics
+
+Every request is timed by routes/metrics.py and recorded per route (the
+URL rule, e.g. /api/slip/<int:slip_id>):
+
+- a latency histogram (LATENCY_BUCKETS, seconds) and request counts by
+  status code
+- where the time went: `db` (cursor execute / fetch and connection
+  checkout), `pdf` (waiting for the PDF render workers) and `python`
+  (the rest)
+
+The database and PDF layers report their time with add_time() / timed();
+outside a request (startup, manage.py) that is a no-op. Counters live in
+the process, so with --processes each worker reports its own.
+
+/api/metrics renders them in the Prometheus text format together with the
+pool and breaker numbers; /api/metrics/summary returns a JSON digest for
+the admin screen.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIME_COMPONENTS = ('db', 'pdf', 'python')
+METRIC_PREFIX = 'purchase_slips_'
+
+_perf_counter = time.perf_counter
+_local = threading.local()
+
+
+# PER-REQUEST TIME ACCOUNTING
+
+def begin_request():
+    _local.times = {'db': 0.0, 'pdf': 0.0}
+
+
+def end_request():
+    """The request's db / pdf seconds (None if begin_request() wasn't called)"""
+    times = getattr(_local, 'times', None)
+    _local.times = None
+    return times
+
+
+def add_time(component, seconds):
+    """Charge `seconds` to the current request's db / pdf time"""
+    times = getattr(_local, 'times', None)
+    if times is not None:
+        times[component] += seconds
+
+
+@contextmanager
+def timed(component):
+    start = _perf_counter()
+    try:
+        yield
+    finally:
+        add_time(component, _perf_counter() - start)
+
+
+# AGGREGATES
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)    # last bucket: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (seconds)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in zip(LATENCY_BUCKETS, self.cumulative()):
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class RouteStats:
+    __slots__ = ('latency', 'statuses', 'seconds')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = {}
+        self.seconds = dict.fromkeys(TIME_COMPONENTS, 0.0)
+
+
+class RequestMetrics:
+    """Per-route request statistics (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.started_at = time.time()
+
+    def observe(self, method, route, status, duration, times):
+        db = times['db'] if times else 0.0
+        pdf = times['pdf'] if times else 0.0
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = RouteStats()
+            stats.latency.observe(duration)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.seconds['db'] += db
+            stats.seconds['pdf'] += pdf
+            stats.seconds['python'] += max(0.0, duration - db - pdf)
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted(
+                (key, stats.latency.counts[:], stats.latency.count, stats.latency.sum,
+                 dict(stats.statuses), dict(stats.seconds))
+                for key, stats in self._routes.items()
+            )
+
+    def prometheus(self, pool=None, breaker=None):
+        """Prometheus text exposition format (version 0.0.4)"""
+        snapshot = self._snapshot()
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {METRIC_PREFIX}{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}{name} {kind}')
+
+        header('http_request_duration_seconds', 'histogram', 'Request latency by route')
+        for (method, route), counts, count, total, _, _ in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+                cumulative += bucket
+                lines.append(f'{METRIC_PREFIX}http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}http_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{METRIC_PREFIX}http_request_duration_seconds_count{{{labels}}} {count}')
+
+        header('http_requests_total', 'counter', 'Requests by route and status code')
+        for (method, route), _, _, _, statuses, _ in snapshot:
+            for status, count in sorted(statuses.items()):
+                lines.append(f'{METRIC_PREFIX}http_requests_total'
+                             f'{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        header('request_time_seconds_total', 'counter',
+               'Request time by route and component (db, pdf, python)')
+        for (method, route), _, _, _, _, seconds in snapshot:
+            for component in TIME_COMPONENTS:
+                lines.append(f'{METRIC_PREFIX}request_time_seconds_total'
+                             f'{{method="{method}",route="{_escape(route)}",component="{component}"}} '
+                             f'{seconds[component]:.6f}')
+
+        if pool:
+            for key, name, kind, scale, help_text in POOL_METRICS:
+                if key in pool:
+                    header(name, kind, help_text)
+                    lines.append(f'{METRIC_PREFIX}{name} {pool[key] * scale:g}')
+
+        if breaker:
+            header('db_breaker_open', 'gauge', '1 while the database circuit breaker is open')
+            lines.append(f"{METRIC_PREFIX}db_breaker_open {int(breaker['state'] != 'closed')}")
+            header('db_breaker_trips_total', 'counter', 'Times the database circuit breaker opened')
+            lines.append(f"{METRIC_PREFIX}db_breaker_trips_total {breaker['trips']}")
+
+        header('uptime_seconds', 'gauge', 'Seconds since the process started')
+        lines.append(f'{METRIC_PREFIX}uptime_seconds {time.time() - self.started_at:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Per-route digest for the admin screen (times in milliseconds)"""
+        routes = []
+        for (method, route), counts, count, total, statuses, seconds in self._snapshot():
+            histogram = Histogram()
+            histogram.counts, histogram.count, histogram.sum = counts, count, total
+            errors = sum(n for status, n in statuses.items() if status >= 500)
+            routes.append({
+                'method': method,
+                'route': route,
+                'requests': count,
+                'errors': errors,
+                'statuses': {str(status): n for status, n in sorted(statuses.items())},
+                'avg_ms': round(total / count * 1000, 1),
+                'p50_ms': _bucket_ms(histogram.quantile(0.5)),
+                'p95_ms': _bucket_ms(histogram.quantile(0.95)),
+                'avg_db_ms': round(seconds['db'] / count * 1000, 1),
+                'avg_pdf_ms': round(seconds['pdf'] / count * 1000, 1),
+                'avg_python_ms': round(seconds['python'] / count * 1000, 1),
+            })
+        routes.sort(key=lambda route: route['avg_ms'] * route['requests'], reverse=True)
+        return {
+            'uptime_s': round(time.time() - self.started_at),
+            'requests': sum(route['requests'] for route in routes),
+            'routes': routes,
+        }
+
+
+# database.pool_stats() key -> (metric name, type, scale, help)
+POOL_METRICS = (
+    ('size', 'db_pool_connections', 'gauge', 1, 'Open database connections'),
+    ('in_use', 'db_pool_connections_in_use', 'gauge', 1, 'Connections checked out by requests'),
+    ('idle', 'db_pool_connections_idle', 'gauge', 1, 'Connections waiting in the pool'),
+    ('max_size', 'db_pool_connections_max', 'gauge', 1, 'Pool size limit'),
+    ('waiting', 'db_pool_waiting_requests', 'gauge', 1, 'Requests waiting for a connection'),
+    ('checkouts', 'db_pool_checkouts_total', 'counter', 1, 'Connection checkouts'),
+    ('waits', 'db_pool_waits_total', 'counter', 1, 'Checkouts that had to wait for a free connection'),
+    ('wait_ms_total', 'db_pool_wait_seconds_total', 'counter', 0.001, 'Time spent waiting for a connection'),
+    ('timeouts', 'db_pool_timeouts_total', 'counter', 1, 'Checkouts that gave up waiting'),
+    ('rejected', 'db_pool_rejected_total', 'counter', 1, 'Checkouts refused because the wait queue was full'),
+    ('reconnects', 'db_pool_reconnects_total', 'counter', 1, 'Dead idle connections replaced'),
+)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _bucket_ms(seconds):
+    return None if seconds == float('inf') else round(seconds * 1000, 1)
+
+
+request_metrics = RequestMetrics()
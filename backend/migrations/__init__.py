@@ -0,0 +1,179 @@
+"""
+Versioned schema migrations
+
+Every schema change is a numbered migration registered in versions.py.
+Applied versions are recorded in the schema_migrations table, so a boot
+against an up-to-date database costs one primary-key lookup:
+
+    SELECT MAX(version) FROM schema_migrations
+
+Migrations run in order, each one followed by its schema_migrations row.
+They must be safe to re-run against a database that was created by an
+older build (the old init_db() / standalone migration scripts), because
+those databases start at version 0.
+"""
+
+import time
+
+from database import is_sqlite
+
+# Ordered registry of (version, name, function)
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register a migration function under a version number"""
+    def decorator(func):
+        if any(existing[0] == version for existing in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version: {version}")
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return decorator
+
+
+def latest_version():
+    """Highest registered migration version"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def ensure_migrations_table(cursor):
+    """Create the schema_migrations bookkeeping table"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL,
+            duration_ms INT DEFAULT 0
+        )
+    ''')
+
+
+def get_schema_version(cursor):
+    """Return the highest applied migration version (0 for a fresh database)"""
+    cursor.execute('SELECT MAX(version) AS version FROM schema_migrations')
+    row = cursor.fetchone()
+    version = row['version'] if isinstance(row, dict) else row[0]
+    return version or 0
+
+
+def get_table_columns(cursor, table):
+    """Return {column_name: lower-case data type} for an existing table"""
+    if is_sqlite():
+        cursor.execute(f'PRAGMA table_info({table})')
+        rows = cursor.fetchall()
+        return {row['name']: (row['type'] or '').lower() for row in rows}
+
+    cursor.execute('''
+        SELECT COLUMN_NAME AS name, DATA_TYPE AS data_type
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    ''', (table,))
+    return {row['name']: row['data_type'].lower() for row in cursor.fetchall()}
+
+
+def add_missing_columns(cursor, table, columns):
+    """
+    Add every column in `columns` ({name: definition}) that the table lacks.
+    MySQL gets a single ALTER TABLE so the table is rebuilt at most once.
+    """
+    existing = get_table_columns(cursor, table)
+    missing = [(name, definition) for name, definition in columns.items() if name not in existing]
+    if not missing:
+        return []
+
+    if is_sqlite():
+        for name, definition in missing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    else:
+        clauses = ', '.join(f'ADD COLUMN {name} {definition}' for name, definition in missing)
+        cursor.execute(f'ALTER TABLE {table} {clauses}')
+
+    added = [name for name, _ in missing]
+    print(f"  ✓ Added {len(added)} column(s) to {table}: {', '.join(added)}")
+    return added
+
+
+def index_exists(cursor, table, index_name):
+    """Check whether an index exists on a table"""
+    if is_sqlite():
+        cursor.execute(
+            "SELECT COUNT(*) AS count FROM sqlite_master WHERE type = 'index' AND name = %s",
+            (index_name,)
+        )
+    else:
+        cursor.execute('''
+            SELECT COUNT(*) AS count
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ''', (table, index_name))
+    return cursor.fetchone()['count'] > 0
+
+
+def create_index(cursor, table, index_name, columns, unique=False):
+    """Create an index unless it already exists (columns is the SQL column list)"""
+    if index_exists(cursor, table, index_name):
+        return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    cursor.execute(f'CREATE {kind} {index_name} ON {table} ({columns})')
+    print(f"  ✓ Created index {index_name} on {table}")
+    return True
+
+
+def run_migrations(conn, target=None):
+    """
+    Apply all pending migrations up to `target` (default: latest).
+    Returns the list of versions that were applied.
+    """
+    from . import versions  # noqa: F401  (registers migrations)
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        ensure_migrations_table(cursor)
+        current = get_schema_version(cursor)
+        target = latest_version() if target is None else target
+
+        if current >= target:
+            conn.commit()
+            return []
+
+        print(f"✓ Migrating schema from version {current} to {target}")
+        applied = []
+        for version, name, func in MIGRATIONS:
+            if version <= current or version > target:
+                continue
+
+            started = time.perf_counter()
+            func(cursor)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+
+            cursor.execute('''
+                INSERT INTO schema_migrations (version, name, applied_at, duration_ms)
+                VALUES (%s, %s, CURRENT_TIMESTAMP, %s)
+            ''', (version, name, duration_ms))
+            conn.commit()
+            applied.append(version)
+            print(f"✓ Applied migration {version:03d}_{name} ({duration_ms} ms)")
+
+        return applied
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migration_status(conn):
+    """Return [(version, name, applied_at or None)] for every registered migration"""
+    from . import versions  # noqa: F401
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        ensure_migrations_table(cursor)
+        cursor.execute('SELECT version, applied_at FROM schema_migrations')
+        applied = {row['version']: row['applied_at'] for row in cursor.fetchall()}
+        conn.commit()
+        return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+    finally:
+        cursor.close()
@@ -0,0 +1,530 @@
+"""
+Schema migration registry
+
+Append new migrations at the bottom with the next version number.
+Never edit a migration that has shipped; add a new one instead.
+
+Versions 1-4 fold in what used to be spread across init_db(),
+migration_complete_schema_update.py, migration_payment_instalments.py,
+migration_schema_update.sql and add_mobile_number_column.sql.
+"""
+
+from database import is_sqlite
+from migrations import migration, add_missing_columns, get_table_columns, create_index
+
+
+def auto_id():
+    """Auto-increment primary key definition for the active engine"""
+    return 'INTEGER PRIMARY KEY AUTOINCREMENT' if is_sqlite() else 'INT AUTO_INCREMENT PRIMARY KEY'
+
+
+PURCHASE_SLIPS_COLUMNS = '''
+    company_name TEXT,
+    company_address TEXT,
+    document_type VARCHAR(255) DEFAULT 'Purchase Slip',
+    vehicle_no VARCHAR(255),
+    date DATETIME NOT NULL,
+    bill_no INT NOT NULL,
+    party_name TEXT,
+    mobile_number VARCHAR(15) DEFAULT '',
+    material_name TEXT,
+    ticket_no VARCHAR(255),
+    broker VARCHAR(255),
+    terms_of_delivery TEXT,
+    sup_inv_no VARCHAR(255),
+    gst_no VARCHAR(255),
+    bags DOUBLE DEFAULT 0,
+    avg_bag_weight DOUBLE DEFAULT 0,
+    net_weight DOUBLE DEFAULT 0,
+    net_weight_kg DOUBLE DEFAULT 0,
+    gunny_weight_kg DOUBLE DEFAULT 0,
+    final_weight_kg DOUBLE DEFAULT 0,
+    weight_quintal DOUBLE DEFAULT 0,
+    weight_khandi DOUBLE DEFAULT 0,
+    shortage_kg DOUBLE DEFAULT 0,
+    rate DOUBLE DEFAULT 0,
+    rate_basis VARCHAR(50) DEFAULT 'Quintal',
+    rate_value DOUBLE DEFAULT 0,
+    calculated_rate DOUBLE DEFAULT 0,
+    total_purchase_amount DOUBLE DEFAULT 0,
+    amount DOUBLE DEFAULT 0,
+    bank_commission DOUBLE DEFAULT 0,
+    postage DOUBLE DEFAULT 0,
+    batav_percent DOUBLE DEFAULT 0,
+    batav DOUBLE DEFAULT 0,
+    shortage_percent DOUBLE DEFAULT 0,
+    shortage DOUBLE DEFAULT 0,
+    dalali_rate DOUBLE DEFAULT 0,
+    dalali DOUBLE DEFAULT 0,
+    hammali_rate DOUBLE DEFAULT 0,
+    hammali DOUBLE DEFAULT 0,
+    freight DOUBLE DEFAULT 0,
+    rate_diff DOUBLE DEFAULT 0,
+    quality_diff DOUBLE DEFAULT 0,
+    quality_diff_comment TEXT,
+    moisture_ded DOUBLE DEFAULT 0,
+    moisture_ded_comment TEXT,
+    moisture_ded_percent DOUBLE DEFAULT 0,
+    tds DOUBLE DEFAULT 0,
+    total_deduction DOUBLE DEFAULT 0,
+    payable_amount DOUBLE DEFAULT 0,
+    payment_method VARCHAR(255),
+    payment_date DATETIME,
+    payment_amount DOUBLE DEFAULT 0,
+    payment_bank_account TEXT,
+    payment_due_date DATETIME,
+    payment_due_comment TEXT,
+    instalment_1_date DATETIME,
+    instalment_1_amount DOUBLE DEFAULT 0,
+    instalment_1_comment TEXT,
+    instalment_1_payment_method VARCHAR(255),
+    instalment_1_payment_bank_account TEXT,
+    instalment_2_date DATETIME,
+    instalment_2_amount DOUBLE DEFAULT 0,
+    instalment_2_comment TEXT,
+    instalment_2_payment_method VARCHAR(255),
+    instalment_2_payment_bank_account TEXT,
+    instalment_3_date DATETIME,
+    instalment_3_amount DOUBLE DEFAULT 0,
+    instalment_3_comment TEXT,
+    instalment_3_payment_method VARCHAR(255),
+    instalment_3_payment_bank_account TEXT,
+    instalment_4_date DATETIME,
+    instalment_4_amount DOUBLE DEFAULT 0,
+    instalment_4_comment TEXT,
+    instalment_4_payment_method VARCHAR(255),
+    instalment_4_payment_bank_account TEXT,
+    instalment_5_date DATETIME,
+    instalment_5_amount DOUBLE DEFAULT 0,
+    instalment_5_comment TEXT,
+    instalment_5_payment_method VARCHAR(255),
+    instalment_5_payment_bank_account TEXT,
+    prepared_by VARCHAR(255),
+    authorised_sign VARCHAR(255),
+    paddy_unloading_godown TEXT
+'''
+
+# Columns that databases created by older builds may be missing
+LEGACY_MISSING_COLUMNS = {
+    'mobile_number': "VARCHAR(15) DEFAULT ''",
+    'shortage_kg': "DOUBLE DEFAULT 0",
+    'rate_basis': "VARCHAR(50) DEFAULT 'Quintal'",
+    'calculated_rate': "DOUBLE DEFAULT 0",
+    'postage': "DOUBLE DEFAULT 0",
+    'freight': "DOUBLE DEFAULT 0",
+    'rate_diff': "DOUBLE DEFAULT 0",
+    'quality_diff': "DOUBLE DEFAULT 0",
+    'quality_diff_comment': "TEXT",
+    'moisture_ded': "DOUBLE DEFAULT 0",
+    'moisture_ded_comment': "TEXT",
+    'moisture_ded_percent': "DOUBLE DEFAULT 0",
+    'tds': "DOUBLE DEFAULT 0",
+    'payment_due_comment': "TEXT",
+    'payment_bank_account': "TEXT",
+    'prepared_by': "VARCHAR(255)",
+    'authorised_sign': "VARCHAR(255)",
+    'paddy_unloading_godown': "TEXT",
+    'net_weight_kg': "DOUBLE DEFAULT 0",
+    'gunny_weight_kg': "DOUBLE DEFAULT 0",
+    'final_weight_kg': "DOUBLE DEFAULT 0",
+    'weight_quintal': "DOUBLE DEFAULT 0",
+    'weight_khandi': "DOUBLE DEFAULT 0",
+    'rate_value': "DOUBLE DEFAULT 0",
+    'total_purchase_amount': "DOUBLE DEFAULT 0",
+}
+for _i in range(1, 6):
+    LEGACY_MISSING_COLUMNS.update({
+        f'instalment_{_i}_date': "DATETIME",
+        f'instalment_{_i}_amount': "DOUBLE DEFAULT 0",
+        f'instalment_{_i}_comment': "TEXT",
+        f'instalment_{_i}_payment_method': "VARCHAR(255)",
+        f'instalment_{_i}_payment_bank_account': "TEXT",
+    })
+
+DATETIME_COLUMNS = [
+    'date', 'payment_date', 'payment_due_date',
+    'instalment_1_date', 'instalment_2_date', 'instalment_3_date',
+    'instalment_4_date', 'instalment_5_date'
+]
+
+
+@migration(1, 'base_tables')
+def create_base_tables(cursor):
+    """purchase_slips, users and unloading_godowns"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS purchase_slips (
+            id {auto_id()},
+            {PURCHASE_SLIPS_COLUMNS}
+        )
+    ''')
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            id {auto_id()},
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            full_name VARCHAR(255),
+            role VARCHAR(50) DEFAULT 'user',
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP NULL
+        )
+    ''')
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS unloading_godowns (
+            id {auto_id()},
+            name VARCHAR(255) UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    create_index(cursor, 'purchase_slips', 'idx_date', 'date')
+    create_index(cursor, 'purchase_slips', 'idx_party_name',
+                 'party_name' if is_sqlite() else 'party_name(255)')
+    create_index(cursor, 'purchase_slips', 'idx_bill_no', 'bill_no')
+
+
+@migration(2, 'legacy_slip_columns')
+def add_legacy_slip_columns(cursor):
+    """Weight/rate/deduction/instalment columns added over the project's life"""
+    add_missing_columns(cursor, 'purchase_slips', LEGACY_MISSING_COLUMNS)
+
+
+@migration(3, 'datetime_columns')
+def convert_datetime_columns(cursor):
+    """
+    Older schemas stored dates as DATE/TEXT. Convert only the columns that
+    are not DATETIME yet, in one ALTER, so the table is rebuilt at most once.
+    SQLite columns are dynamically typed, so nothing to do there.
+    """
+    if is_sqlite():
+        return
+
+    existing = get_table_columns(cursor, 'purchase_slips')
+    to_convert = [col for col in DATETIME_COLUMNS
+                  if col in existing and existing[col] != 'datetime']
+    if not to_convert:
+        return
+
+    null_clause = {'date': 'NOT NULL'}
+    clauses = ', '.join(f"MODIFY COLUMN {col} DATETIME {null_clause.get(col, '')}".rstrip()
+                        for col in to_convert)
+    cursor.execute(f'ALTER TABLE purchase_slips {clauses}')
+    print(f"  ✓ Converted to DATETIME: {', '.join(to_convert)}")
+
+
+@migration(4, 'seed_defaults')
+def seed_defaults(cursor):
+    """Default admin user and unloading godowns on an empty database"""
+    insert_ignore = 'INSERT OR IGNORE' if is_sqlite() else 'INSERT IGNORE'
+
+    # Create default admin user if no users exist
+    cursor.execute("SELECT COUNT(*) as count FROM users")
+    result = cursor.fetchone()
+    user_count = result['count']
+
+    if user_count == 0:
+        cursor.execute('''
+            INSERT INTO users (username, password, full_name, role)
+            VALUES (%s, %s, %s, %s)
+        ''', ('admin', 'admin', 'Administrator', 'admin'))
+        print("✓ Default admin user created (username: admin, password: admin)")
+
+    # Add default unloading godowns if table is empty
+    cursor.execute("SELECT COUNT(*) as count FROM unloading_godowns")
+    result = cursor.fetchone()
+    godown_count = result['count']
+
+    if godown_count == 0:
+        default_godowns = [
+            'Godown A',
+            'Godown B',
+            'Main Warehouse',
+            'Storage Unit 1'
+        ]
+        for godown in default_godowns:
+            cursor.execute(f'{insert_ignore} INTO unloading_godowns (name) VALUES (%s)', (godown,))
+        print(f"✓ Added {len(default_godowns)} default unloading godowns")
+
+
+@migration(5, 'bill_sequences')
+def create_bill_sequences(cursor):
+    """
+    Sequence table for atomic bill number allocation, seeded from the
+    current MAX(bill_no), plus UNIQUE (bill_series, bill_no) on slips.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bill_sequences (
+            series VARCHAR(32) PRIMARY KEY,
+            next_value INT NOT NULL
+        )
+    ''')
+
+    add_missing_columns(cursor, 'purchase_slips', {
+        'bill_series': "VARCHAR(32) NOT NULL DEFAULT 'default'"
+    })
+
+    cursor.execute('SELECT MAX(bill_no) AS max_bill FROM purchase_slips')
+    max_bill = cursor.fetchone()['max_bill'] or 0
+    cursor.execute('SELECT COUNT(*) AS count FROM bill_sequences WHERE series = %s', ('default',))
+    if cursor.fetchone()['count'] == 0:
+        cursor.execute(
+            'INSERT INTO bill_sequences (series, next_value) VALUES (%s, %s)',
+            ('default', max_bill + 1)
+        )
+
+    cursor.execute('''
+        SELECT bill_no, COUNT(*) AS count
+        FROM purchase_slips
+        GROUP BY bill_series, bill_no
+        HAVING COUNT(*) > 1
+    ''')
+    duplicates = cursor.fetchall()
+    if duplicates:
+        # Never renumber issued bills; new saves are still protected by the allocator
+        print("  ⚠ Duplicate bill numbers already exist, UNIQUE index not created: "
+              + ', '.join(str(row['bill_no']) for row in duplicates[:20]))
+        return
+
+    create_index(cursor, 'purchase_slips', 'uq_bill_series_no', 'bill_series, bill_no', unique=True)
+
+
+@migration(6, 'row_counters')
+def create_row_counters(cursor):
+    """Maintained row counts so list endpoints never run COUNT(*) per request"""
+    from database import rebuild_row_counter
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS row_counters (
+            table_name VARCHAR(64) PRIMARY KEY,
+            row_count BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    rebuild_row_counter(cursor, 'purchase_slips')
+
+
+# Composite indexes behind the /api/slips filters. InnoDB and SQLite both
+# append the primary key to secondary indexes, so (x, date) also serves
+# ORDER BY date, id within one x.
+SLIP_FILTER_INDEXES = [
+    ('idx_party_date', ['party_name', 'date']),
+    ('idx_broker_date', ['broker', 'date']),
+    ('idx_material_date', ['material_name', 'date']),
+    ('idx_godown_date', ['paddy_unloading_godown', 'date']),
+    ('idx_rate_basis_date', ['rate_basis', 'date']),
+    ('idx_vehicle_no', ['vehicle_no']),
+    ('idx_ticket_no', ['ticket_no']),
+]
+
+# TEXT columns that need to become VARCHAR to be fully indexable in MySQL
+FILTER_TEXT_COLUMNS = ['party_name', 'material_name', 'paddy_unloading_godown']
+
+
+@migration(7, 'slip_filter_indexes')
+def create_slip_filter_indexes(cursor):
+    """
+    Replace the idx_party_name (party_name(255)) prefix index with
+    composite filter indexes. On MySQL the filtered TEXT columns become
+    VARCHAR(255) first (skipped for a column holding longer values, which
+    keeps a prefix index), all in one ALTER so the table is rebuilt once.
+    """
+    from migrations import index_exists
+
+    if is_sqlite():
+        for index_name, columns in SLIP_FILTER_INDEXES:
+            create_index(cursor, 'purchase_slips', index_name, ', '.join(columns))
+        cursor.execute('DROP INDEX IF EXISTS idx_party_name')
+        return
+
+    existing = get_table_columns(cursor, 'purchase_slips')
+    clauses = []
+    still_text = set()
+    for column in FILTER_TEXT_COLUMNS:
+        if existing.get(column) != 'text':
+            continue
+        cursor.execute(f'SELECT COALESCE(MAX(CHAR_LENGTH({column})), 0) AS longest FROM purchase_slips')
+        if cursor.fetchone()['longest'] <= 255:
+            clauses.append(f'MODIFY COLUMN {column} VARCHAR(255)')
+        else:
+            print(f"  ⚠ {column} has values longer than 255 characters; keeping TEXT with a prefix index")
+            still_text.add(column)
+
+    for index_name, columns in SLIP_FILTER_INDEXES:
+        if not index_exists(cursor, 'purchase_slips', index_name):
+            parts = [f'{col}(191)' if col in still_text else col for col in columns]
+            clauses.append(f"ADD INDEX {index_name} ({', '.join(parts)})")
+
+    if index_exists(cursor, 'purchase_slips', 'idx_party_name'):
+        clauses.append('DROP INDEX idx_party_name')
+
+    if clauses:
+        cursor.execute(f"ALTER TABLE purchase_slips {', '.join(clauses)}")
+        print(f"  ✓ Applied {len(clauses)} change(s) to purchase_slips in one ALTER")
+
+
+@migration(8, 'purchase_slip_payments')
+def create_purchase_slip_payments(cursor):
+    """
+    Normalized instalment table (unlimited payments per slip), backfilled
+    from the fixed instalment_{1..5}_* columns. The fixed columns stay as a
+    mirror of the first five payments for older clients and templates.
+    """
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS purchase_slip_payments (
+            id {auto_id()},
+            slip_id INT NOT NULL,
+            instalment_no INT NOT NULL,
+            payment_date DATETIME,
+            amount DOUBLE DEFAULT 0,
+            payment_method VARCHAR(255),
+            payment_bank_account VARCHAR(255),
+            comment TEXT,
+            FOREIGN KEY (slip_id) REFERENCES purchase_slips(id) ON DELETE CASCADE
+        )
+    ''')
+
+    create_index(cursor, 'purchase_slip_payments', 'uq_payment_slip_no', 'slip_id, instalment_no', unique=True)
+    create_index(cursor, 'purchase_slip_payments', 'idx_payment_date', 'payment_date')
+    create_index(cursor, 'purchase_slip_payments', 'idx_payment_method_date', 'payment_method, payment_date')
+    create_index(cursor, 'purchase_slip_payments', 'idx_payment_bank_date', 'payment_bank_account, payment_date')
+
+    cursor.execute('SELECT COUNT(*) AS count FROM purchase_slip_payments')
+    if cursor.fetchone()['count'] > 0:
+        return
+
+    for i in range(1, 6):
+        cursor.execute(f'''
+            INSERT INTO purchase_slip_payments (
+                slip_id, instalment_no, payment_date, amount,
+                payment_method, payment_bank_account, comment
+            )
+            SELECT id, {i}, instalment_{i}_date, COALESCE(instalment_{i}_amount, 0),
+                   instalment_{i}_payment_method,
+                   SUBSTR(instalment_{i}_payment_bank_account, 1, 255),
+                   instalment_{i}_comment
+            FROM purchase_slips
+            WHERE COALESCE(instalment_{i}_amount, 0) <> 0
+               OR instalment_{i}_date IS NOT NULL
+               OR COALESCE(instalment_{i}_comment, '') <> ''
+               OR COALESCE(instalment_{i}_payment_method, '') <> ''
+               OR COALESCE(instalment_{i}_payment_bank_account, '') <> ''
+        ''')
+    cursor.execute('SELECT COUNT(*) AS count FROM purchase_slip_payments')
+    print(f"  ✓ Backfilled {cursor.fetchone()['count']} payment row(s)")
+
+
+@migration(9, 'stored_payment_totals')
+def add_stored_payment_totals(cursor):
+    """
+    Persist total_paid_amount / balance_amount on purchase_slips so the
+    outstanding-dues list is a range scan on idx_balance_amount. add_slip and
+    update_slip keep both columns in step with purchase_slip_payments.
+    """
+    add_missing_columns(cursor, 'purchase_slips', {
+        'total_paid_amount': 'DOUBLE DEFAULT 0',
+        'balance_amount': 'DOUBLE DEFAULT 0',
+    })
+
+    paid = '''(SELECT COALESCE(SUM(p.amount), 0) FROM purchase_slip_payments p
+        WHERE p.slip_id = purchase_slips.id)'''
+    cursor.execute(f'''
+        UPDATE purchase_slips SET
+            total_paid_amount = ROUND({paid}, 2),
+            balance_amount = ROUND(COALESCE(payable_amount, 0) - {paid}, 2)
+    ''')
+    print(f"  ✓ Backfilled payment totals on {cursor.rowcount} slip(s)")
+
+    create_index(cursor, 'purchase_slips', 'idx_balance_amount', 'balance_amount')
+
+
+@migration(10, 'party_ledger')
+def create_party_ledger(cursor):
+    """
+    Per-party running totals maintained by the slip write routes
+    (see aggregates.py), seeded from the existing slips.
+    """
+    from slip_schema import ist_now
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS party_ledger (
+            party_name VARCHAR(255) PRIMARY KEY,
+            slip_count INT NOT NULL DEFAULT 0,
+            total_weight_kg DOUBLE NOT NULL DEFAULT 0,
+            total_payable DOUBLE NOT NULL DEFAULT 0,
+            total_paid DOUBLE NOT NULL DEFAULT 0,
+            balance DOUBLE NOT NULL DEFAULT 0,
+            updated_at DATETIME
+        )
+    ''')
+    create_index(cursor, 'party_ledger', 'idx_party_ledger_balance', 'balance')
+
+    cursor.execute('DELETE FROM party_ledger')
+    cursor.execute('''
+        INSERT INTO party_ledger (
+            party_name, slip_count, total_weight_kg, total_payable,
+            total_paid, balance, updated_at
+        )
+        SELECT TRIM(COALESCE(party_name, '')), COUNT(*),
+               ROUND(SUM(COALESCE(final_weight_kg, 0)), 3),
+               ROUND(SUM(COALESCE(payable_amount, 0)), 2),
+               ROUND(SUM(COALESCE(total_paid_amount, 0)), 2),
+               ROUND(SUM(COALESCE(payable_amount, 0) - COALESCE(total_paid_amount, 0)), 2),
+               %s
+        FROM purchase_slips
+        GROUP BY TRIM(COALESCE(party_name, ''))
+    ''', (ist_now(),))
+    print(f"  ✓ Seeded party_ledger with {cursor.rowcount} party row(s)")
+
+
+@migration(11, 'slip_rollups')
+def create_slip_rollups(cursor):
+    """
+    Day / month intake totals per (dimension, value) for the summary reports,
+    maintained by the slip write routes and backfilled here from the
+    existing slips (the same job as manage.py rebuild-rollups).
+    """
+    from aggregates import rebuild_rollups
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS slip_rollups (
+            grain VARCHAR(8) NOT NULL,
+            dimension VARCHAR(16) NOT NULL,
+            period_start DATE NOT NULL,
+            dimension_value VARCHAR(255) NOT NULL,
+            slip_count INT NOT NULL DEFAULT 0,
+            bags DOUBLE NOT NULL DEFAULT 0,
+            final_weight_kg DOUBLE NOT NULL DEFAULT 0,
+            weight_quintal DOUBLE NOT NULL DEFAULT 0,
+            total_purchase_amount DOUBLE NOT NULL DEFAULT 0,
+            total_deduction DOUBLE NOT NULL DEFAULT 0,
+            payable_amount DOUBLE NOT NULL DEFAULT 0,
+            updated_at DATETIME,
+            PRIMARY KEY (grain, dimension, period_start, dimension_value)
+        )
+    ''')
+    print(f"  ✓ Backfilled {rebuild_rollups(cursor)} rollup row(s)")
+
+
+@migration(12, 'row_versions')
+def add_row_versions(cursor):
+    """
+    row_version / updated_at on purchase_slips, bumped by every write, back
+    the ETag / Last-Modified validators of the slip read routes.
+    row_counters.version does the same for the slip list as a whole.
+    """
+    from database import utc_now
+
+    add_missing_columns(cursor, 'purchase_slips', {
+        'row_version': 'INT NOT NULL DEFAULT 1',
+        'updated_at': 'DATETIME NULL',
+    })
+    add_missing_columns(cursor, 'row_counters', {
+        'version': 'BIGINT NOT NULL DEFAULT 0',
+        'updated_at': 'DATETIME NULL',
+    })
+
+    now = utc_now()
+    cursor.execute('UPDATE purchase_slips SET updated_at = %s WHERE updated_at IS NULL', (now,))
+    print(f"  ✓ Stamped updated_at on {cursor.rowcount} slip(s)")
+    cursor.execute('UPDATE row_counters SET updated_at = %s WHERE updated_at IS NULL', (now,))
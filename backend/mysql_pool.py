@@ -0,0 +1,323 @@
+"""
+MySQL connection pool
+
+Replaces mysql.connector's MySQLConnectionPool, which database.py used with
+a ping on every checkout and a session reset on every release:
+
+- a connection is validated (one ping, no retries) only when it has been
+  idle for longer than `validate_after` seconds; if the ping fails it is
+  replaced once, so a MySQL restart costs one reconnect instead of a
+  3 x 2 s ping loop on every request
+- session settings (`session_sql`) run once per physical connection. On
+  release the pool rolls back an unfinished transaction and reads any
+  unread results; it doesn't reset the session
+- the pool opens `min_size` connections up front and grows up to
+  `max_size` on demand. Connections idle for longer than `idle_timeout`
+  are closed again, down to `min_size`
+- when all connections are in use, get_connection() waits up to
+  `wait_timeout` seconds for one (PoolTimeout). At most `max_waiters`
+  requests wait; beyond that it fails at once (PoolExhausted) instead of
+  piling up requests behind the database
+- stats() reports the size, the waits and the failures
+
+Handed-out connections are the driver's own connection objects behind a
+thin wrapper whose close() returns them to the pool; their cursors report
+the time spent in execute / fetch as the request's db time (metrics.py).
+"""
+
+import threading
+import time
+from collections import deque
+
+from mysql.connector import errors
+
+from metrics import add_time
+
+_perf_counter = time.perf_counter
+
+
+class PoolTimeout(errors.PoolError):
+    """No connection became free within wait_timeout"""
+
+
+class PoolExhausted(errors.PoolError):
+    """Every connection is in use and the wait queue is full"""
+
+
+class TimedCursor:
+    """Driver cursor whose execute / fetch time counts as db time"""
+
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = _perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            add_time('db', _perf_counter() - start)
+
+    def executemany(self, operation, seq_params):
+        start = _perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            add_time('db', _perf_counter() - start)
+
+    def fetchone(self):
+        start = _perf_counter()
+        try:
+            return self._cursor.fetchone()
+        finally:
+            add_time('db', _perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = _perf_counter()
+        try:
+            return self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        finally:
+            add_time('db', _perf_counter() - start)
+
+    def fetchall(self):
+        start = _perf_counter()
+        try:
+            return self._cursor.fetchall()
+        finally:
+            add_time('db', _perf_counter() - start)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class PooledConnection:
+    """Checked-out connection; close() hands it back to the pool"""
+
+    __slots__ = ('_pool', '_conn')
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self.__getattr__('cursor')(*args, **kwargs))
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise errors.OperationalError('Connection has been returned to the pool')
+        return getattr(conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._release(conn)
+
+
+class MySQLPool:
+    """Thread-safe pool of mysql.connector connections"""
+
+    def __init__(self, connect, min_size=2, max_size=10, wait_timeout=10.0, max_waiters=32,
+                 validate_after=30.0, idle_timeout=300.0, session_sql=()):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.max_waiters = max_waiters
+        self.validate_after = validate_after
+        self.idle_timeout = idle_timeout
+        self.session_sql = tuple(session_sql)
+
+        self._cond = threading.Condition()
+        # (connection, last released at); the newest end is reused first so
+        # the oldest connections go idle and are closed when the load drops
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0, 'waits': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+            'timeouts': 0, 'rejected': 0, 'validations': 0, 'reconnects': 0,
+            'opened': 0, 'closed': 0,
+        }
+
+        # Like MySQLConnectionPool, fail here if the server can't be reached
+        opened = []
+        try:
+            for _ in range(min_size):
+                opened.append(self._open())
+        except Exception:
+            for conn in opened:
+                self._close(conn)
+            raise
+        now = time.monotonic()
+        self._size = len(opened)
+        self._idle.extend((conn, now) for conn in opened)
+
+    def _open(self):
+        conn = self._connect()
+        try:
+            if self.session_sql:
+                cursor = conn.cursor()
+                try:
+                    for statement in self.session_sql:
+                        cursor.execute(statement)
+                finally:
+                    cursor.close()
+        except Exception:
+            self._close(conn)
+            raise
+        with self._cond:
+            self._stats['opened'] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['closed'] += 1
+
+    def get_connection(self):
+        """Check out a connection, waiting up to wait_timeout for a free one"""
+        started = time.monotonic()
+        conn = None
+        with self._cond:
+            if self._closed:
+                raise errors.PoolError('Connection pool is closed')
+            if not self._idle and self._size >= self.max_size:
+                if self._waiting >= self.max_waiters:
+                    self._stats['rejected'] += 1
+                    raise PoolExhausted(
+                        f'All {self.max_size} database connections are busy '
+                        f'and {self._waiting} requests are already waiting')
+                self._waiting += 1
+                self._stats['waits'] += 1
+                try:
+                    deadline = started + self.wait_timeout
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._closed:
+                            self._stats['timeouts'] += 1
+                            raise PoolTimeout(
+                                f'No database connection became free within {self.wait_timeout:g}s')
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            expired = self._take_expired()
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                # Reserve the slot; the connection is opened outside the lock
+                self._size += 1
+                last_used = None
+
+            waited = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds_total'] += waited
+            if waited > self._stats['wait_seconds_max']:
+                self._stats['wait_seconds_max'] = waited
+
+        for idle_conn in expired:
+            self._close(idle_conn)
+
+        try:
+            if conn is None:
+                conn = self._open()
+            elif time.monotonic() - last_used > self.validate_after:
+                conn = self._validate(conn)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, conn)
+
+    def _validate(self, conn):
+        """Ping a connection that sat idle; replace it once if it is dead"""
+        with self._cond:
+            self._stats['validations'] += 1
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except errors.Error:
+            self._close(conn)
+            with self._cond:
+                self._stats['reconnects'] += 1
+            return self._open()
+
+    def _release(self, conn):
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            keep = reusable and not self._closed
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+            expired = self._take_expired()
+            self._cond.notify()
+
+        if not keep:
+            self._close(conn)
+        for idle_conn in expired:
+            self._close(idle_conn)
+
+    def _take_expired(self):
+        """Idle connections past idle_timeout, down to min_size (call with the lock held)"""
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def close_idle(self):
+        """Close the idle connections (e.g. after the server restarted)"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def close_all(self):
+        """Close the idle connections; checked-out ones close when released"""
+        with self._cond:
+            self._closed = True
+        self.close_idle()
+
+    def stats(self):
+        """Sizes and checkout counters (wait times in milliseconds)"""
+        with self._cond:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            stats.update(
+                size=self._size, idle=idle, in_use=self._size - idle, waiting=self._waiting,
+                min_size=self.min_size, max_size=self.max_size,
+            )
+        total = stats.pop('wait_seconds_total')
+        stats['wait_ms_total'] = round(total * 1000, 1)
+        stats['wait_ms_max'] = round(stats.pop('wait_seconds_max') * 1000, 1)
+        stats['wait_ms_avg'] = round(total * 1000 / stats['checkouts'], 2) if stats['checkouts'] else 0.0
+        return stats
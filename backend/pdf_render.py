@@ -0,0 +1,321 @@
+"""
+PDF rendering for purchase slips
+
+Slip HTML is rendered with Flask's templates in the request and converted to
+PDF by wkhtmltopdf. Conversions go through one render service:
+
+- PDF_WORKERS worker threads (default: CPU count) take jobs from a bounded
+  queue, so at most PDF_WORKERS wkhtmltopdf processes render at any time
+- the HTML is written to wkhtmltopdf's stdin and the PDF read from its
+  stdout; nothing touches the disk
+- each worker keeps a warm wkhtmltopdf process: started ahead of the next
+  job, it has already loaded its libraries and initialised Qt and sits
+  waiting for the HTML on stdin, so a job doesn't wait for process start-up
+  (PDF_WARM_PROCESSES=0 turns this off)
+- a job that runs longer than PDF_JOB_TIMEOUT seconds is killed
+- when PDF_QUEUE_LIMIT jobs are already waiting, submit() waits up to
+  PDF_SUBMIT_WAIT seconds for room and then raises RendererBusy, which the
+  routes answer with 503
+
+wkhtmltopdf has no server mode: a process reads one document up to EOF,
+writes one PDF and exits. So a warm process is still used for one job
+only, and the worker starts the next one as soon as it is done. That takes
+the start-up off the job's latency, not off the machine's CPU.
+
+The workers are threads because the conversion itself runs in the
+wkhtmltopdf child process; a thread only feeds and drains its pipes.
+pdfkit and pypdf are imported on first use, so they add nothing to startup.
+
+A batch is returned either as one merged PDF (needs pypdf) or as a ZIP with
+one PDF per slip, written to the client as each PDF is finished. A render
+that fails once the ZIP is under way can't change the response status any
+more; the archive is closed with the PDFs done so far plus an ERRORS.txt
+entry naming the missing ones.
+"""
+
+import importlib.util
+import io
+import os
+import queue
+import subprocess
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import timed
+
+# Checked without importing; the modules load on the first PDF
+PDFKIT_AVAILABLE = importlib.util.find_spec('pdfkit') is not None
+if not PDFKIT_AVAILABLE:
+    print("Warning: pdfkit not available. PDF generation will be disabled.")
+
+PYPDF_AVAILABLE = importlib.util.find_spec('pypdf') is not None
+
+PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '10mm',
+    'margin-right': '10mm',
+    'margin-bottom': '10mm',
+    'margin-left': '10mm',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'enable-local-file-access': None
+}
+
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS') or os.cpu_count() or 2)
+PDF_QUEUE_LIMIT = int(os.environ.get('PDF_QUEUE_LIMIT') or PDF_WORKERS * 8)
+PDF_JOB_TIMEOUT = float(os.environ.get('PDF_JOB_TIMEOUT') or 60)
+PDF_SUBMIT_WAIT = float(os.environ.get('PDF_SUBMIT_WAIT') or 10)
+PDF_WARM_PROCESSES = os.environ.get('PDF_WARM_PROCESSES', '1').strip().lower() not in ('0', 'false', 'no')
+
+# Added to a batch ZIP that stopped early
+ZIP_ERRORS_FILENAME = 'ERRORS.txt'
+
+
+class RendererBusy(Exception):
+    """The render queue stayed full for PDF_SUBMIT_WAIT seconds"""
+
+
+def wkhtmltopdf_command(html_content):
+    """wkhtmltopdf argv reading HTML from stdin and writing the PDF to stdout"""
+    import pdfkit
+
+    return pdfkit.PDFKit(html_content, 'string', options=PDF_OPTIONS).command()
+
+
+def start_wkhtmltopdf(command):
+    """Start wkhtmltopdf; it initialises and then blocks reading the HTML from stdin"""
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def stop_process(process):
+    """Kill an unused or stuck wkhtmltopdf and reap it"""
+    process.kill()
+    process.communicate()
+
+
+def run_wkhtmltopdf(html_content, timeout=PDF_JOB_TIMEOUT, process=None):
+    """
+    Convert one HTML document over pipes; kills wkhtmltopdf after `timeout`
+    seconds. `process` is a warm wkhtmltopdf started with this document's
+    command line; without one a new process is started.
+    """
+    if process is None:
+        process = start_wkhtmltopdf(wkhtmltopdf_command(html_content))
+    try:
+        pdf, errors = process.communicate(html_content.encode('utf-8'), timeout=timeout)
+    except subprocess.TimeoutExpired:
+        stop_process(process)
+        raise TimeoutError(f'wkhtmltopdf did not finish within {timeout:g}s')
+
+    # wkhtmltopdf exits 1 on some resource warnings but still writes the PDF
+    if not pdf.startswith(b'%PDF'):
+        raise IOError(f"wkhtmltopdf failed (exit {process.returncode}): "
+                      f"{errors.decode('utf-8', 'replace').strip()}")
+    return pdf
+
+
+class PdfRenderService:
+    """Fixed set of worker threads, each with a warm wkhtmltopdf, converting HTML from a bounded queue"""
+
+    def __init__(self, workers=PDF_WORKERS, queue_limit=PDF_QUEUE_LIMIT, timeout=PDF_JOB_TIMEOUT,
+                 warm=PDF_WARM_PROCESSES):
+        self.workers = workers
+        self.timeout = timeout
+        self.warm = warm
+        self.jobs = queue.Queue(maxsize=queue_limit)
+        self.stopping = False
+        # Jobs that found a warm process / had to start their own
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.threads = []
+        for number in range(workers):
+            thread = threading.Thread(target=self._work, name=f'pdf-render-{number + 1}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _start_warm(self):
+        """A wkhtmltopdf for the next job, or None (disabled, or it can't start)"""
+        if not self.warm or self.stopping:
+            return None
+        try:
+            # The command line only depends on the HTML through pdfkit <meta>
+            # options, which the slip templates don't use
+            return start_wkhtmltopdf(wkhtmltopdf_command(''))
+        except OSError:
+            # Not installed / not runnable: the job reports the error itself
+            return None
+
+    def _work(self):
+        spare = self._start_warm()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None or self.stopping:
+                    if job is not None:
+                        job[1].cancel()
+                    # Pass the stop signal on to the next idle worker
+                    self._post_stop()
+                    break
+                html_content, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                process, spare = spare, None
+                try:
+                    if process is not None and (process.poll() is not None
+                                                or process.args != wkhtmltopdf_command(html_content)):
+                        stop_process(process)
+                        process = None
+                    if process is None:
+                        self.cold_starts += 1
+                    else:
+                        self.warm_starts += 1
+                    future.set_result(run_wkhtmltopdf(html_content, self.timeout, process))
+                except Exception as e:
+                    future.set_exception(e)
+                spare = self._start_warm()
+        finally:
+            if spare is not None:
+                stop_process(spare)
+
+    def submit(self, html_content, wait=PDF_SUBMIT_WAIT):
+        """Queue one conversion; returns a Future with the PDF bytes"""
+        if self.stopping:
+            raise RendererBusy('PDF renderer is shutting down')
+        future = Future()
+        try:
+            self.jobs.put((html_content, future), timeout=wait)
+        except queue.Full:
+            raise RendererBusy('PDF renderer is busy, try again shortly')
+        return future
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    def shutdown(self):
+        """Cancel queued jobs and stop the workers once running jobs finish"""
+        self.stopping = True
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[1].cancel()
+        # Wake an idle worker, which wakes the next one. Never block here: if
+        # the queue refilled in the meantime, workers stop at their next job
+        self._post_stop()
+
+    def _post_stop(self):
+        try:
+            self.jobs.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+_render_service = None
+_render_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """Shared render service, started on first use"""
+    global _render_service
+    with _render_service_lock:
+        if _render_service is None:
+            _render_service = PdfRenderService()
+        return _render_service
+
+
+def shutdown_render_service():
+    """Stop the render workers (server shutdown)"""
+    global _render_service
+    with _render_service_lock:
+        if _render_service is not None:
+            _render_service.shutdown()
+            _render_service = None
+
+
+def render_pdf(html_content):
+    """HTML document -> PDF bytes through the render service"""
+    with timed('pdf'):
+        return get_render_service().submit(html_content).result()
+
+
+def iter_rendered_pdfs(html_documents):
+    """
+    Yield PDF bytes for each HTML document in input order. At most two
+    jobs per worker are queued at a time, so a large batch neither fills
+    the queue for other requests nor holds every PDF in memory.
+    """
+    service = get_render_service()
+    window = service.workers * 2
+    in_flight = deque()
+    for html_content in html_documents:
+        if len(in_flight) >= window:
+            yield _wait_for(in_flight.popleft())
+        in_flight.append(service.submit(html_content))
+    while in_flight:
+        yield _wait_for(in_flight.popleft())
+
+
+def _wait_for(future):
+    with timed('pdf'):
+        return future.result()
+
+
+def merge_pdfs(pdfs):
+    """Concatenate PDF documents (bytes) into one PDF (bytes)"""
+    if not PYPDF_AVAILABLE:
+        raise ValueError('Merged PDF output requires pypdf (pip install pypdf). Use format=zip.')
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for pdf in pdfs:
+        writer.append(io.BytesIO(pdf))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+class _ZipChunks(io.RawIOBase):
+    """Write-only sink for zipfile that hands the written bytes back in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip_pdfs(filenames, pdfs):
+    """
+    ZIP archive bytes, one chunk per PDF. zipfile writes to a non-seekable
+    sink with data descriptors, so each entry goes out as soon as it is rendered.
+    """
+    sink = _ZipChunks()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        done = 0
+        try:
+            for filename, pdf in zip(filenames, pdfs):
+                archive.writestr(filename, pdf)
+                done += 1
+                yield sink.take()
+        except Exception as e:
+            # The 200 and the first entries are already sent: end with a valid archive
+            print(f"❌ Batch ZIP stopped after {done} of {len(filenames)} PDFs: {e}")
+            missing = '\n'.join(filenames[done:])
+            archive.writestr(ZIP_ERRORS_FILENAME,
+                             f'Rendering stopped after {done} of {len(filenames)} PDFs: {e}\n\n'
+                             f'Not included:\n{missing}\n')
+    yield sink.take()
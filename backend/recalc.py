@@ -0,0 +1,211 @@
+"""
+Batch recalculation of slip financials
+
+Used when a rate (dalali, hammali, batav %, ...) changes retroactively for
+a set of slips. Slips matching the list filters are loaded in id order,
+CHUNK_SIZE rows at a time, into one list per column. The inputs are parsed
+column by column, slip_financials() (the formulas behind calculate_fields())
+is mapped over the rows and the result is compared with the stored derived
+columns. A preview reports the changed
+rows; apply writes only those rows back and moves the party ledger /
+rollups by the difference, one transaction per chunk.
+
+Each UPDATE is guarded by the row_version read with the chunk, like PATCH.
+A slip edited after it was read (a PUT, PATCH or payment in between) is
+left alone and reported in 'conflicts'; its ledger / rollup deltas are not
+applied, because they were computed from the stale row. Run the recalc
+again to pick those slips up.
+
+Sharing slip_financials() keeps every value identical to calculate_fields()
+for the same inputs (verify=True still checks this row by row). NumPy is
+deliberately not used: np.round() scales by 10**n and rounds half to even on
+the scaled value, which differs from round() on some half-way cases.
+"""
+
+from slip_calc import calculate_fields, slip_financials, FINANCIAL_INPUTS, FINANCIAL_COLUMNS
+from slip_filters import build_slip_filters, where_clause
+from aggregates import apply_slip_aggregates_batch, AGGREGATE_SOURCE_COLUMNS
+from database import utc_now, bump_table_version
+from slip_schema import safe_float, CALCULATION_INPUT_FIELDS, DERIVED_FIELD_INPUTS
+
+CHUNK_SIZE = 5000
+MAX_PREVIEW_ROWS = 200
+
+# Stored inputs of calculate_fields(); any of these can be overridden
+RECALC_INPUT_COLUMNS = CALCULATION_INPUT_FIELDS
+
+# Columns calculate_fields() derives from the inputs
+RECALC_DERIVED_COLUMNS = tuple(DERIVED_FIELD_INPUTS)
+
+RATE_BASES = ('Quintal', 'Khandi')
+
+
+def parse_overrides(overrides):
+    """Validate {column: value} overrides; returns typed values"""
+    parsed = {}
+    for column, value in (overrides or {}).items():
+        if column not in RECALC_INPUT_COLUMNS:
+            raise ValueError(f"'{column}' cannot be recalculated (allowed: {', '.join(RECALC_INPUT_COLUMNS)})")
+        if column == 'rate_basis':
+            if value not in RATE_BASES:
+                raise ValueError(f"rate_basis must be one of: {', '.join(RATE_BASES)}")
+            parsed[column] = value
+        else:
+            try:
+                parsed[column] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid number for {column}: {value!r}")
+    return parsed
+
+
+def recalculate_columns(columns):
+    """
+    Columnar calculate_fields(): {input column: [values]} -> {derived column: [values]}.
+    The numeric inputs are parsed a column at a time, then slip_financials()
+    is mapped over the rows.
+    """
+    inputs = [columns[name] if name == 'rate_basis' else [safe_float(value, 0) for value in columns[name]]
+              for name in FINANCIAL_INPUTS]
+    results = tuple(zip(*map(slip_financials, *inputs))) or ((),) * len(FINANCIAL_COLUMNS)
+    return {name: list(values) for name, values in zip(FINANCIAL_COLUMNS, results)}
+
+
+def load_chunk(cursor, conditions, params, after_id, limit):
+    """Next `limit` matching rows after `after_id` as {column: [values]}"""
+    select_columns = ['id', 'bill_no', 'row_version', 'total_paid_amount'] + [
+        column for column in (*RECALC_INPUT_COLUMNS, *RECALC_DERIVED_COLUMNS, *AGGREGATE_SOURCE_COLUMNS)
+        if column != 'total_paid_amount'
+    ]
+    select_columns = list(dict.fromkeys(select_columns))
+
+    cursor.execute(f'''
+        SELECT {', '.join(select_columns)}
+        FROM purchase_slips
+        {where_clause(conditions + ['id > %s'])}
+        ORDER BY id
+        LIMIT %s
+    ''', (*params, after_id, limit))
+    rows = cursor.fetchall()
+    return {column: [row[column] for row in rows] for column in select_columns}
+
+
+def verify_chunk(columns, derived):
+    """Assert the columnar results match calculate_fields() row by row"""
+    for index in range(len(columns['id'])):
+        scalar = calculate_fields({column: columns[column][index] for column in RECALC_INPUT_COLUMNS})
+        for column in RECALC_DERIVED_COLUMNS:
+            if scalar[column] != derived[column][index]:
+                raise AssertionError(
+                    f"slip {columns['id'][index]}: {column} columnar={derived[column][index]!r} "
+                    f"scalar={scalar[column]!r}"
+                )
+
+
+def recalculate_slips(conn, filters=None, overrides=None, apply=False, verify=False,
+                      chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Recalculate every slip matching `filters` (build_slip_filters() args)
+    with `overrides` applied to the inputs. Returns a summary with the first
+    MAX_PREVIEW_ROWS changed rows; writes the changes only when apply=True.
+    Slips edited concurrently are skipped: 'skipped' counts them and
+    'conflicts' lists (up to MAX_PREVIEW_ROWS of) their ids.
+    """
+    conditions, params = build_slip_filters(filters or {})
+    overrides = parse_overrides(overrides)
+    written = list(overrides) + list(RECALC_DERIVED_COLUMNS)
+
+    summary = {
+        'matched': 0, 'changed': 0, 'applied': apply, 'skipped': 0,
+        'payable_before': 0.0, 'payable_after': 0.0, 'changes': [], 'conflicts': []
+    }
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        after_id = 0
+        while True:
+            columns = load_chunk(cursor, conditions, params, after_id, chunk_size)
+            count = len(columns['id'])
+            if count == 0:
+                break
+            after_id = columns['id'][-1]
+            summary['matched'] += count
+
+            inputs = dict(columns)
+            for column, value in overrides.items():
+                inputs[column] = [value] * count
+            derived = recalculate_columns(inputs)
+            if verify:
+                verify_chunk(inputs, derived)
+
+            def new_value(column, index):
+                return inputs[column][index] if column in overrides else derived[column][index]
+
+            updates = []
+            signed_slips = []
+            for index in range(count):
+                changes = {}
+                for column in written:
+                    old, new = columns[column][index], new_value(column, index)
+                    if old != new or old is None:
+                        changes[column] = [old, new]
+                if not changes:
+                    continue
+
+                summary['changed'] += 1
+                old_payable = safe_float(columns['payable_amount'][index], 0)
+                new_payable = derived['payable_amount'][index]
+                summary['payable_before'] += old_payable
+                summary['payable_after'] += new_payable
+                if len(summary['changes']) < MAX_PREVIEW_ROWS:
+                    summary['changes'].append({
+                        'id': columns['id'][index],
+                        'bill_no': columns['bill_no'][index],
+                        'party_name': columns['party_name'][index],
+                        'changes': changes
+                    })
+
+                if apply:
+                    total_paid = safe_float(columns['total_paid_amount'][index], 0)
+                    old_row = {column: columns[column][index] for column in AGGREGATE_SOURCE_COLUMNS}
+                    # Overrides can be aggregate sources too (bags), not just the derived columns
+                    new_row = dict(old_row, **{column: new_value(column, index) for column in written
+                                               if column in old_row})
+                    updates.append((
+                        (*(new_value(column, index) for column in written), round(new_payable - total_paid, 2)),
+                        columns['id'][index], columns['row_version'][index], old_row, new_row
+                    ))
+
+            if apply and updates:
+                assignments = ', '.join(f'{column} = %s' for column in written)
+                sql = f'''UPDATE purchase_slips SET {assignments}, balance_amount = %s,
+                             row_version = row_version + 1, updated_at = %s
+                         WHERE id = %s AND row_version = %s'''
+                now = utc_now()
+                for values, slip_id, row_version, old_row, new_row in updates:
+                    cursor.execute(sql, (*values, now, slip_id, row_version))
+                    if cursor.rowcount == 0:
+                        # Changed (or deleted) since the chunk was read
+                        summary['skipped'] += 1
+                        if len(summary['conflicts']) < MAX_PREVIEW_ROWS:
+                            summary['conflicts'].append(slip_id)
+                        continue
+                    signed_slips.extend([(old_row, -1), (new_row, 1)])
+
+                if signed_slips:
+                    bump_table_version(cursor, 'purchase_slips')
+                    apply_slip_aggregates_batch(cursor, signed_slips)
+                conn.commit()
+
+            if progress:
+                progress(summary)
+
+        summary['payable_before'] = round(summary['payable_before'], 2)
+        summary['payable_after'] = round(summary['payable_after'], 2)
+        summary['payable_delta'] = round(summary['payable_after'] - summary['payable_before'], 2)
+        return summary
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
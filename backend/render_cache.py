@@ -0,0 +1,180 @@
+"""
+On-disk cache of rendered slip PDFs and print HTML
+
+Entries are content-addressed: the key is a SHA-256 of the slip row (with
+its payments), the kind of output and the source of the template that
+renders it. Any change to the row or the template yields a new key, so a
+stale entry can never be served. update_slip / delete_slip additionally
+drop a slip's entries straight away (file names start with the slip id)
+to free the space.
+
+The cache is bounded by RENDER_CACHE_MAX_BYTES. A hit touches the file's
+mtime, and when the directory grows past the bound the least recently
+used files are removed until it is back under 90% of it. Removal can
+happen between a lookup and the read, so readers use open_entry() /
+read_entry() and treat a vanished file as a miss.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR') or os.path.join(BACKEND_DIR, 'render_cache')
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+
+# Bump when the rendering code (not the template) changes the output
+RENDER_CACHE_VERSION = 1
+
+# Cache kind -> (template, file extension)
+RENDER_KINDS = {
+    'pdf': ('print_template.html', 'pdf'),
+    'print': ('print_template_new.html', 'html'),
+}
+
+_template_digests = {}
+_lock = threading.Lock()
+_approx_size = None
+
+
+def template_digest(template_name):
+    """SHA-256 of a template's source (read once per process)"""
+    digest = _template_digests.get(template_name)
+    if digest is None:
+        with open(os.path.join(BACKEND_DIR, 'templates', template_name), 'rb') as template_file:
+            digest = hashlib.sha256(template_file.read()).hexdigest()
+        _template_digests[template_name] = digest
+    return digest
+
+
+def cache_key(kind, slip):
+    """Content key for rendering `slip` (a row dict, payments included) as `kind`"""
+    template_name, _ = RENDER_KINDS[kind]
+    row = json.dumps(slip, sort_keys=True, default=str, separators=(',', ':'))
+    source = f'{RENDER_CACHE_VERSION}:{kind}:{template_digest(template_name)}:{row}'
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def cache_path(kind, slip_id, key):
+    _, extension = RENDER_KINDS[kind]
+    return os.path.join(RENDER_CACHE_DIR, kind, f'{slip_id}-{key}.{extension}')
+
+
+def lookup(kind, slip_id, key):
+    """Path of the cached entry, or None; a hit counts as a use for LRU"""
+    path = cache_path(kind, slip_id, key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def open_entry(kind, slip_id, key):
+    """
+    The cached entry opened for reading, or None on a miss. evict() and
+    invalidate_slip() can remove the file at any time; once it is open the
+    handle stays readable (on Windows the removal fails instead).
+    """
+    path = lookup(kind, slip_id, key)
+    if path is None:
+        return None
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+
+def read_entry(path):
+    """Contents of a path lookup() returned, or None if it was removed since"""
+    try:
+        with open(path, 'rb') as entry:
+            return entry.read()
+    except FileNotFoundError:
+        return None
+
+
+def store(kind, slip_id, key, content):
+    """Write an entry atomically and return its path"""
+    global _approx_size
+
+    path = cache_path(kind, slip_id, key)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    # Write to a temp file in the same directory so readers never see a partial entry
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    with _lock:
+        if _approx_size is None:
+            _approx_size = _directory_size()
+        else:
+            _approx_size += len(content)
+        if _approx_size > RENDER_CACHE_MAX_BYTES:
+            _approx_size = evict(RENDER_CACHE_MAX_BYTES * 9 // 10, keep=path)
+    return path
+
+
+def _entries():
+    """[(mtime, size, path)] for every cache file"""
+    entries = []
+    for kind in RENDER_KINDS:
+        for path in glob.glob(os.path.join(RENDER_CACHE_DIR, kind, '*')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _directory_size():
+    return sum(size for _, size, _ in _entries())
+
+
+def evict(target_bytes, keep=None):
+    """
+    Remove least recently used entries until the cache is <= target_bytes
+    (never `keep`, the entry about to be served); returns the new size
+    """
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def invalidate_slip(slip_id):
+    """Drop every cached rendering of a slip (after update / delete)"""
+    global _approx_size
+
+    for kind in RENDER_KINDS:
+        for path in glob.glob(os.path.join(RENDER_CACHE_DIR, kind, f'{slip_id}-*')):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    with _lock:
+        _approx_size = None
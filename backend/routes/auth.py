@@ -2,11 +2,11 @@ from flask import Blueprint, request, jsonify
 import sys
 import os
 from datetime import datetime
-import mysql.connector
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db_connection
+from database import get_db_connection, DB_ERRORS
+from db_breaker import DatabaseUnavailable
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -58,6 +58,8 @@ def login():
                 'message': 'Invalid username or password'
             }), 401
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -110,7 +112,9 @@ def get_users():
             'users': users
         }), 200
 
-    except mysql.connector.Error as db_error:
+    except DatabaseUnavailable:
+        raise
+    except DB_ERRORS as db_error:
         error_msg = f"Database error: {str(db_error)}"
         print(f"❌ {error_msg}")
         import traceback
@@ -201,6 +205,8 @@ def add_user():
             'message': 'User created successfully'
         }), 201
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error adding user: {e}")
         return jsonify({
@@ -260,6 +266,8 @@ def update_user(user_id):
             'message': 'User updated successfully'
         }), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error updating user: {e}")
         return jsonify({
@@ -324,6 +332,8 @@ def delete_user(user_id):
             'message': 'User deleted successfully'
         }), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error deleting user: {e}")
         return jsonify({
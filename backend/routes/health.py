@@ -0,0 +1,76 @@
+from flask import Blueprint, jsonify, request
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup import startup
+from database import pool_stats, database_status, database_breaker
+from db_breaker import DatabaseUnavailable
+
+health_bp = Blueprint('health', __name__)
+
+# Served before the database is up
+UNGATED_PREFIXES = ('/api/health/', '/api/metrics')
+# Requests that need the database wait for it (static pages don't)
+STARTUP_GATED_PREFIXES = ('/api/', '/print/')
+
+
+@health_bp.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up and serving requests (no database access)"""
+    return jsonify({
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_ms': startup.elapsed_ms()
+    }), 200
+
+
+@health_bp.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: database pool open and schema current; 503 until then"""
+    # A request got here, so the server socket is listening
+    startup.mark_listening()
+    status = startup.status()
+    status['pool'] = pool_stats()
+    status['database'] = database_status()
+    ready = startup.is_ready() and not database_breaker.is_open()
+    if startup.is_ready() and not ready:
+        status['status'] = 'database unavailable'
+    return jsonify(status), 200 if ready else 503
+
+
+@health_bp.before_app_request
+def wait_for_startup():
+    """
+    Hold database-backed requests until startup is done (503 after
+    STARTUP_WAIT), and answer them 503 at once while the database breaker
+    is open
+    """
+    if not request.path.startswith(STARTUP_GATED_PREFIXES) or request.path.startswith(UNGATED_PREFIXES):
+        return None
+    if not startup.wait_for_database():
+        return jsonify({
+            'success': False,
+            'message': 'Server is still starting, try again shortly',
+            **startup.status()
+        }), 503, {'Retry-After': '2'}
+    try:
+        database_breaker.before_call()
+    except DatabaseUnavailable as e:
+        return database_unavailable(e)
+    return None
+
+
+@health_bp.app_errorhandler(DatabaseUnavailable)
+def database_unavailable(error):
+    """
+    503 for requests that hit the open breaker. The routes re-raise
+    DatabaseUnavailable ahead of their generic `except Exception` (which
+    answers 400/500) so it ends up here.
+    """
+    return jsonify({
+        'success': False,
+        'message': str(error),
+        'database': database_status()
+    }), 503, {'Retry-After': str(error.retry_after)}
@@ -0,0 +1,71 @@
+from flask import Blueprint, jsonify, request, g, Response
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import request_metrics
+from database import pool_stats, database_status
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@metrics_bp.before_app_request
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+    metrics.begin_request()
+
+
+@metrics_bp.after_app_request
+def record_request(response):
+    """Record the request; streamed responses once the last chunk has gone out"""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    method = request.method
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    status = response.status_code
+
+    def finish():
+        request_metrics.observe(method, route, status, time.perf_counter() - started, metrics.end_request())
+
+    if response.is_streamed and not response.direct_passthrough:
+        # Exports and ZIPs do their database / PDF work while streaming
+        # (send_file() passes its file through and never calls close())
+        response.call_on_close(finish)
+    else:
+        finish()
+    return response
+
+
+@metrics_bp.teardown_app_request
+def record_failed_request(error):
+    """Unhandled exceptions skip after_request; count them as 500s"""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    request_metrics.observe(request.method, route, 500, time.perf_counter() - started, metrics.end_request())
+
+
+@metrics_bp.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, pool and breaker metrics in the Prometheus text format"""
+    return Response(
+        request_metrics.prometheus(pool=pool_stats(), breaker=database_status()),
+        content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@metrics_bp.route('/api/metrics/summary', methods=['GET'])
+def metrics_summary():
+    """JSON digest for the admin screen: per-route latency and time split, pool, breaker"""
+    summary = request_metrics.summary()
+    summary['pool'] = pool_stats()
+    summary['database'] = database_status()
+    summary['pid'] = os.getpid()
+    return jsonify(summary), 200
@@ -0,0 +1,92 @@
+from flask import Blueprint, request, jsonify
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+from db_breaker import DatabaseUnavailable
+from aggregates import fetch_rollups, ROLLUP_MEASURES
+
+reports_bp = Blueprint('reports', __name__)
+
+
+def parse_report_date(value):
+    """YYYY-MM-DD or YYYY-MM (first of month) -> date"""
+    value = value.strip()
+    try:
+        if len(value) == 7:
+            return datetime.strptime(value, '%Y-%m').date()
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD or YYYY-MM")
+
+
+@reports_bp.route('/api/reports/summary', methods=['GET'])
+@reports_bp.route('/api/reports/summary/<dimension>', methods=['GET'])
+def get_summary(dimension=None):
+    """
+    Day-wise / month-wise intake totals read from slip_rollups only.
+
+    ?grain=day|month (default day), dimension in the path or ?dimension=
+    (all, material, party, broker, godown; default all), ?date_from=,
+    ?date_to= (YYYY-MM-DD or YYYY-MM) and ?value= for a single
+    material / party / broker / godown.
+    """
+    conn = None
+    cursor = None
+    try:
+        grain = request.args.get('grain', 'day')
+        dimension = dimension or request.args.get('dimension', 'all')
+        try:
+            date_from = parse_report_date(request.args['date_from']) if request.args.get('date_from') else None
+            date_to = parse_report_date(request.args['date_to']) if request.args.get('date_to') else None
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        try:
+            rows = fetch_rollups(cursor, grain, dimension, date_from, date_to, request.args.get('value'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        totals = dict.fromkeys(ROLLUP_MEASURES, 0)
+        for row in rows:
+            period = row['period_start']
+            row['period'] = (period.isoformat() if hasattr(period, 'isoformat') else str(period))[:7 if grain == 'month' else 10]
+            del row['period_start']
+            for measure in ROLLUP_MEASURES:
+                totals[measure] += row[measure] or 0
+
+        totals = {measure: round(value, 3) for measure, value in totals.items()}
+
+        return jsonify({
+            'success': True,
+            'grain': grain,
+            'dimension': dimension,
+            'rows': rows,
+            'totals': totals
+        }), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error fetching report summary: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
@@ -1,74 +1,56 @@
-from flask import Blueprint, request, jsonify, render_template, send_file
+from flask import Blueprint, request, jsonify, render_template, send_file, Response, stream_with_context
 import sys
 import os
+import io
+import csv
+import json
+import re
+import base64
+import importlib.util
 import tempfile
+import itertools
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db_connection, get_next_bill_no
-from datetime import datetime
-from pytz import timezone
-
-try:
-    import pdfkit
-    PDFKIT_AVAILABLE = True
-except ImportError:
-    PDFKIT_AVAILABLE = False
-    print("Warning: pdfkit not available. PDF generation will be disabled.")
+from slip_schema import (
+    safe_float, parse_datetime_to_ist, ist_timezone, SLIP_COLUMNS_BY_NAME, EDITABLE_COLUMNS,
+    DERIVED_FIELD_INPUTS, CALCULATION_INPUT_FIELDS, SLIP_INSERT_SQL,
+    SLIP_UPDATE_SQL, SLIP_SELECT_SQL, SLIP_SELECT_LIST,
+)
+from slip_record import Slip
+from slip_calc import (
+    calculate_fields, calculate_payment_totals, payments_from_instalment_fields, payments_from_request,
+    mirror_payments_to_instalment_fields, INSTALMENT_SLOTS,
+)
+from slip_filters import build_slip_filters, where_clause, parse_filter_date
+from database import (
+    get_db_connection, allocate_bill_numbers, bill_series_for, adjust_row_counter, get_row_count,
+    utc_now, bump_table_version, get_table_version,
+)
+from db_breaker import DatabaseUnavailable
+from aggregates import apply_slip_aggregates, get_party_ledger, AGGREGATE_SOURCE_COLUMNS
+from datetime import datetime, timedelta, timezone
+
+from pdf_render import (
+    PDFKIT_AVAILABLE, RendererBusy, render_pdf, iter_rendered_pdfs, merge_pdfs, iter_zip_pdfs,
+)
+import render_cache
+
+# Only looked up here; openpyxl itself is imported by the XLSX export
+OPENPYXL_AVAILABLE = importlib.util.find_spec('openpyxl') is not None
 
 slips_bp = Blueprint('slips', __name__)
 
-def safe_float(value, default=0.0):
-    """Safely convert value to float, handling empty strings and None"""
-    try:
-        if value in (None, '', ' '):
-            return default
-        return float(value)
-    except (TypeError, ValueError):
-        return default
-
 def get_ist_datetime():
     """Get current datetime in IST timezone"""
-    ist = timezone('Asia/Kolkata')
-    return datetime.now(ist)
-
-def parse_datetime_to_ist(value):
-    """Parse date/datetime string and convert to IST datetime object"""
-    if value in (None, '', ' '):
-        return None
-
-    ist = timezone('Asia/Kolkata')
-
-    if isinstance(value, datetime):
-        if value.tzinfo is None:
-            return ist.localize(value)
-        return value.astimezone(ist)
-
-    if isinstance(value, str):
-        try:
-            if 'T' in value or ' ' in value:
-                dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-            else:
-                dt = datetime.strptime(value, '%Y-%m-%d')
-                dt = dt.replace(hour=0, minute=0, second=0)
-
-            if dt.tzinfo is None:
-                dt = ist.localize(dt)
-            else:
-                dt = dt.astimezone(ist)
-
-            return dt.replace(tzinfo=None)
-        except:
-            return None
-
-    return None
+    return datetime.now(ist_timezone())
 
 def format_ist_datetime(dt):
     """Format datetime to IST display format DD-MM-YYYY HH:MM"""
     if dt is None:
         return None
 
-    ist = timezone('Asia/Kolkata')
+    ist = ist_timezone()
 
     if isinstance(dt, str):
         try:
@@ -90,92 +72,82 @@ def format_ist_datetime(dt):
     return None
 
 
-def calculate_payment_totals(data):
+# PAYMENTS (purchase_slip_payments child table)
+
+# Total paid per slip, resolved through the slip_id index
+PAID_AMOUNT_SQL = '''(SELECT COALESCE(SUM(p.amount), 0) FROM purchase_slip_payments p
+    WHERE p.slip_id = purchase_slips.id)'''
+
+
+def replace_slip_payments(cursor, slip_id, payments):
+    """Rewrite a slip's payment rows (numbered 1..n in list order)"""
+    cursor.execute('DELETE FROM purchase_slip_payments WHERE slip_id = %s', (slip_id,))
+    if payments:
+        cursor.executemany('''
+            INSERT INTO purchase_slip_payments (
+                slip_id, instalment_no, payment_date, amount,
+                payment_method, payment_bank_account, comment
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ''', [
+            (slip_id, number, payment['date'], payment['amount'], payment['payment_method'],
+             payment['payment_bank_account'], payment['comment'])
+            for number, payment in enumerate(payments, start=1)
+        ])
+
+
+def refresh_payment_totals(cursor, slip_id=None):
     """
-    Calculate Total Paid Amount and Balance Amount dynamically
-    Total Paid = Sum of all instalment amounts
-    Balance = Payable Amount - Total Paid
+    Recompute the stored total_paid_amount / balance_amount columns from the
+    payment rows (one slip, or every slip when slip_id is None).
+    The write routes set both columns directly; this is for bulk repairs.
     """
-    payable_amount = safe_float(data.get('payable_amount', 0), 0)
-
-    # Sum all instalment amounts
-    total_paid = 0.0
-    for i in range(1, 6):
-        instalment_amount = safe_float(data.get(f'instalment_{i}_amount', 0), 0)
-        total_paid += instalment_amount
-
-    total_paid = round(total_paid, 2)
-    balance_amount = round(payable_amount - total_paid, 2)
-
-    return total_paid, balance_amount
-
-
-def calculate_fields(data):
-    """Calculate all computed fields with NEW weight & rate system"""
-    net_weight_kg = safe_float(data.get('net_weight_kg', 0), 0)
-    gunny_weight_kg = safe_float(data.get('gunny_weight_kg', 0), 0)
-    bags = safe_float(data.get('bags', 0), 0)
-    rate_basis = data.get('rate_basis', 'Quintal')
-    rate_value = safe_float(data.get('rate_value', 0), 0)
-
-    bank_commission = safe_float(data.get('bank_commission', 0), 0)
-    postage = safe_float(data.get('postage', 0), 0)
-    freight = safe_float(data.get('freight', 0), 0)
-    rate_diff = safe_float(data.get('rate_diff', 0), 0)
-    quality_diff = safe_float(data.get('quality_diff', 0), 0)
-    moisture_ded = safe_float(data.get('moisture_ded', 0), 0)
-    tds = safe_float(data.get('tds', 0), 0)
-    batav_percent = safe_float(data.get('batav_percent', 0), 0)
-    shortage_percent = safe_float(data.get('shortage_percent', 0), 0)
-    dalali_rate = safe_float(data.get('dalali_rate', 0), 0)
-    hammali_rate = safe_float(data.get('hammali_rate', 0), 0)
-
-    final_weight_kg = round(max(0, net_weight_kg - gunny_weight_kg), 2)
-    weight_quintal = round(final_weight_kg / 100, 3)
-    weight_khandi = round(final_weight_kg / 150, 3)
-    avg_bag_weight = round(final_weight_kg / bags, 2) if bags > 0 else 0
-
-    if rate_basis == 'Quintal':
-        total_purchase_amount = round(weight_quintal * rate_value, 2)
-    elif rate_basis == 'Khandi':
-        total_purchase_amount = round(weight_khandi * rate_value, 2)
-    else:
-        total_purchase_amount = 0
-
-    batav = round(total_purchase_amount * (batav_percent / 100), 2) if batav_percent > 0 else 0
-    shortage = round(total_purchase_amount * (shortage_percent / 100), 2) if shortage_percent > 0 else 0
-
-    # NEW CALCULATION: Dalali & Hamali based on Net Weight KG / 100
-    dalali = round((net_weight_kg / 100) * dalali_rate, 2) if dalali_rate > 0 else 0
-    hammali = round((net_weight_kg / 100) * hammali_rate, 2) if hammali_rate > 0 else 0
-
-    total_deduction = round(bank_commission + postage + batav + shortage + dalali + hammali + freight + rate_diff + quality_diff + moisture_ded + tds, 2)
-    payable_amount = round(total_purchase_amount - total_deduction, 2)
-
-    data.update({
-        'net_weight_kg': net_weight_kg,
-        'gunny_weight_kg': gunny_weight_kg,
-        'final_weight_kg': final_weight_kg,
-        'weight_quintal': weight_quintal,
-        'weight_khandi': weight_khandi,
-        'avg_bag_weight': avg_bag_weight,
-        'rate_basis': rate_basis,
-        'rate_value': rate_value,
-        'total_purchase_amount': total_purchase_amount,
-        'batav': batav,
-        'shortage': shortage,
-        'dalali': dalali,
-        'hammali': hammali,
-        'freight': freight,
-        'rate_diff': rate_diff,
-        'quality_diff': quality_diff,
-        'moisture_ded': moisture_ded,
-        'tds': tds,
-        'postage': postage,
-        'total_deduction': total_deduction,
-        'payable_amount': payable_amount
-    })
-    return data
+    where = 'WHERE id = %s' if slip_id is not None else ''
+    cursor.execute(f'''
+        UPDATE purchase_slips SET
+            total_paid_amount = ROUND({PAID_AMOUNT_SQL}, 2),
+            balance_amount = ROUND(payable_amount - {PAID_AMOUNT_SQL}, 2),
+            row_version = row_version + 1, updated_at = %s
+        {where}
+    ''', (utc_now(), slip_id) if slip_id is not None else (utc_now(),))
+    updated = cursor.rowcount
+    bump_table_version(cursor, 'purchase_slips')
+    return updated
+
+
+def fetch_slip_payments(cursor, slip_id):
+    """Payments for one slip in instalment order, keyed like slip_calc.normalize_payment()"""
+    cursor.execute('''
+        SELECT instalment_no, payment_date AS date, amount,
+               payment_method, payment_bank_account, comment
+        FROM purchase_slip_payments
+        WHERE slip_id = %s
+        ORDER BY instalment_no
+    ''', (slip_id,))
+    return cursor.fetchall()
+
+
+def fetch_payments_by_slip(cursor, slip_ids):
+    """{slip_id: payments} for many slips in one query, each list like fetch_slip_payments()"""
+    payments = {slip_id: [] for slip_id in slip_ids}
+    if not payments:
+        return payments
+    cursor.execute(f'''
+        SELECT slip_id, instalment_no, payment_date AS date, amount,
+               payment_method, payment_bank_account, comment
+        FROM purchase_slip_payments
+        WHERE slip_id IN ({', '.join(['%s'] * len(payments))})
+        ORDER BY slip_id, instalment_no
+    ''', tuple(payments))
+    for payment in cursor.fetchall():
+        payments[payment.pop('slip_id')].append(payment)
+    return payments
+
+
+def format_payments(payments):
+    """JSON/print friendly copy of a payment list"""
+    return [dict(payment, date=format_ist_datetime(payment['date']) if payment.get('date') else None)
+            for payment in payments]
+
 
 @slips_bp.route('/api/add-slip', methods=['POST'])
 def add_slip():
@@ -185,117 +157,31 @@ def add_slip():
     try:
         data = request.json
         print("📝 Incoming slip data:", {k: v for k, v in data.items() if k in ['party_name', 'date', 'bags', 'net_weight_kg']})
-        data = calculate_fields(data)
-
-        bill_no = get_next_bill_no()
+        slip = Slip.from_payload(data).calculate()
+        payments = payments_from_request(data)
+        mirror_payments_to_instalment_fields(slip, payments)
+        slip.total_paid_amount, slip.balance_amount = calculate_payment_totals(
+            {'payable_amount': slip.payable_amount, 'payments': payments}
+        )
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        slip_date = parse_datetime_to_ist(data.get('date')) or get_ist_datetime()
+        slip.date = slip.date or get_ist_datetime()
 
-        print(f"✓ Calculated fields: payable={data.get('payable_amount')}, total_purchase={data.get('total_purchase_amount')}")
+        # Reserve the bill number inside the same transaction as the INSERT
+        slip.bill_series = bill_series_for(slip.date)
+        slip.bill_no = bill_no = allocate_bill_numbers(cursor, slip.bill_series)
 
-        cursor.execute('''
-            INSERT INTO purchase_slips (
-                company_name, company_address, document_type, vehicle_no, date,
-                bill_no, party_name, mobile_number, material_name, ticket_no, broker,
-                terms_of_delivery, sup_inv_no, gst_no,
-                bags, avg_bag_weight,
-                net_weight_kg, gunny_weight_kg, final_weight_kg,
-                weight_quintal, weight_khandi,
-                rate_basis, rate_value, total_purchase_amount,
-                bank_commission, postage, batav_percent, batav,
-                shortage_percent, shortage, dalali_rate, dalali, hammali_rate,
-                hammali, freight, rate_diff, quality_diff, quality_diff_comment,
-                moisture_ded, moisture_ded_comment, tds, total_deduction, payable_amount,
-                instalment_1_date, instalment_1_amount, instalment_1_payment_method, instalment_1_payment_bank_account, instalment_1_comment,
-                instalment_2_date, instalment_2_amount, instalment_2_payment_method, instalment_2_payment_bank_account, instalment_2_comment,
-                instalment_3_date, instalment_3_amount, instalment_3_payment_method, instalment_3_payment_bank_account, instalment_3_comment,
-                instalment_4_date, instalment_4_amount, instalment_4_payment_method, instalment_4_payment_bank_account, instalment_4_comment,
-                instalment_5_date, instalment_5_amount, instalment_5_payment_method, instalment_5_payment_bank_account, instalment_5_comment,
-                prepared_by, authorised_sign, paddy_unloading_godown
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (
-            data.get('company_name', ''),
-            data.get('company_address', ''),
-            data.get('document_type', 'Purchase Slip'),
-            data.get('vehicle_no', ''),
-            slip_date,
-            bill_no,
-            data.get('party_name', ''),
-            data.get('mobile_number', ''),
-            data.get('material_name', ''),
-            data.get('ticket_no', ''),
-            data.get('broker', ''),
-            data.get('terms_of_delivery', ''),
-            data.get('sup_inv_no', ''),
-            data.get('gst_no', ''),
-            safe_float(data.get('bags', 0), 0),
-            safe_float(data.get('avg_bag_weight', 0), 0),
-            safe_float(data.get('net_weight_kg', 0), 0),
-            safe_float(data.get('gunny_weight_kg', 0), 0),
-            safe_float(data.get('final_weight_kg', 0), 0),
-            safe_float(data.get('weight_quintal', 0), 0),
-            safe_float(data.get('weight_khandi', 0), 0),
-            data.get('rate_basis', 'Quintal'),
-            safe_float(data.get('rate_value', 0), 0),
-            safe_float(data.get('total_purchase_amount', 0), 0),
-            safe_float(data.get('bank_commission', 0), 0),
-            safe_float(data.get('postage', 0), 0),
-            safe_float(data.get('batav_percent', 0), 0),
-            safe_float(data.get('batav', 0), 0),
-            safe_float(data.get('shortage_percent', 0), 0),
-            safe_float(data.get('shortage', 0), 0),
-            safe_float(data.get('dalali_rate', 0), 0),
-            safe_float(data.get('dalali', 0), 0),
-            safe_float(data.get('hammali_rate', 0), 0),
-            safe_float(data.get('hammali', 0), 0),
-            safe_float(data.get('freight', 0), 0),
-            safe_float(data.get('rate_diff', 0), 0),
-            safe_float(data.get('quality_diff', 0), 0),
-            data.get('quality_diff_comment', ''),
-            safe_float(data.get('moisture_ded', 0), 0),
-            data.get('moisture_ded_comment', ''),
-            safe_float(data.get('tds', 0), 0),
-            safe_float(data.get('total_deduction', 0), 0),
-            safe_float(data.get('payable_amount', 0), 0),
-            # Instalment 1
-            parse_datetime_to_ist(data.get('instalment_1_date')),
-            safe_float(data.get('instalment_1_amount', 0), 0),
-            data.get('instalment_1_payment_method', ''),
-            data.get('instalment_1_payment_bank_account', ''),
-            data.get('instalment_1_comment', ''),
-            # Instalment 2
-            parse_datetime_to_ist(data.get('instalment_2_date')),
-            safe_float(data.get('instalment_2_amount', 0), 0),
-            data.get('instalment_2_payment_method', ''),
-            data.get('instalment_2_payment_bank_account', ''),
-            data.get('instalment_2_comment', ''),
-            # Instalment 3
-            parse_datetime_to_ist(data.get('instalment_3_date')),
-            safe_float(data.get('instalment_3_amount', 0), 0),
-            data.get('instalment_3_payment_method', ''),
-            data.get('instalment_3_payment_bank_account', ''),
-            data.get('instalment_3_comment', ''),
-            # Instalment 4
-            parse_datetime_to_ist(data.get('instalment_4_date')),
-            safe_float(data.get('instalment_4_amount', 0), 0),
-            data.get('instalment_4_payment_method', ''),
-            data.get('instalment_4_payment_bank_account', ''),
-            data.get('instalment_4_comment', ''),
-            # Instalment 5
-            parse_datetime_to_ist(data.get('instalment_5_date')),
-            safe_float(data.get('instalment_5_amount', 0), 0),
-            data.get('instalment_5_payment_method', ''),
-            data.get('instalment_5_payment_bank_account', ''),
-            data.get('instalment_5_comment', ''),
-            data.get('prepared_by', ''),
-            data.get('authorised_sign', ''),
-            data.get('paddy_unloading_godown', '')
-        ))
-
-        slip_id = cursor.lastrowid
+        print(f"✓ Calculated fields: payable={slip.payable_amount}, total_purchase={slip.total_purchase_amount}")
+
+        slip.updated_at = utc_now()
+        cursor.execute(SLIP_INSERT_SQL, slip.insert_values())
+
+        slip_id = slip.id = cursor.lastrowid
+        replace_slip_payments(cursor, slip_id, payments)
+        adjust_row_counter(cursor, 'purchase_slips', 1)
+        apply_slip_aggregates(cursor, None, slip)
         conn.commit()
 
         print(f"✅ Slip saved successfully: ID={slip_id}, Bill No={bill_no}")
@@ -307,6 +193,8 @@ def add_slip():
             'bill_no': bill_no
         }), 201
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Error adding slip: {e}")
         import traceback
@@ -321,51 +209,243 @@ def add_slip():
         if conn:
             conn.close()
 
+# Columns returned by the list endpoint
+SLIP_LIST_COLUMNS = '''
+    id, bill_no, date, party_name, material_name, broker, vehicle_no,
+    paddy_unloading_godown, final_weight_kg, rate_basis,
+    payable_amount, total_paid_amount, balance_amount, instalment_1_amount, instalment_2_amount,
+    instalment_3_amount, instalment_4_amount, instalment_5_amount
+'''
+
+MAX_PAGE_LIMIT = 500
+
+def encode_cursor(slip, sort):
+    """Build an opaque pagination token from a slip's sort key"""
+    key = {'s': sort, 'id': slip['id']}
+    if sort == 'date':
+        slip_date = slip['date']
+        key['d'] = slip_date.isoformat() if isinstance(slip_date, datetime) else str(slip_date)
+    raw = json.dumps(key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Decode a pagination token; raises ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(key, dict):
+            raise TypeError('not an object')
+        slip_id = int(key['id'])
+        slip_date = datetime.fromisoformat(key['d']) if key.get('s') == 'date' else None
+    except (ValueError, KeyError, TypeError, AttributeError, UnicodeDecodeError, base64.binascii.Error):
+        # Same answer for any token we didn't issue (truncated, edited, not JSON, not an object)
+        raise ValueError('Invalid pagination cursor') from None
+    if key.get('s') != sort:
+        raise ValueError('Invalid pagination cursor: it was issued for a different sort order')
+    return slip_date, slip_id
+
+
+def fetch_slips_page_by_cursor(cursor, limit, sort='id', after=None, before=None,
+                               conditions=(), params=()):
+    """
+    Keyset pagination, newest first. `after` walks to older slips,
+    `before` walks back to newer ones. Reads limit + 1 rows to compute
+    has_more without a COUNT(*). `conditions`/`params` come from
+    build_slip_filters().
+    """
+    token = before or after
+    conditions = list(conditions)
+    params = list(params)
+    if token:
+        key_date, key_id = decode_cursor(token, sort)
+        op = '>' if before else '<'
+        if sort == 'date':
+            conditions.append(f'(date {op} %s OR (date = %s AND id {op} %s))')
+            params.extend([key_date, key_date, key_id])
+        else:
+            conditions.append(f'id {op} %s')
+            params.append(key_id)
+    where = where_clause(conditions)
+
+    direction = 'ASC' if before else 'DESC'
+    order_by = f'date {direction}, id {direction}' if sort == 'date' else f'id {direction}'
+
+    cursor.execute(f'''
+        SELECT {SLIP_LIST_COLUMNS}
+        FROM purchase_slips
+        {where}
+        ORDER BY {order_by}
+        LIMIT %s
+    ''', (*params, limit + 1))
+    slips = cursor.fetchall()
+
+    has_more = len(slips) > limit
+    slips = slips[:limit]
+    if before:
+        slips.reverse()
+
+    next_cursor = prev_cursor = None
+    if slips:
+        if before:
+            next_cursor = encode_cursor(slips[-1], sort)
+            prev_cursor = encode_cursor(slips[0], sort) if has_more else None
+        else:
+            next_cursor = encode_cursor(slips[-1], sort) if has_more else None
+            prev_cursor = encode_cursor(slips[0], sort) if after else None
+
+    return slips, {
+        'limit': limit,
+        'sort': sort,
+        'has_more': has_more,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
+
+
+def count_slips(cursor, conditions, params):
+    """Row count for a filtered list; unfiltered counts come from the maintained counter"""
+    if not conditions:
+        return get_row_count(cursor, 'purchase_slips')
+    cursor.execute(f'SELECT COUNT(*) AS total FROM purchase_slips {where_clause(conditions)}', params)
+    return cursor.fetchone()['total']
+
+
+# CONDITIONAL GET (ETag / Last-Modified)
+
+def slip_etag(slip_id, row_version, variant=''):
+    """Strong ETag value for one representation of a slip version"""
+    return f'slip-{slip_id}-v{row_version}{variant}'
+
+
+def http_last_modified(updated_at):
+    """Stored naive-UTC updated_at -> aware datetime for Last-Modified"""
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    if isinstance(updated_at, datetime):
+        return updated_at.replace(tzinfo=timezone.utc) if updated_at.tzinfo is None else updated_at
+    return None
+
+
+def request_is_conditional():
+    return bool(request.if_none_match or request.if_modified_since)
+
+
+def is_not_modified(etag, last_modified):
+    """Evaluate If-None-Match (preferred) / If-Modified-Since against a version"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    """Attach ETag / Last-Modified; clients must revalidate before reuse"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def fetch_slip_version(cursor, slip_id):
+    """(row_version, updated_at) for one slip without reading the row, or None"""
+    cursor.execute('SELECT row_version, updated_at FROM purchase_slips WHERE id = %s', (slip_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row['row_version'], http_last_modified(row['updated_at'])
+
+
 @slips_bp.route('/api/slips', methods=['GET'])
 def get_slips():
-    """Get all purchase slips with calculated Total Paid and Balance - optimized for list view"""
+    """
+    Get purchase slips with stored Total Paid and Balance - optimized for list view.
+
+    Keyset mode (?paginate=cursor, or any ?after= / ?before= token) pages by
+    (id) or (date, id) with ?sort=id|date and returns has_more plus opaque
+    next/prev cursors; ?include_total=1 adds the row count.
+    Without those parameters the legacy ?page=&limit= contract is served.
+    Both modes accept the filters documented on build_slip_filters().
+    """
     conn = None
     cursor = None
     try:
+        try:
+            conditions, params = build_slip_filters(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 50))
-        offset = (page - 1) * limit
-
-        cursor.execute('''
-            SELECT id, bill_no, date, party_name, final_weight_kg, rate_basis,
-                   payable_amount, instalment_1_amount, instalment_2_amount,
-                   instalment_3_amount, instalment_4_amount, instalment_5_amount
-            FROM purchase_slips
-            ORDER BY id DESC
-            LIMIT %s OFFSET %s
-        ''', (limit, offset))
-        slips = cursor.fetchall()
-
-        cursor.execute('SELECT COUNT(*) as total FROM purchase_slips')
-        total_count = cursor.fetchone()['total']
+        # Every slip write bumps the table version, so it validates any list page
+        version, changed_at = get_table_version(cursor, 'purchase_slips')
+        etag = f'slips-v{version}'
+        last_modified = http_last_modified(changed_at)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        after = request.args.get('after')
+        before = request.args.get('before')
+        cursor_mode = bool(after or before) or request.args.get('paginate') == 'cursor'
+
+        if cursor_mode:
+            limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_LIMIT)
+            sort = request.args.get('sort', 'id')
+            if sort not in ('id', 'date'):
+                return jsonify({
+                    'success': False,
+                    'message': "sort must be 'id' or 'date'"
+                }), 400
+
+            slips, pagination = fetch_slips_page_by_cursor(
+                cursor, limit, sort, after, before, conditions, params
+            )
+            if request.args.get('include_total') in ('1', 'true'):
+                pagination['total'] = count_slips(cursor, conditions, params)
+        else:
+            page = int(request.args.get('page', 1))
+            limit = int(request.args.get('limit', 50))
+            offset = (page - 1) * limit
+
+            cursor.execute(f'''
+                SELECT {SLIP_LIST_COLUMNS}
+                FROM purchase_slips
+                {where_clause(conditions)}
+                ORDER BY id DESC
+                LIMIT %s OFFSET %s
+            ''', (*params, limit, offset))
+            slips = cursor.fetchall()
+
+            total_count = count_slips(cursor, conditions, params)
+            pagination = {
+                'page': page,
+                'limit': limit,
+                'total': total_count,
+                'pages': (total_count + limit - 1) // limit
+            }
 
         for slip in slips:
-            total_paid, balance_amount = calculate_payment_totals(slip)
-            slip['total_paid_amount'] = total_paid
-            slip['balance_amount'] = balance_amount
-
             if slip.get('date'):
                 slip['date'] = format_ist_datetime(slip['date'])
 
-        return jsonify({
+        return with_validators(jsonify({
             'success': True,
             'slips': slips,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total_count,
-                'pages': (total_count + limit - 1) // limit
-            }
-        }), 200
+            'pagination': pagination
+        }), etag, last_modified), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching slips: {e}")
         return jsonify({
@@ -378,6 +458,165 @@ def get_slips():
         if conn:
             conn.close()
 
+
+# EXPORT API
+
+# (column, header) in export order
+EXPORT_COLUMNS = [
+    ('bill_no', 'Bill No'), ('date', 'Date'), ('party_name', 'Party Name'),
+    ('mobile_number', 'Mobile Number'), ('material_name', 'Material'), ('broker', 'Broker'),
+    ('vehicle_no', 'Vehicle No'), ('ticket_no', 'Ticket No'), ('gst_no', 'GST No'),
+    ('paddy_unloading_godown', 'Unloading Godown'), ('bags', 'Bags'),
+    ('net_weight_kg', 'Net Weight (kg)'), ('gunny_weight_kg', 'Gunny Weight (kg)'),
+    ('final_weight_kg', 'Final Weight (kg)'), ('weight_quintal', 'Weight (Quintal)'),
+    ('weight_khandi', 'Weight (Khandi)'), ('rate_basis', 'Rate Basis'), ('rate_value', 'Rate'),
+    ('total_purchase_amount', 'Total Purchase Amount'), ('bank_commission', 'Bank Commission'),
+    ('postage', 'Postage'), ('batav', 'Batav'), ('shortage', 'Shortage'), ('dalali', 'Dalali'),
+    ('hammali', 'Hammali'), ('freight', 'Freight'), ('rate_diff', 'Rate Diff'),
+    ('quality_diff', 'Quality Diff'), ('moisture_ded', 'Moisture Ded'), ('tds', 'TDS'),
+    ('total_deduction', 'Total Deduction'), ('payable_amount', 'Payable Amount'),
+    ('total_paid_amount', 'Total Paid'), ('balance_amount', 'Balance'),
+]
+
+# Rows pulled from the server-side cursor per round trip
+EXPORT_FETCH_SIZE = 500
+
+# XLSX date cells, shown like format_ist_datetime()
+EXPORT_XLSX_DATE_FORMAT = 'DD-MM-YYYY HH:MM'
+
+# XLSX exports up to this size are built in memory, larger ones spill to a temp file
+EXPORT_XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def iter_export_rows(conditions, params):
+    """
+    Yield batches of export rows (tuples in EXPORT_COLUMNS order) from an
+    unbuffered cursor, so memory stays at one batch whatever the table size.
+    Owns its connection because it runs while the response is being sent.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(f'''
+            SELECT {', '.join(column for column, _ in EXPORT_COLUMNS)}
+            FROM purchase_slips
+            {where_clause(conditions)}
+            ORDER BY date, id
+        ''', params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            # Client went away mid-export; drop the unread rows with the session
+            pass
+        conn.close()
+
+
+def generate_csv_export(conditions, params):
+    """CSV text in chunks: a BOM so Excel detects UTF-8, the header, then one chunk per batch"""
+    date_index = [column for column, _ in EXPORT_COLUMNS].index('date')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow([header for _, header in EXPORT_COLUMNS])
+    for rows in iter_export_rows(conditions, params):
+        for row in rows:
+            row = list(row)
+            row[date_index] = format_ist_datetime(row[date_index])
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx_export(conditions, params, output):
+    """Write-only workbook: rows go straight to the sheet's temp file"""
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+
+    date_index = [column for column, _ in EXPORT_COLUMNS].index('date')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Purchase Slips')
+    sheet.append([header for _, header in EXPORT_COLUMNS])
+    for rows in iter_export_rows(conditions, params):
+        for row in rows:
+            row = list(row)
+            date_cell = WriteOnlyCell(sheet, value=row[date_index])
+            date_cell.number_format = EXPORT_XLSX_DATE_FORMAT
+            row[date_index] = date_cell
+            sheet.append(row)
+    workbook.save(output)
+
+
+@slips_bp.route('/api/slips/export', methods=['GET'])
+def export_slips():
+    """
+    Export slips as CSV (streamed) or XLSX (?format=xlsx, needs openpyxl).
+    Accepts the same filters as /api/slips; rows are ordered by date.
+    """
+    try:
+        conditions, params = build_slip_filters(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    export_format = request.args.get('format', 'csv').lower()
+    filename = f"purchase_slips_{get_ist_datetime().strftime('%Y%m%d_%H%M')}"
+
+    if export_format == 'csv':
+        return Response(
+            stream_with_context(generate_csv_export(conditions, params)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}.csv'}
+        )
+
+    if export_format != 'xlsx':
+        return jsonify({
+            'success': False,
+            'message': "format must be 'csv' or 'xlsx'"
+        }), 400
+
+    if not OPENPYXL_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'message': 'XLSX export requires openpyxl (pip install openpyxl). Use format=csv.'
+        }), 400
+
+    # Anonymous spool: nothing to clean up, whether or not the response
+    # is ever sent (send_file closes it with the response)
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_XLSX_SPOOL_BYTES)
+    try:
+        write_xlsx_export(conditions, params, output)
+        output.seek(0)
+
+        return send_file(
+            output,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=f'{filename}.xlsx'
+        )
+
+    except DatabaseUnavailable:
+        output.close()
+        raise
+    except Exception as e:
+        output.close()
+        print(f"Error exporting slips: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
 @slips_bp.route('/api/slip/<int:slip_id>', methods=['GET'])
 def get_slip(slip_id):
     """Get a single purchase slip by ID with calculated amounts"""
@@ -387,7 +626,13 @@ def get_slip(slip_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT * FROM purchase_slips WHERE id = %s', (slip_id,))
+        # Revalidation only needs the version columns, not the row
+        if request_is_conditional():
+            version = fetch_slip_version(cursor, slip_id)
+            if version and is_not_modified(slip_etag(slip_id, version[0]), version[1]):
+                return not_modified_response(slip_etag(slip_id, version[0]), version[1])
+
+        cursor.execute(SLIP_SELECT_SQL, (slip_id,))
         slip = cursor.fetchone()
 
         if slip is None:
@@ -396,10 +641,9 @@ def get_slip(slip_id):
                 'message': 'Slip not found'
             }), 404
 
-        # Calculate Total Paid and Balance
-        total_paid, balance_amount = calculate_payment_totals(slip)
-        slip['total_paid_amount'] = total_paid
-        slip['balance_amount'] = balance_amount
+        etag = slip_etag(slip_id, slip['row_version'])
+        last_modified = http_last_modified(slip['updated_at'])
+        slip['payments'] = format_payments(fetch_slip_payments(cursor, slip_id))
 
         # Format all datetime fields to IST
         datetime_fields = ['date', 'payment_date', 'payment_due_date',
@@ -410,11 +654,13 @@ def get_slip(slip_id):
             if slip.get(field):
                 slip[field] = format_ist_datetime(slip[field])
 
-        return jsonify({
+        return with_validators(jsonify({
             'success': True,
             'slip': slip
-        }), 200
+        }), etag, last_modified), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching slip: {e}")
         return jsonify({
@@ -438,121 +684,52 @@ def update_slip(slip_id):
         # Get existing slip and merge with new data
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM purchase_slips WHERE id = %s', (slip_id,))
+        cursor.execute(SLIP_SELECT_SQL, (slip_id,))
         existing_slip = cursor.fetchone()
-        cursor.close()
 
         if existing_slip:
-            merged_data = dict(existing_slip)
-            merged_data.update(data)
-            merged_data = calculate_fields(merged_data)
+            slip = Slip.from_row(existing_slip)
+            slip.update(data)
+            slip.calculate()
+            check_bill_series(existing_slip, slip.date)
+
+            if isinstance(data.get('payments'), list):
+                payments = payments_from_request(data)
+            elif any(key.startswith('instalment_') for key in data):
+                # Legacy client edited the fixed slots; keep payments beyond slot 5
+                existing_payments = fetch_slip_payments(cursor, slip_id)
+                payments = (payments_from_instalment_fields(slip)
+                            + existing_payments[INSTALMENT_SLOTS:])
+            else:
+                payments = None
         else:
-            merged_data = calculate_fields(data)
+            slip = Slip.from_payload(data).calculate()
+            payments = None
+
+        if payments is not None:
+            mirror_payments_to_instalment_fields(slip, payments)
+            slip.total_paid_amount, slip.balance_amount = calculate_payment_totals(
+                {'payable_amount': slip.payable_amount, 'payments': payments}
+            )
+        else:
+            # Payments untouched: keep the stored total, rebalance against the new payable
+            slip.total_paid_amount = safe_float((existing_slip or {}).get('total_paid_amount', 0), 0)
+            slip.balance_amount = round(slip.payable_amount - slip.total_paid_amount, 2)
 
+        cursor.close()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            UPDATE purchase_slips SET
-                company_name = %s, company_address = %s, document_type = %s,
-                vehicle_no = %s, date = %s,
-                party_name = %s, mobile_number = %s, material_name = %s, ticket_no = %s, broker = %s,
-                terms_of_delivery = %s, sup_inv_no = %s, gst_no = %s,
-                bags = %s, avg_bag_weight = %s,
-                net_weight_kg = %s, gunny_weight_kg = %s, final_weight_kg = %s,
-                weight_quintal = %s, weight_khandi = %s,
-                rate_basis = %s, rate_value = %s, total_purchase_amount = %s,
-                bank_commission = %s, postage = %s, batav_percent = %s, batav = %s,
-                shortage_percent = %s, shortage = %s, dalali_rate = %s, dalali = %s,
-                hammali_rate = %s, hammali = %s, freight = %s, rate_diff = %s,
-                quality_diff = %s, quality_diff_comment = %s, moisture_ded = %s, moisture_ded_comment = %s,
-                tds = %s, total_deduction = %s, payable_amount = %s,
-                instalment_1_date = %s, instalment_1_amount = %s, instalment_1_payment_method = %s, instalment_1_payment_bank_account = %s, instalment_1_comment = %s,
-                instalment_2_date = %s, instalment_2_amount = %s, instalment_2_payment_method = %s, instalment_2_payment_bank_account = %s, instalment_2_comment = %s,
-                instalment_3_date = %s, instalment_3_amount = %s, instalment_3_payment_method = %s, instalment_3_payment_bank_account = %s, instalment_3_comment = %s,
-                instalment_4_date = %s, instalment_4_amount = %s, instalment_4_payment_method = %s, instalment_4_payment_bank_account = %s, instalment_4_comment = %s,
-                instalment_5_date = %s, instalment_5_amount = %s, instalment_5_payment_method = %s, instalment_5_payment_bank_account = %s, instalment_5_comment = %s,
-                prepared_by = %s, authorised_sign = %s, paddy_unloading_godown = %s
-            WHERE id = %s
-        ''', (
-            merged_data.get('company_name', ''),
-            merged_data.get('company_address', ''),
-            merged_data.get('document_type', 'Purchase Slip'),
-            merged_data.get('vehicle_no', ''),
-            parse_datetime_to_ist(merged_data.get('date')),
-            merged_data.get('party_name', ''),
-            merged_data.get('mobile_number', ''),
-            merged_data.get('material_name', ''),
-            merged_data.get('ticket_no', ''),
-            merged_data.get('broker', ''),
-            merged_data.get('terms_of_delivery', ''),
-            merged_data.get('sup_inv_no', ''),
-            merged_data.get('gst_no', ''),
-            safe_float(merged_data.get('bags', 0), 0),
-            safe_float(merged_data.get('avg_bag_weight', 0), 0),
-            safe_float(merged_data.get('net_weight_kg', 0), 0),
-            safe_float(merged_data.get('gunny_weight_kg', 0), 0),
-            safe_float(merged_data.get('final_weight_kg', 0), 0),
-            safe_float(merged_data.get('weight_quintal', 0), 0),
-            safe_float(merged_data.get('weight_khandi', 0), 0),
-            merged_data.get('rate_basis', 'Quintal'),
-            safe_float(merged_data.get('rate_value', 0), 0),
-            safe_float(merged_data.get('total_purchase_amount', 0), 0),
-            safe_float(merged_data.get('bank_commission', 0), 0),
-            safe_float(merged_data.get('postage', 0), 0),
-            safe_float(merged_data.get('batav_percent', 0), 0),
-            safe_float(merged_data.get('batav', 0), 0),
-            safe_float(merged_data.get('shortage_percent', 0), 0),
-            safe_float(merged_data.get('shortage', 0), 0),
-            safe_float(merged_data.get('dalali_rate', 0), 0),
-            safe_float(merged_data.get('dalali', 0), 0),
-            safe_float(merged_data.get('hammali_rate', 0), 0),
-            safe_float(merged_data.get('hammali', 0), 0),
-            safe_float(merged_data.get('freight', 0), 0),
-            safe_float(merged_data.get('rate_diff', 0), 0),
-            safe_float(merged_data.get('quality_diff', 0), 0),
-            merged_data.get('quality_diff_comment', ''),
-            safe_float(merged_data.get('moisture_ded', 0), 0),
-            merged_data.get('moisture_ded_comment', ''),
-            safe_float(merged_data.get('tds', 0), 0),
-            safe_float(merged_data.get('total_deduction', 0), 0),
-            safe_float(merged_data.get('payable_amount', 0), 0),
-            # Instalment 1
-            parse_datetime_to_ist(merged_data.get('instalment_1_date')),
-            safe_float(merged_data.get('instalment_1_amount', 0), 0),
-            merged_data.get('instalment_1_payment_method', ''),
-            merged_data.get('instalment_1_payment_bank_account', ''),
-            merged_data.get('instalment_1_comment', ''),
-            # Instalment 2
-            parse_datetime_to_ist(merged_data.get('instalment_2_date')),
-            safe_float(merged_data.get('instalment_2_amount', 0), 0),
-            merged_data.get('instalment_2_payment_method', ''),
-            merged_data.get('instalment_2_payment_bank_account', ''),
-            merged_data.get('instalment_2_comment', ''),
-            # Instalment 3
-            parse_datetime_to_ist(merged_data.get('instalment_3_date')),
-            safe_float(merged_data.get('instalment_3_amount', 0), 0),
-            merged_data.get('instalment_3_payment_method', ''),
-            merged_data.get('instalment_3_payment_bank_account', ''),
-            merged_data.get('instalment_3_comment', ''),
-            # Instalment 4
-            parse_datetime_to_ist(merged_data.get('instalment_4_date')),
-            safe_float(merged_data.get('instalment_4_amount', 0), 0),
-            merged_data.get('instalment_4_payment_method', ''),
-            merged_data.get('instalment_4_payment_bank_account', ''),
-            merged_data.get('instalment_4_comment', ''),
-            # Instalment 5
-            parse_datetime_to_ist(merged_data.get('instalment_5_date')),
-            safe_float(merged_data.get('instalment_5_amount', 0), 0),
-            merged_data.get('instalment_5_payment_method', ''),
-            merged_data.get('instalment_5_payment_bank_account', ''),
-            merged_data.get('instalment_5_comment', ''),
-            merged_data.get('prepared_by', ''),
-            merged_data.get('authorised_sign', ''),
-            merged_data.get('paddy_unloading_godown', ''),
-            slip_id
-        ))
+        cursor.execute(SLIP_UPDATE_SQL, (*slip.update_values(), utc_now(), slip_id))
+        bump_table_version(cursor, 'purchase_slips')
+
+        if payments is not None:
+            replace_slip_payments(cursor, slip_id, payments)
+
+        if existing_slip:
+            apply_slip_aggregates(cursor, existing_slip, slip)
 
         conn.commit()
+        render_cache.invalidate_slip(slip_id)
 
         return jsonify({
             'success': True,
@@ -560,6 +737,8 @@ def update_slip(slip_id):
             'slip_id': slip_id
         }), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error updating slip: {e}")
         return jsonify({
@@ -572,6 +751,239 @@ def update_slip(slip_id):
         if conn:
             conn.close()
 
+
+# PARTIAL UPDATE (PATCH) API
+
+def affected_derived_fields(changed):
+    """Derived columns whose inputs (directly or through other derived columns) changed"""
+    affected = []
+    dirty = set(changed)
+    for derived, inputs in DERIVED_FIELD_INPUTS.items():
+        if dirty.intersection(inputs):
+            affected.append(derived)
+            dirty.add(derived)
+    return affected
+
+
+def parse_patch_values(data):
+    """Typed column values from a PATCH body; raises ValueError on unknown or derived fields"""
+    values = {}
+    rejected = []
+    for field, value in data.items():
+        if field not in EDITABLE_COLUMNS:
+            rejected.append(field)
+            continue
+        column = SLIP_COLUMNS_BY_NAME[field]
+        values[field] = column.parser(value, column.default)
+        if field == 'date' and values['date'] is None:
+            raise ValueError(f'Invalid date: {value!r}')
+    if rejected:
+        raise ValueError(f"Cannot patch: {', '.join(sorted(rejected))} "
+                         "(derived fields are recalculated; send instalments as 'payments')")
+    return values
+
+
+def check_bill_series(existing, new_date):
+    """
+    Bill numbers are issued per series and never renumbered, so an edited
+    date may not move a slip into another series (with
+    BILL_NO_SERIES=financial_year: across 1 April). Raises ValueError.
+    """
+    old_series = bill_series_for(existing['date'])
+    new_series = bill_series_for(new_date)
+    if existing['bill_series'] == old_series != new_series:
+        raise ValueError(
+            f"Cannot move bill {existing['bill_no']} from series {old_series} to {new_series}: "
+            'bill numbers are per financial year. Delete the slip and enter it again under the new date.'
+        )
+
+
+# slip_etag() output: slip-{id}-v{row_version}{variant}
+SLIP_ETAG_PATTERN = re.compile(r'slip-(\d+)-v(\d+)(-[0-9A-Za-z-]+)?')
+
+
+class EtagMismatch(Exception):
+    """If-Match names a different slip than the URL"""
+
+
+def expected_row_version(data, slip_id):
+    """
+    row_version from the body, or the version in an If-Match ETag of this
+    slip (None when neither is sent). Raises ValueError for a non-integer
+    row_version or a tag that is not a slip ETag, EtagMismatch for the ETag
+    of another slip.
+    """
+    if data.get('row_version') not in (None, ''):
+        try:
+            return int(data['row_version'])
+        except (TypeError, ValueError):
+            raise ValueError('row_version must be an integer')
+
+    versions = set()
+    for etag in request.if_match.as_set():
+        match = SLIP_ETAG_PATTERN.fullmatch(etag)
+        if match is None:
+            raise ValueError(f"If-Match '{etag}' is not a slip ETag")
+        if int(match.group(1)) != slip_id:
+            raise EtagMismatch(f"If-Match '{etag}' belongs to slip {match.group(1)}, not {slip_id}")
+        versions.add(int(match.group(2)))
+    if len(versions) > 1:
+        raise ValueError('If-Match names more than one version of the slip')
+    return versions.pop() if versions else None
+
+
+def version_conflict(cursor, slip_id, expected):
+    """404 / 409 response after a guarded UPDATE matched no row"""
+    cursor.execute('SELECT row_version FROM purchase_slips WHERE id = %s', (slip_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return jsonify({'success': False, 'message': 'Slip not found'}), 404
+    return jsonify({
+        'success': False,
+        'message': 'Slip was changed by someone else; reload it and try again',
+        'row_version': row['row_version'],
+        'expected_row_version': expected
+    }), 409
+
+
+@slips_bp.route('/api/slip/<int:slip_id>', methods=['PATCH'])
+def patch_slip(slip_id):
+    """
+    Update only the fields sent, guarded by the slip's row_version.
+
+    The body holds the changed fields plus row_version (or an If-Match header
+    with the slip's ETag). Derived fields are recalculated only when one of
+    their inputs changed, and the UPDATE writes just the changed columns.
+    Plain text edits need no SELECT at all. 409 means the slip changed since
+    the client read it; 412 means If-Match carried another slip's ETag.
+    """
+    conn = None
+    cursor = None
+    try:
+        data = dict(request.json or {})
+        try:
+            expected = expected_row_version(data, slip_id)
+        except EtagMismatch as e:
+            return jsonify({'success': False, 'message': str(e)}), 412
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if expected is None:
+            return jsonify({
+                'success': False,
+                'message': 'row_version (or an If-Match header) is required'
+            }), 428
+        data.pop('row_version', None)
+
+        payments = None
+        if 'payments' in data:
+            if not isinstance(data['payments'], list):
+                raise ValueError("'payments' must be a list")
+            payments = payments_from_request(data)
+            del data['payments']
+        values = parse_patch_values(data)
+
+        calculation_changes = set(values).intersection(CALCULATION_INPUT_FIELDS)
+        affected = affected_derived_fields(calculation_changes)
+        touches_aggregates = (payments is not None or
+                              set(values).union(affected).intersection(AGGREGATE_SOURCE_COLUMNS))
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        existing = None
+        if calculation_changes or touches_aggregates:
+            # One read of just the columns the recalculation and aggregates need
+            columns = list(dict.fromkeys(
+                ['row_version', 'bill_no', 'bill_series',
+                 *CALCULATION_INPUT_FIELDS, *DERIVED_FIELD_INPUTS, *AGGREGATE_SOURCE_COLUMNS]
+            ))
+            cursor.execute(f"SELECT {', '.join(columns)} FROM purchase_slips WHERE id = %s", (slip_id,))
+            existing = cursor.fetchone()
+            if existing is None:
+                return jsonify({'success': False, 'message': 'Slip not found'}), 404
+            if existing['row_version'] != expected:
+                return version_conflict(cursor, slip_id, expected)
+
+            # Drop fields sent with their current value
+            values = {field: value for field, value in values.items()
+                      if field not in existing or existing[field] != value}
+            if 'date' in values:
+                check_bill_series(existing, values['date'])
+            if calculation_changes:
+                calculated = calculate_fields(dict(existing, **values))
+                for field in affected:
+                    if calculated[field] != existing[field]:
+                        values[field] = calculated[field]
+
+        if payments is not None:
+            mirror_payments_to_instalment_fields(values, payments)
+            payable = values.get('payable_amount', existing['payable_amount'])
+            total_paid, balance_amount = calculate_payment_totals({'payable_amount': payable, 'payments': payments})
+            values['total_paid_amount'] = total_paid
+            values['balance_amount'] = balance_amount
+        elif 'payable_amount' in values:
+            values['balance_amount'] = round(values['payable_amount'] - safe_float(existing['total_paid_amount'], 0), 2)
+
+        if not values:
+            return jsonify({
+                'success': True,
+                'message': 'Nothing changed',
+                'slip_id': slip_id,
+                'row_version': expected,
+                'changed': []
+            }), 200
+
+        assignments = ', '.join(f'{field} = %s' for field in values)
+        cursor.execute(f'''
+            UPDATE purchase_slips
+            SET {assignments}, row_version = row_version + 1, updated_at = %s
+            WHERE id = %s AND row_version = %s
+        ''', (*values.values(), utc_now(), slip_id, expected))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            return version_conflict(cursor, slip_id, expected)
+
+        if payments is not None:
+            replace_slip_payments(cursor, slip_id, payments)
+        if touches_aggregates:
+            apply_slip_aggregates(cursor, existing, dict(existing, **values))
+        bump_table_version(cursor, 'purchase_slips')
+
+        conn.commit()
+        render_cache.invalidate_slip(slip_id)
+
+        changed = [field for field in values if not field.startswith('instalment_')]
+        print(f"✓ Patched slip {slip_id}: {', '.join(changed)}")
+        response = jsonify({
+            'success': True,
+            'message': 'Purchase slip updated successfully',
+            'slip_id': slip_id,
+            'row_version': expected + 1,
+            'changed': changed
+        })
+        response.set_etag(slip_etag(slip_id, expected + 1))
+        return response, 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error patching slip: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 @slips_bp.route('/api/slip/<int:slip_id>', methods=['DELETE'])
 def delete_slip(slip_id):
     """Delete a purchase slip"""
@@ -579,16 +991,29 @@ def delete_slip(slip_id):
     cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(
+            f"SELECT {', '.join(AGGREGATE_SOURCE_COLUMNS)} FROM purchase_slips WHERE id = %s",
+            (slip_id,)
+        )
+        existing_slip = cursor.fetchone()
 
+        cursor.execute('DELETE FROM purchase_slip_payments WHERE slip_id = %s', (slip_id,))
         cursor.execute('DELETE FROM purchase_slips WHERE id = %s', (slip_id,))
+        if cursor.rowcount:
+            adjust_row_counter(cursor, 'purchase_slips', -cursor.rowcount)
+            apply_slip_aggregates(cursor, existing_slip, None)
         conn.commit()
+        render_cache.invalidate_slip(slip_id)
 
         return jsonify({
             'success': True,
             'message': 'Slip deleted successfully'
         }), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error deleting slip: {e}")
         return jsonify({
@@ -601,6 +1026,15 @@ def delete_slip(slip_id):
         if conn:
             conn.close()
 
+def render_slip_pdf_html(slip):
+    """HTML for the PDF of one slip row with its formatted 'payments' (print_template.html)"""
+    datetime_fields = ['date', 'instalment_1_date', 'instalment_2_date',
+                      'instalment_3_date', 'instalment_4_date', 'instalment_5_date']
+    for field in datetime_fields:
+        if slip.get(field):
+            slip[f'{field}_formatted'] = format_ist_datetime(slip[field])
+    return render_template('print_template.html', slip=slip)
+
 @slips_bp.route('/api/slip/<int:slip_id>/pdf', methods=['GET'])
 def generate_slip_pdf(slip_id):
     """Generate PDF for a purchase slip"""
@@ -616,60 +1050,220 @@ def generate_slip_pdf(slip_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT * FROM purchase_slips WHERE id = %s', (slip_id,))
+        cursor.execute(SLIP_SELECT_SQL, (slip_id,))
         slip = cursor.fetchone()
 
         if not slip:
             return jsonify({'success': False, 'message': 'Slip not found'}), 404
 
-        # Format datetime fields
-        datetime_fields = ['date', 'instalment_1_date', 'instalment_2_date',
-                          'instalment_3_date', 'instalment_4_date', 'instalment_5_date']
-        for field in datetime_fields:
-            if slip.get(field):
-                slip[f'{field}_formatted'] = format_ist_datetime(slip[field])
-
-        # Render HTML
-        html_content = render_template('print_template.html', slip=slip)
-
-        # Generate PDF
-        pdf_options = {
-            'page-size': 'A4',
-            'margin-top': '10mm',
-            'margin-right': '10mm',
-            'margin-bottom': '10mm',
-            'margin-left': '10mm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
-
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
-            pdfkit.from_string(html_content, temp_pdf.name, options=pdf_options)
-            temp_pdf_path = temp_pdf.name
-
-        # Send file and schedule cleanup
-        response = send_file(
-            temp_pdf_path,
+        slip['payments'] = format_payments(fetch_slip_payments(cursor, slip_id))
+
+        # Reprints are served from the render cache
+        key = render_cache.cache_key('pdf', slip)
+        pdf_file = render_cache.open_entry('pdf', slip_id, key)
+        if pdf_file is None:
+            pdf = render_pdf(render_slip_pdf_html(slip))
+            render_cache.store('pdf', slip_id, key, pdf)
+            pdf_file = io.BytesIO(pdf)
+
+        return send_file(
+            pdf_file,
             mimetype='application/pdf',
             as_attachment=True,
-            download_name=f'purchase_slip_{slip_id}.pdf'
+            download_name=f'purchase_slip_{slip_id}.pdf',
+            etag=key
         )
 
-        # Schedule temp file cleanup after response
-        @response.call_on_close
-        def cleanup():
-            try:
-                if os.path.exists(temp_pdf_path):
-                    os.unlink(temp_pdf_path)
-            except:
-                pass
+    except RendererBusy as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503, {'Retry-After': '5'}
+    except TimeoutError as e:
+        print(f"PDF render timed out: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 504
+    except IOError as e:
+        print(f"PDF render failed: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error generating PDF: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
 
-        return response
+# BATCH PDF API
+
+# Upper bound on slips per batch request
+PDF_BATCH_LIMIT = 500
+
+
+def parse_slip_ids(value):
+    """
+    '3,1,2' -> [3, 1, 2] (duplicates dropped, order kept; blank parts skipped).
+    Raises ValueError for non-integer parts, an empty list or more than
+    PDF_BATCH_LIMIT ids.
+    """
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not (part.isascii() and part.isdigit()) or int(part) < 1:
+            raise ValueError(f"ids must be a comma-separated list of slip ids, got '{value}'")
+        ids.append(int(part))
+
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError('ids is empty; pass at least one slip id')
+    if len(ids) > PDF_BATCH_LIMIT:
+        raise ValueError(f'At most {PDF_BATCH_LIMIT} ids per batch')
+    return ids
+
+
+def iter_slip_pdfs(slips):
+    """
+    PDF bytes per slip in order: cached PDFs are read from the render cache,
+    the rest are rendered on the pool and stored as they come back.
+    """
+    keys = [render_cache.cache_key('pdf', slip) for slip in slips]
+    cached = [render_cache.lookup('pdf', slip['id'], key) for slip, key in zip(slips, keys)]
+    rendered = iter_rendered_pdfs([
+        render_slip_pdf_html(slip) for slip, path in zip(slips, cached) if path is None
+    ])
+
+    for slip, key, path in zip(slips, keys, cached):
+        if path is None:
+            pdf = next(rendered)
+        else:
+            pdf = render_cache.read_entry(path)
+            if pdf is not None:
+                yield pdf
+                continue
+            # Evicted since the lookup: render this one on its own
+            pdf = render_pdf(render_slip_pdf_html(slip))
+        render_cache.store('pdf', slip['id'], key, pdf)
+        yield pdf
+
+
+@slips_bp.route('/api/slips/pdf', methods=['GET'])
+def generate_slips_pdf():
+    """
+    PDFs for many slips at once: ?ids=1,2,3 (in that order) or the list
+    filters (?date_from=&date_to=, ?party=, ...; ordered by date).
+    The slips are fetched in one query and rendered on the PDF process pool.
+    ?format=pdf (default) returns one merged PDF, ?format=zip a ZIP with
+    one PDF per slip, streamed as the PDFs are rendered.
+    """
+    if not PDFKIT_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'message': 'PDF generation is not available. Please install wkhtmltopdf.'
+        }), 500
 
+    output_format = request.args.get('format', 'pdf').lower()
+    if output_format not in ('pdf', 'zip'):
+        return jsonify({
+            'success': False,
+            'message': "format must be 'pdf' or 'zip'"
+        }), 400
+
+    conn = None
+    cursor = None
+    try:
+        if 'ids' in request.args:
+            ids = parse_slip_ids(request.args['ids'])
+            conditions = [f"id IN ({', '.join(['%s'] * len(ids))})"]
+            params = ids
+        else:
+            ids = None
+            conditions, params = build_slip_filters(request.args)
+            if not conditions:
+                raise ValueError('Pass ids= or at least one filter (e.g. date_from / date_to)')
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f'''
+            SELECT {SLIP_SELECT_LIST} FROM purchase_slips
+            {where_clause(conditions)}
+            ORDER BY date, id
+            LIMIT %s
+        ''', (*params, PDF_BATCH_LIMIT + 1))
+        slips = cursor.fetchall()
+
+        if not slips:
+            return jsonify({'success': False, 'message': 'No slips found'}), 404
+        if len(slips) > PDF_BATCH_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'More than {PDF_BATCH_LIMIT} slips match; narrow the filters'
+            }), 400
+        if ids:
+            position = {slip_id: index for index, slip_id in enumerate(ids)}
+            slips.sort(key=lambda slip: position[slip['id']])
+        payments = fetch_payments_by_slip(cursor, [slip['id'] for slip in slips])
+        for slip in slips:
+            slip['payments'] = format_payments(payments[slip['id']])
+
+        pdfs = iter_slip_pdfs(slips)
+
+        if output_format == 'zip':
+            # Wait for the first PDF before answering, so a busy or failing
+            # renderer still gets its 503 / 500 / 504 instead of a broken
+            # download; later failures end the archive (iter_zip_pdfs)
+            pdfs = itertools.chain([next(pdfs)], pdfs)
+            filenames = [f"purchase_slip_{slip['bill_no'] or slip['id']}.pdf" for slip in slips]
+            return Response(
+                stream_with_context(iter_zip_pdfs(filenames, pdfs)),
+                mimetype='application/zip',
+                headers={'Content-Disposition': 'attachment; filename=purchase_slips.zip'}
+            )
+
+        return Response(
+            merge_pdfs(pdfs),
+            mimetype='application/pdf',
+            headers={'Content-Disposition': 'attachment; filename=purchase_slips.pdf'}
+        )
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except RendererBusy as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 503, {'Retry-After': '5'}
+    except TimeoutError as e:
+        print(f"PDF render timed out: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 504
+    except IOError as e:
+        print(f"PDF render failed: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
-        print(f"Error generating PDF: {e}")
+        print(f"Error generating batch PDF: {e}")
         return jsonify({
             'success': False,
             'message': str(e)
@@ -680,6 +1274,18 @@ def generate_slip_pdf(slip_id):
         if conn:
             conn.close()
 
+def format_print_dates(slip):
+    """Add IST display copies (<field>_formatted) of the slip's datetime fields for printing"""
+    datetime_fields = ['date', 'payment_date', 'payment_due_date',
+                      'instalment_1_date', 'instalment_2_date', 'instalment_3_date',
+                      'instalment_4_date', 'instalment_5_date']
+
+    for field in datetime_fields:
+        if slip.get(field):
+            slip[f'{field}_formatted'] = format_ist_datetime(slip[field])
+    return slip
+
+
 @slips_bp.route('/print/<int:slip_id>')
 def print_slip(slip_id):
     """Render print template for a slip with calculated amounts"""
@@ -689,28 +1295,37 @@ def print_slip(slip_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute('SELECT * FROM purchase_slips WHERE id = %s', (slip_id,))
+        # The page also changes with the template, so its digest is part of the ETag
+        variant = '-print-' + render_cache.template_digest('print_template_new.html')[:12]
+        if request_is_conditional():
+            version = fetch_slip_version(cursor, slip_id)
+            if version and is_not_modified(slip_etag(slip_id, version[0], variant), version[1]):
+                return not_modified_response(slip_etag(slip_id, version[0], variant), version[1])
+
+        cursor.execute(SLIP_SELECT_SQL, (slip_id,))
         slip = cursor.fetchone()
 
         if slip is None:
             return "Slip not found", 404
 
-        # Calculate Total Paid and Balance for print
-        total_paid, balance_amount = calculate_payment_totals(slip)
-        slip['total_paid_amount'] = total_paid
-        slip['balance_amount'] = balance_amount
-
-        # Format all datetime fields to IST for printing
-        datetime_fields = ['date', 'payment_date', 'payment_due_date',
-                          'instalment_1_date', 'instalment_2_date', 'instalment_3_date',
-                          'instalment_4_date', 'instalment_5_date']
+        etag = slip_etag(slip_id, slip['row_version'], variant)
+        last_modified = http_last_modified(slip['updated_at'])
+        slip['payments'] = format_payments(fetch_slip_payments(cursor, slip_id))
 
-        for field in datetime_fields:
-            if slip.get(field):
-                slip[f'{field}_formatted'] = format_ist_datetime(slip[field])
+        key = render_cache.cache_key('print', slip)
+        html_file = render_cache.open_entry('print', slip_id, key)
+        if html_file is None:
+            format_print_dates(slip)
+            html = render_template('print_template_new.html', slip=slip).encode('utf-8')
+            render_cache.store('print', slip_id, key, html)
+            html_file = io.BytesIO(html)
 
-        return render_template('print_template_new.html', slip=slip)
+        response = send_file(html_file, mimetype='text/html', etag=etag, last_modified=last_modified)
+        response.cache_control.no_cache = True
+        return response
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         print(f"Error rendering print: {e}")
         return str(e), 400
@@ -721,6 +1336,323 @@ def print_slip(slip_id):
             conn.close()
 
 
+# THERMAL PRINTER (ESC/POS) API
+
+@slips_bp.route('/api/slip/<int:slip_id>/escpos', methods=['GET', 'POST'])
+def print_slip_escpos(slip_id):
+    """
+    Raw ESC/POS receipt for 80mm thermal printers.
+    GET returns the bytes (for a local print agent or inspection);
+    POST sends them to the THERMAL_PRINTER device / file / tcp://host:port.
+    ?width= overrides the characters per line (32 for 58mm paper).
+    """
+    from escpos import build_slip_receipt, send_to_printer, LINE_WIDTH
+
+    conn = None
+    cursor = None
+    try:
+        width = int(request.args.get('width', LINE_WIDTH))
+        if not 24 <= width <= 64:
+            raise ValueError('width must be between 24 and 64')
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(SLIP_SELECT_SQL, (slip_id,))
+        slip = cursor.fetchone()
+
+        if slip is None:
+            return jsonify({'success': False, 'message': 'Slip not found'}), 404
+
+        slip['payments'] = format_payments(fetch_slip_payments(cursor, slip_id))
+        receipt = build_slip_receipt(format_print_dates(slip), width)
+
+        if request.method == 'GET':
+            return Response(
+                receipt,
+                mimetype='application/octet-stream',
+                headers={'Content-Disposition': f'attachment; filename=purchase_slip_{slip_id}.bin'}
+            )
+
+        target = send_to_printer(receipt)
+        print(f"✓ Slip {slip_id} sent to thermal printer {target} ({len(receipt)} bytes)")
+        return jsonify({
+            'success': True,
+            'message': 'Slip sent to printer',
+            'bytes': len(receipt)
+        }), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error printing slip to thermal printer: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# BULK IMPORT API
+
+@slips_bp.route('/api/slips/import', methods=['POST'])
+def import_slips_route():
+    """
+    Bulk import slips from an uploaded CSV / XLSX file (multipart field 'file',
+    or the raw request body with ?format=csv|xlsx).
+    ?batch_size= rows per transaction, ?dry_run=1 validates and rolls back,
+    ?stream=1 answers with one JSON progress line per batch (NDJSON).
+    """
+    from importer import iter_file_rows, iter_import, IMPORT_BATCH_SIZE
+
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, filename = upload.stream, upload.filename or ''
+        else:
+            stream, filename = request.stream, ''
+        rows = iter_file_rows(stream, filename, request.args.get('format'))
+        batch_size = min(max(int(request.args.get('batch_size', IMPORT_BATCH_SIZE)), 1), 10000)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+
+    def run_import():
+        # Opened and checked before the response starts, so a refused
+        # import is still answered with a 400
+        conn = get_db_connection()
+        try:
+            progress = iter_import(conn, rows, batch_size, dry_run)
+        except Exception:
+            conn.close()
+            raise
+
+        def consume():
+            try:
+                yield from progress
+            finally:
+                conn.close()
+        return consume()
+
+    if request.args.get('stream') in ('1', 'true'):
+        try:
+            progress = run_import()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        def generate():
+            for summary in progress:
+                yield json.dumps(dict(summary, errors=summary['errors'][-20:])) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        summary = None
+        for summary in run_import():
+            print(f"  … imported {summary['imported']} / {summary['rows']} rows")
+        print(f"✅ Import finished: {summary['imported']} imported, {summary['failed']} failed")
+
+        return jsonify({
+            'success': True,
+            'dry_run': dry_run,
+            'rows': summary['rows'],
+            'imported': summary['imported'],
+            'failed': summary['failed'],
+            'errors': summary['errors']
+        }), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"❌ Error importing slips: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+
+# BATCH RECALCULATION API
+
+@slips_bp.route('/api/slips/recalculate', methods=['POST'])
+def recalculate_slips_route():
+    """
+    Recalculate the financials of every slip matching 'filters' (same keys as
+    the /api/slips query string) with 'set' applied, e.g.
+    {"filters": {"date_from": "2025-04-01"}, "set": {"hammali_rate": 6}}.
+    Returns a diff preview; nothing is written unless "apply": true.
+    """
+    from recalc import recalculate_slips
+
+    conn = None
+    try:
+        data = request.json or {}
+        filters = {key: str(value) for key, value in (data.get('filters') or {}).items()}
+
+        conn = get_db_connection()
+        summary = recalculate_slips(
+            conn, filters, data.get('set'),
+            apply=bool(data.get('apply')), verify=bool(data.get('verify'))
+        )
+
+        if summary['applied']:
+            print(f"✅ Recalculated {summary['changed'] - summary['skipped']} of {summary['matched']} slips "
+                  f"(payable {summary['payable_delta']:+.2f})")
+            if summary['skipped']:
+                print(f"⚠️ Skipped {summary['skipped']} slips edited during the recalc")
+
+        return jsonify(dict(summary, success=True)), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"❌ Error recalculating slips: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if conn:
+            conn.close()
+
+
+# PARTY LEDGER API
+
+@slips_bp.route('/api/parties/<path:party_name>/ledger', methods=['GET'])
+def get_party_ledger_route(party_name):
+    """Running slip count, weight, payable, paid and balance for one party"""
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        ledger = get_party_ledger(cursor, party_name)
+        if ledger is None:
+            return jsonify({
+                'success': False,
+                'message': 'Party not found'
+            }), 404
+
+        if ledger.get('updated_at'):
+            ledger['updated_at'] = format_ist_datetime(ledger['updated_at'])
+
+        return jsonify({
+            'success': True,
+            'ledger': ledger
+        }), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error fetching party ledger: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# PAYMENT SEARCH API
+
+@slips_bp.route('/api/payments', methods=['GET'])
+def search_payments():
+    """
+    Payments across all slips, newest first.
+    Filters: date_from, date_to, payment_method, bank_account, slip_id, limit
+    """
+    conn = None
+    cursor = None
+    try:
+        conditions = []
+        params = []
+        try:
+            if request.args.get('date_from'):
+                conditions.append('p.payment_date >= %s')
+                params.append(parse_filter_date(request.args['date_from']))
+            if request.args.get('date_to'):
+                date_to = request.args['date_to'].strip()
+                if len(date_to) == 10:
+                    conditions.append('p.payment_date < %s')
+                    params.append(parse_filter_date(date_to) + timedelta(days=1))
+                else:
+                    conditions.append('p.payment_date <= %s')
+                    params.append(parse_filter_date(date_to))
+            limit = min(max(int(request.args.get('limit', 100)), 1), MAX_PAGE_LIMIT)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if request.args.get('payment_method'):
+            conditions.append('p.payment_method = %s')
+            params.append(request.args['payment_method'])
+        if request.args.get('bank_account'):
+            conditions.append('p.payment_bank_account = %s')
+            params.append(request.args['bank_account'])
+        if request.args.get('slip_id'):
+            conditions.append('p.slip_id = %s')
+            params.append(int(request.args['slip_id']))
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        where = where_clause(conditions)
+        cursor.execute(f'''
+            SELECT p.slip_id, p.instalment_no, p.payment_date AS date, p.amount,
+                   p.payment_method, p.payment_bank_account, p.comment,
+                   s.bill_no, s.party_name
+            FROM purchase_slip_payments p
+            JOIN purchase_slips s ON s.id = p.slip_id
+            {where}
+            ORDER BY p.payment_date DESC, p.id DESC
+            LIMIT %s
+        ''', (*params, limit))
+        payments = format_payments(cursor.fetchall())
+
+        cursor.execute(f'''
+            SELECT COUNT(*) AS count, COALESCE(SUM(p.amount), 0) AS total_amount
+            FROM purchase_slip_payments p
+            {where}
+        ''', params)
+        summary = cursor.fetchone()
+
+        return jsonify({
+            'success': True,
+            'payments': payments,
+            'count': summary['count'],
+            'total_amount': round(summary['total_amount'], 2)
+        }), 200
+
+    except DatabaseUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error searching payments: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 # UNLOADING GODOWN DYNAMIC DROPDOWN APIs
 
 @slips_bp.route('/api/unloading-godowns', methods=['GET'])
@@ -747,6 +1679,8 @@ def get_unloading_godowns():
             'godowns': godowns
         }), 200
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         error_msg = f"Error fetching unloading godowns: {str(e)}"
         print(f"❌ {error_msg}")
@@ -812,6 +1746,8 @@ def add_unloading_godown():
             'message': 'Godown added successfully'
         }), 201
 
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         error_msg = f"Error adding unloading godown: {str(e)}"
         print(f"❌ {error_msg}")
@@ -0,0 +1,212 @@
+"""
+Production HTTP server for the Flask app
+
+`python backend/app.py` serves with waitress (pure Python, runs on Windows);
+Flask's development server with the reloader and interactive debugger is
+only used with --debug or APP_DEBUG=1.
+
+- SERVER_THREADS (--threads, default 8) worker threads run the requests;
+  up to SERVER_CONNECTION_LIMIT (default 100) connections are accepted and
+  their requests wait for a free thread
+- SERVER_PROCESSES (--processes, default 1): more than one pre-forks that
+  many worker processes sharing the listening socket (not on Windows). Each
+  worker opens its own database connections and PDF render service
+- HTTP/1.1 keep-alive; a connection that sends or receives nothing for
+  SERVER_TIMEOUT seconds (--timeout, default 30) is closed, whether it is
+  idle between requests or a stalled client mid-request
+- SIGTERM / SIGINT (Ctrl+C) stop accepting, let in-flight requests finish
+  (up to SERVER_DRAIN_TIMEOUT seconds, default 30), then close the database
+  connections and stop the PDF render workers
+
+Without waitress installed the app falls back to Werkzeug's threaded server
+(no debugger, no reloader) and says so on startup.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+try:
+    from waitress import create_server, wasyncore
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+SERVER_HOST = os.environ.get('APP_HOST') or '127.0.0.1'
+SERVER_PORT = int(os.environ.get('APP_PORT') or 5000)
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS') or 8)
+SERVER_PROCESSES = int(os.environ.get('SERVER_PROCESSES') or 1)
+SERVER_CONNECTION_LIMIT = int(os.environ.get('SERVER_CONNECTION_LIMIT') or 100)
+SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT') or 30)
+SERVER_DRAIN_TIMEOUT = float(os.environ.get('SERVER_DRAIN_TIMEOUT') or 30)
+APP_DEBUG = os.environ.get('APP_DEBUG', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def parse_server_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the purchase slip server')
+    parser.add_argument('--debug', action='store_true', default=APP_DEBUG,
+                        help='Flask development server with reloader and debugger (never in production)')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help='worker threads per process')
+    parser.add_argument('--processes', type=int, default=SERVER_PROCESSES, help='worker processes (POSIX only)')
+    parser.add_argument('--connection-limit', type=int, default=SERVER_CONNECTION_LIMIT,
+                        help='open connections per process')
+    parser.add_argument('--timeout', type=int, default=SERVER_TIMEOUT,
+                        help='seconds without activity before a connection is closed')
+    parser.add_argument('--drain-timeout', type=float, default=SERVER_DRAIN_TIMEOUT,
+                        help='seconds shutdown waits for in-flight requests')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print per-phase startup timings once the server is ready')
+    return parser.parse_args(argv)
+
+
+def close_resources():
+    """Release what the app holds open: PDF render workers and DB connections"""
+    from database import close_db_connections
+    from pdf_render import shutdown_render_service
+
+    shutdown_render_service()
+    close_db_connections()
+
+
+def _waitress_options(options):
+    return {
+        'threads': options.threads,
+        'connection_limit': options.connection_limit,
+        'channel_timeout': options.timeout,
+        'ident': 'purchase-slips',
+    }
+
+
+def _busy(server):
+    """True while a connection has a request running or a response left to send"""
+    return any(channel.requests or channel.total_outbufs_len
+               for channel in list(server.active_channels.values()))
+
+
+def _serve(server, socket_map, drain_timeout, label=''):
+    """Run one waitress server until SIGTERM / SIGINT, then drain and clean up"""
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    use_poll = server.adj.asyncore_use_poll
+    while not stopping.is_set():
+        wasyncore.loop(timeout=1.0, map=socket_map, use_poll=use_poll, count=1)
+
+    # Stop accepting (closes only the listening socket), then keep the loop
+    # running so responses of in-flight requests still go out
+    print(f"⏳ {label}Stopping: finishing in-flight requests...")
+    wasyncore.dispatcher.close(server)
+    deadline = time.monotonic() + drain_timeout
+    while _busy(server) and time.monotonic() < deadline:
+        wasyncore.loop(timeout=0.1, map=socket_map, use_poll=use_poll, count=1)
+
+    server.task_dispatcher.shutdown()
+    wasyncore.close_all(socket_map)
+    close_resources()
+    print(f"✓ {label}Server stopped")
+
+
+def _prefork(options, app, on_listening=None):
+    """Bind once, fork `processes` workers on the shared socket and supervise them"""
+    from database import close_db_connections
+    from startup import startup
+
+    listener = socket.create_server((options.host, options.port), backlog=1024)
+    # Let the database startup finish before forking so every worker inherits
+    # a migrated schema; workers open their own connections, don't share the parent's
+    startup.wait_for_database(timeout=None)
+    close_db_connections()
+
+    workers = set()
+    stopping = False
+
+    def start_worker():
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                socket_map = {}
+                server = create_server(app, map=socket_map, sockets=[listener], **_waitress_options(options))
+                _serve(server, socket_map, options.drain_timeout, f'[worker {os.getpid()}] ')
+                status = 0
+            finally:
+                os._exit(status)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    # Before forking, so workers inherit the ready state instead of each
+    # reporting it again
+    if on_listening:
+        on_listening()
+    for _ in range(options.processes):
+        start_worker()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited (status {status}); starting a new one")
+            start_worker()
+
+    listener.close()
+    print("✓ Server stopped")
+
+
+def run_server(app, options, on_listening=None):
+    """
+    Serve `app` until SIGTERM / SIGINT (blocks).
+    on_listening() is called once the server socket is bound.
+    """
+    if not WAITRESS_AVAILABLE:
+        print("⚠️ waitress is not installed (pip install waitress); "
+              "using Werkzeug's threaded server without keep-alive or graceful shutdown")
+        # app.run() binds and blocks; the first /api/health/ready request
+        # marks the socket as listening instead
+        try:
+            app.run(host=options.host, port=options.port, threaded=True)
+        finally:
+            close_resources()
+        return 0
+
+    processes = options.processes
+    if processes > 1 and not hasattr(os, 'fork'):
+        print("⚠️ --processes needs os.fork(); running a single process")
+        processes = 1
+
+    print(f"✓ Serving on http://{options.host}:{options.port} "
+          f"({processes} process(es) x {options.threads} thread(s), timeout {options.timeout}s)")
+
+    if processes > 1:
+        options.processes = processes
+        _prefork(options, app, on_listening)
+    else:
+        socket_map = {}
+        server = create_server(app, map=socket_map, host=options.host, port=options.port,
+                               **_waitress_options(options))
+        if on_listening:
+            on_listening()
+        _serve(server, socket_map, options.drain_timeout)
+    return 0
@@ -0,0 +1,192 @@
+"""
+Slip financials and payments
+
+slip_financials() derives the weights, amounts and deductions of a slip
+from its parsed inputs; calculate_fields() is the same on a row / payload
+dict. The payment list helpers and slip_insert_params() sit here too.
+They live outside the routes so the importer, recalc and manage.py can use
+them without loading the Flask blueprints.
+"""
+
+from slip_schema import safe_float, parse_datetime_to_ist, slip_row, SLIP_INSERT_COLUMNS
+from database import utc_now
+
+
+# Arguments of slip_financials(), in order
+FINANCIAL_INPUTS = (
+    'net_weight_kg', 'gunny_weight_kg', 'bags', 'rate_basis', 'rate_value',
+    'batav_percent', 'shortage_percent', 'dalali_rate', 'hammali_rate',
+    'bank_commission', 'postage', 'freight', 'rate_diff', 'quality_diff', 'moisture_ded', 'tds',
+)
+
+# Values slip_financials() returns, in order
+FINANCIAL_COLUMNS = (
+    'final_weight_kg', 'weight_quintal', 'weight_khandi', 'avg_bag_weight',
+    'total_purchase_amount', 'batav', 'shortage', 'dalali', 'hammali',
+    'total_deduction', 'payable_amount',
+)
+
+
+def slip_financials(net_weight_kg, gunny_weight_kg, bags, rate_basis, rate_value,
+                    batav_percent, shortage_percent, dalali_rate, hammali_rate,
+                    bank_commission, postage, freight, rate_diff, quality_diff, moisture_ded, tds):
+    """
+    The slip formulas, on already parsed inputs (floats, rate_basis a str).
+    Returns the FINANCIAL_COLUMNS values as a tuple. calculate_fields(),
+    Slip.calculate() and recalc.recalculate_columns() all go through here.
+    """
+    final_weight_kg = round(max(0, net_weight_kg - gunny_weight_kg), 2)
+    weight_quintal = round(final_weight_kg / 100, 3)
+    weight_khandi = round(final_weight_kg / 150, 3)
+    avg_bag_weight = round(final_weight_kg / bags, 2) if bags > 0 else 0
+
+    if rate_basis == 'Quintal':
+        total_purchase_amount = round(weight_quintal * rate_value, 2)
+    elif rate_basis == 'Khandi':
+        total_purchase_amount = round(weight_khandi * rate_value, 2)
+    else:
+        total_purchase_amount = 0
+
+    batav = round(total_purchase_amount * (batav_percent / 100), 2) if batav_percent > 0 else 0
+    shortage = round(total_purchase_amount * (shortage_percent / 100), 2) if shortage_percent > 0 else 0
+
+    # NEW CALCULATION: Dalali & Hamali based on Net Weight KG / 100
+    dalali = round((net_weight_kg / 100) * dalali_rate, 2) if dalali_rate > 0 else 0
+    hammali = round((net_weight_kg / 100) * hammali_rate, 2) if hammali_rate > 0 else 0
+
+    total_deduction = round(bank_commission + postage + batav + shortage + dalali + hammali + freight + rate_diff + quality_diff + moisture_ded + tds, 2)
+    payable_amount = round(total_purchase_amount - total_deduction, 2)
+
+    return (final_weight_kg, weight_quintal, weight_khandi, avg_bag_weight,
+            total_purchase_amount, batav, shortage, dalali, hammali,
+            total_deduction, payable_amount)
+
+
+def calculate_fields(data):
+    """Calculate all computed fields with NEW weight & rate system"""
+    net_weight_kg = safe_float(data.get('net_weight_kg', 0), 0)
+    gunny_weight_kg = safe_float(data.get('gunny_weight_kg', 0), 0)
+    bags = safe_float(data.get('bags', 0), 0)
+    rate_basis = data.get('rate_basis', 'Quintal')
+    rate_value = safe_float(data.get('rate_value', 0), 0)
+
+    bank_commission = safe_float(data.get('bank_commission', 0), 0)
+    postage = safe_float(data.get('postage', 0), 0)
+    freight = safe_float(data.get('freight', 0), 0)
+    rate_diff = safe_float(data.get('rate_diff', 0), 0)
+    quality_diff = safe_float(data.get('quality_diff', 0), 0)
+    moisture_ded = safe_float(data.get('moisture_ded', 0), 0)
+    tds = safe_float(data.get('tds', 0), 0)
+    batav_percent = safe_float(data.get('batav_percent', 0), 0)
+    shortage_percent = safe_float(data.get('shortage_percent', 0), 0)
+    dalali_rate = safe_float(data.get('dalali_rate', 0), 0)
+    hammali_rate = safe_float(data.get('hammali_rate', 0), 0)
+
+    data.update(zip(FINANCIAL_COLUMNS, slip_financials(
+        net_weight_kg, gunny_weight_kg, bags, rate_basis, rate_value,
+        batav_percent, shortage_percent, dalali_rate, hammali_rate,
+        bank_commission, postage, freight, rate_diff, quality_diff, moisture_ded, tds,
+    )))
+    data.update({
+        'net_weight_kg': net_weight_kg,
+        'gunny_weight_kg': gunny_weight_kg,
+        'rate_basis': rate_basis,
+        'rate_value': rate_value,
+        'freight': freight,
+        'rate_diff': rate_diff,
+        'quality_diff': quality_diff,
+        'moisture_ded': moisture_ded,
+        'tds': tds,
+        'postage': postage,
+    })
+    return data
+
+
+# PAYMENTS
+
+def calculate_payment_totals(data):
+    """
+    Calculate Total Paid Amount and Balance Amount for the stored columns
+    Total Paid = Sum of all instalment amounts (data['payments'] when present)
+    Balance = Payable Amount - Total Paid
+    """
+    payable_amount = safe_float(data.get('payable_amount', 0), 0)
+
+    # Sum all instalment amounts
+    total_paid = 0.0
+    if data.get('payments') is not None:
+        for payment in data['payments']:
+            total_paid += safe_float(payment.get('amount', 0), 0)
+    else:
+        for i in range(1, 6):
+            instalment_amount = safe_float(data.get(f'instalment_{i}_amount', 0), 0)
+            total_paid += instalment_amount
+
+    total_paid = round(total_paid, 2)
+    balance_amount = round(payable_amount - total_paid, 2)
+
+    return total_paid, balance_amount
+
+
+# Fixed instalment columns mirrored from the first payments for older clients
+INSTALMENT_SLOTS = 5
+
+
+def normalize_payment(raw):
+    """Convert one payment from request JSON into column values"""
+    return {
+        'date': parse_datetime_to_ist(raw.get('date')),
+        'amount': safe_float(raw.get('amount', 0), 0),
+        'payment_method': raw.get('payment_method', '') or '',
+        'payment_bank_account': raw.get('payment_bank_account', '') or '',
+        'comment': raw.get('comment', '') or ''
+    }
+
+
+def payment_is_empty(payment):
+    return not (payment['date'] or payment['amount'] or payment['payment_method']
+                or payment['payment_bank_account'] or payment['comment'])
+
+
+def payments_from_instalment_fields(data):
+    """Build the payment list from the fixed instalment_{1..5}_* fields"""
+    payments = []
+    for i in range(1, INSTALMENT_SLOTS + 1):
+        payment = normalize_payment({
+            'date': data.get(f'instalment_{i}_date'),
+            'amount': data.get(f'instalment_{i}_amount', 0),
+            'payment_method': data.get(f'instalment_{i}_payment_method', ''),
+            'payment_bank_account': data.get(f'instalment_{i}_payment_bank_account', ''),
+            'comment': data.get(f'instalment_{i}_comment', '')
+        })
+        if not payment_is_empty(payment):
+            payments.append(payment)
+    return payments
+
+
+def payments_from_request(data):
+    """Payments sent as a 'payments' list, or the legacy fixed fields"""
+    if isinstance(data.get('payments'), list):
+        payments = [normalize_payment(raw) for raw in data['payments']]
+        return [payment for payment in payments if not payment_is_empty(payment)]
+    return payments_from_instalment_fields(data)
+
+
+def mirror_payments_to_instalment_fields(data, payments):
+    """Write the first five payments into the fixed instalment_N_* fields"""
+    for i in range(1, INSTALMENT_SLOTS + 1):
+        payment = payments[i - 1] if i <= len(payments) else None
+        data[f'instalment_{i}_date'] = payment['date'] if payment else None
+        data[f'instalment_{i}_amount'] = payment['amount'] if payment else 0
+        data[f'instalment_{i}_payment_method'] = payment['payment_method'] if payment else ''
+        data[f'instalment_{i}_payment_bank_account'] = payment['payment_bank_account'] if payment else ''
+        data[f'instalment_{i}_comment'] = payment['comment'] if payment else ''
+    return data
+
+
+def slip_insert_params(data, slip_date, bill_series, bill_no, total_paid, balance_amount):
+    """Parameter tuple for SLIP_INSERT_SQL (shared by add_slip and the bulk importer)"""
+    row = slip_row(data)
+    row.update(date=slip_date, bill_series=bill_series, bill_no=bill_no,
+               total_paid_amount=total_paid, balance_amount=balance_amount, updated_at=utc_now())
+    return tuple(row[name] for name in SLIP_INSERT_COLUMNS)
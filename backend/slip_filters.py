@@ -0,0 +1,87 @@
+"""
+List filters for purchase_slips
+
+build_slip_filters() turns request args (or a plain dict) into SQL
+conditions; the list, export, batch PDF and recalc code share it so every
+one of them selects the same slips for the same query string.
+"""
+
+from datetime import timedelta
+
+from slip_schema import parse_datetime_to_ist
+
+# ?param -> column for exact-match filters (each backed by an index)
+SLIP_EQUALITY_FILTERS = {
+    'party': 'party_name',
+    'broker': 'broker',
+    'material': 'material_name',
+    'godown': 'paddy_unloading_godown',
+    'vehicle_no': 'vehicle_no',
+    'ticket_no': 'ticket_no',
+    'rate_basis': 'rate_basis',
+}
+
+
+def parse_filter_date(value):
+    """Parse a YYYY-MM-DD (or ISO datetime) filter bound"""
+    parsed = parse_datetime_to_ist(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date: {value}')
+    return parsed
+
+
+def build_slip_filters(args):
+    """
+    Translate request args into SQL conditions for purchase_slips.
+
+    Supported: date_from, date_to (inclusive), party, broker, material,
+    godown, vehicle_no, ticket_no, rate_basis, bill_no_from, bill_no_to,
+    outstanding=1 (balance > 0, served by idx_balance_amount) and q (party/material substring search).
+    Returns (conditions, params); raises ValueError on bad input.
+    """
+    conditions = []
+    params = []
+
+    if args.get('date_from'):
+        conditions.append('date >= %s')
+        params.append(parse_filter_date(args['date_from']))
+    if args.get('date_to'):
+        date_to = args['date_to'].strip()
+        if len(date_to) == 10:
+            # Whole day: everything before the next midnight
+            conditions.append('date < %s')
+            params.append(parse_filter_date(date_to) + timedelta(days=1))
+        else:
+            conditions.append('date <= %s')
+            params.append(parse_filter_date(date_to))
+
+    for param, column in SLIP_EQUALITY_FILTERS.items():
+        # Stripped like the stored names and the ledger key; blank means no filter
+        value = (args.get(param) or '').strip()
+        if value:
+            conditions.append(f'{column} = %s')
+            params.append(value)
+
+    if args.get('bill_no_from'):
+        conditions.append('bill_no >= %s')
+        params.append(int(args['bill_no_from']))
+    if args.get('bill_no_to'):
+        conditions.append('bill_no <= %s')
+        params.append(int(args['bill_no_to']))
+
+    if args.get('outstanding') in ('1', 'true'):
+        conditions.append('balance_amount > 0.005')
+
+    if args.get('q'):
+        term = args['q'].strip()
+        # Substring match, as the list search always was; no index serves it
+        pattern = '%' + term.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+        conditions.append("(party_name LIKE %s ESCAPE '!' OR material_name LIKE %s ESCAPE '!')")
+        params.extend([pattern, pattern])
+
+    return conditions, params
+
+
+def where_clause(conditions):
+    """Join filter conditions into a WHERE clause ('' when unfiltered)"""
+    return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
@@ -0,0 +1,107 @@
+"""
+Slip record type for the write paths
+
+A Slip holds one purchase_slips row in __slots__ attributes, one per
+registry column plus id, instead of an ~80-key dict. DB rows and request
+JSON decode into it in one pass, calculate() runs the slip formulas on the
+attributes, and the *_values() helpers produce the SQL parameters straight
+from the slots, so add / PUT no longer copy, merge and re-read the row dict
+several times.
+
+get() / [] / []= follow the dict interface, so helpers written for row
+dicts (the aggregates, the instalment mirroring) accept a Slip as is.
+
+bench_slip_record.py compares this against the dict pipeline.
+"""
+
+from operator import attrgetter
+
+from slip_calc import slip_financials, FINANCIAL_INPUTS, FINANCIAL_COLUMNS
+from slip_schema import (
+    SLIP_COLUMNS, PAYLOAD_COLUMNS, SLIP_INSERT_COLUMNS, SLIP_UPDATE_COLUMNS, safe_float,
+)
+
+_DEFAULTS = tuple((col.name, col.default) for col in SLIP_COLUMNS)
+_PAYLOAD_PARSERS = {col.name: (col.parser, col.default) for col in PAYLOAD_COLUMNS}
+
+# One C-level call each instead of a generator over column names
+_insert_values = attrgetter(*SLIP_INSERT_COLUMNS)
+_update_values = attrgetter(*SLIP_UPDATE_COLUMNS)
+_financial_inputs = attrgetter(*FINANCIAL_INPUTS)
+
+_NUMERIC_INPUTS = tuple(name for name in FINANCIAL_INPUTS if name != 'rate_basis')
+
+
+class Slip:
+    """One purchase slip; attributes are the purchase_slips columns"""
+
+    __slots__ = ('id',) + tuple(name for name, _ in _DEFAULTS)
+
+    def __init__(self):
+        self.id = None
+        for name, default in _DEFAULTS:
+            setattr(self, name, default)
+
+    @classmethod
+    def from_row(cls, row):
+        """Slip from a DB row dict (values are already typed by the driver)"""
+        slip = cls.__new__(cls)
+        slip.id = row.get('id')
+        for name, default in _DEFAULTS:
+            setattr(slip, name, row.get(name, default))
+        # NULL / DECIMAL inputs become floats here, so calculate() can use them as is
+        for name in _NUMERIC_INPUTS:
+            setattr(slip, name, safe_float(getattr(slip, name), 0))
+        return slip
+
+    @classmethod
+    def from_payload(cls, data):
+        """Slip from request JSON; unknown and managed keys are ignored"""
+        slip = cls()
+        slip.update(data)
+        return slip
+
+    def update(self, data):
+        """Parse and apply the payload columns present in `data`"""
+        for name, value in data.items():
+            parser = _PAYLOAD_PARSERS.get(name)
+            if parser is not None:
+                setattr(self, name, parser[0](value, parser[1]))
+
+    def calculate(self):
+        """
+        Recompute the derived columns from the inputs (slip_calc.slip_financials()).
+        The inputs are parsed when set by from_row() / update(), not again here.
+        """
+        for name, value in zip(FINANCIAL_COLUMNS, slip_financials(*_financial_inputs(self))):
+            setattr(self, name, value)
+        return self
+
+    def insert_values(self):
+        """Parameters for SLIP_INSERT_SQL"""
+        return _insert_values(self)
+
+    def update_values(self):
+        """Column parameters for SLIP_UPDATE_SQL (append updated_at and id)"""
+        return _update_values(self)
+
+    def to_dict(self):
+        """Plain dict for jsonify()"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    # dict interface for helpers written against row dicts
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def __repr__(self):
+        return f'<Slip id={self.id} bill_no={self.bill_no} party={self.party_name!r}>'
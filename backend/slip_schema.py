@@ -0,0 +1,281 @@
+"""
+Column registry for purchase_slips
+
+Every column of the table is declared once in SLIP_COLUMNS with its SQL
+type, default, parser and, for calculated columns, the columns it is derived
+from. The INSERT / UPDATE / SELECT statements and column lists used by the
+slip routes and the importer are generated from it once at import time, so
+adding a column is one entry here instead of edits to every statement.
+(sqlite3's statement cache reuses the compiled statement for the constant
+text; mysql-connector's default cursors send the text each time and the
+server parses it again.)
+
+slip_row() converts a request payload (or a calculated slip dict) into
+typed column values in a single pass, one parser call per column.
+
+The migrations keep their own frozen DDL: they describe how older
+databases reach the current schema and must not change when this list does.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def ist_timezone():
+    """Asia/Kolkata; pytz and its zone file load on first use, not at startup"""
+    from pytz import timezone
+    return timezone('Asia/Kolkata')
+
+
+def ist_now():
+    """Current IST wall-clock time, naive like the stored slip dates"""
+    return datetime.now(ist_timezone()).replace(tzinfo=None, microsecond=0)
+
+
+def safe_float(value, default=0.0):
+    """Safely convert value to float, handling empty strings and None"""
+    try:
+        if value in (None, '', ' '):
+            return default
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_datetime_to_ist(value):
+    """Parse date/datetime string and convert to IST datetime object"""
+    if value in (None, '', ' '):
+        return None
+
+    ist = ist_timezone()
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return ist.localize(value)
+        return value.astimezone(ist)
+
+    if isinstance(value, str):
+        try:
+            if 'T' in value or ' ' in value:
+                dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            else:
+                dt = datetime.strptime(value, '%Y-%m-%d')
+                dt = dt.replace(hour=0, minute=0, second=0)
+
+            if dt.tzinfo is None:
+                dt = ist.localize(dt)
+            else:
+                dt = dt.astimezone(ist)
+
+            return dt.replace(tzinfo=None)
+        except:
+            return None
+
+    return None
+
+
+def parse_text(value, default):
+    return value
+
+
+def parse_number(value, default):
+    return safe_float(value, default)
+
+
+def parse_datetime(value, default):
+    return parse_datetime_to_ist(value)
+
+
+# derived: tuple of the columns calculate_fields() computes the column from
+# managed: set by the write paths themselves, never taken from a payload
+# legacy: still in the table, no longer written
+Column = namedtuple('Column', 'name sql_type default parser derived managed legacy')
+
+
+def column(name, sql_type, default=None, parser=parse_text, derived=None, managed=False, legacy=False):
+    return Column(name, sql_type, default, parser, derived, managed, legacy)
+
+
+def text(name, sql_type='TEXT', default='', **options):
+    return column(name, sql_type, default, parse_text, **options)
+
+
+def number(name, **options):
+    return column(name, 'DOUBLE', 0, parse_number, **options)
+
+
+def timestamp(name, **options):
+    return column(name, 'DATETIME', None, parse_datetime, **options)
+
+
+def _instalment_columns(number_):
+    return [
+        timestamp(f'instalment_{number_}_date'),
+        number(f'instalment_{number_}_amount'),
+        text(f'instalment_{number_}_comment'),
+        text(f'instalment_{number_}_payment_method', 'VARCHAR(255)'),
+        text(f'instalment_{number_}_payment_bank_account'),
+    ]
+
+
+SLIP_COLUMNS = (
+    text('company_name'),
+    text('company_address'),
+    text('document_type', 'VARCHAR(255)', 'Purchase Slip'),
+    text('vehicle_no', 'VARCHAR(255)'),
+    timestamp('date'),
+    column('bill_no', 'INT', managed=True),
+    text('party_name'),
+    text('mobile_number', 'VARCHAR(15)'),
+    text('material_name'),
+    text('ticket_no', 'VARCHAR(255)'),
+    text('broker', 'VARCHAR(255)'),
+    text('terms_of_delivery'),
+    text('sup_inv_no', 'VARCHAR(255)'),
+    text('gst_no', 'VARCHAR(255)'),
+    number('bags'),
+    number('avg_bag_weight', derived=('final_weight_kg', 'bags')),
+    number('net_weight', legacy=True),
+    number('net_weight_kg'),
+    number('gunny_weight_kg'),
+    number('final_weight_kg', derived=('net_weight_kg', 'gunny_weight_kg')),
+    number('weight_quintal', derived=('final_weight_kg',)),
+    number('weight_khandi', derived=('final_weight_kg',)),
+    number('shortage_kg', legacy=True),
+    number('rate', legacy=True),
+    text('rate_basis', 'VARCHAR(50)', 'Quintal'),
+    number('rate_value'),
+    number('calculated_rate', legacy=True),
+    number('total_purchase_amount',
+           derived=('weight_quintal', 'weight_khandi', 'rate_basis', 'rate_value')),
+    number('amount', legacy=True),
+    number('bank_commission'),
+    number('postage'),
+    number('batav_percent'),
+    number('batav', derived=('total_purchase_amount', 'batav_percent')),
+    number('shortage_percent'),
+    number('shortage', derived=('total_purchase_amount', 'shortage_percent')),
+    number('dalali_rate'),
+    number('dalali', derived=('net_weight_kg', 'dalali_rate')),
+    number('hammali_rate'),
+    number('hammali', derived=('net_weight_kg', 'hammali_rate')),
+    number('freight'),
+    number('rate_diff'),
+    number('quality_diff'),
+    text('quality_diff_comment'),
+    number('moisture_ded'),
+    text('moisture_ded_comment'),
+    number('moisture_ded_percent', legacy=True),
+    number('tds'),
+    number('total_deduction', derived=('bank_commission', 'postage', 'batav', 'shortage', 'dalali',
+                                       'hammali', 'freight', 'rate_diff', 'quality_diff',
+                                       'moisture_ded', 'tds')),
+    number('payable_amount', derived=('total_purchase_amount', 'total_deduction')),
+    text('payment_method', 'VARCHAR(255)', legacy=True),
+    timestamp('payment_date', legacy=True),
+    number('payment_amount', legacy=True),
+    text('payment_bank_account', legacy=True),
+    timestamp('payment_due_date', legacy=True),
+    text('payment_due_comment', legacy=True),
+    *_instalment_columns(1),
+    *_instalment_columns(2),
+    *_instalment_columns(3),
+    *_instalment_columns(4),
+    *_instalment_columns(5),
+    text('prepared_by', 'VARCHAR(255)'),
+    text('authorised_sign', 'VARCHAR(255)'),
+    text('paddy_unloading_godown'),
+    column('bill_series', 'VARCHAR(32)', 'default', managed=True),
+    column('total_paid_amount', 'DOUBLE', 0, parse_number, managed=True),
+    column('balance_amount', 'DOUBLE', 0, parse_number, managed=True),
+    column('row_version', 'INT', 1, managed=True),
+    column('updated_at', 'DATETIME', managed=True),
+)
+
+SLIP_COLUMNS_BY_NAME = {col.name: col for col in SLIP_COLUMNS}
+
+# Columns a request payload may carry (inputs and the calculated columns)
+PAYLOAD_COLUMNS = tuple(col for col in SLIP_COLUMNS if not col.managed and not col.legacy)
+
+
+def _dependency_order(derived):
+    """Derived columns ordered so every column follows the derived columns it reads"""
+    ordered = {}
+    pending = dict(derived)
+    while pending:
+        ready = [name for name, inputs in pending.items()
+                 if not any(source in pending for source in inputs)]
+        if not ready:
+            raise ValueError(f"Circular derived columns: {', '.join(pending)}")
+        for name in ready:
+            ordered[name] = pending.pop(name)
+    return ordered
+
+
+# Derived column -> its inputs, in dependency order
+DERIVED_FIELD_INPUTS = _dependency_order({col.name: col.derived for col in SLIP_COLUMNS if col.derived})
+
+# Stored inputs of calculate_fields()
+CALCULATION_INPUT_FIELDS = tuple(
+    col.name for col in SLIP_COLUMNS
+    if not col.derived and any(col.name in inputs for inputs in DERIVED_FIELD_INPUTS.values())
+)
+
+# Columns a client may change directly (PATCH); the instalment_* columns
+# mirror slip_payments and change only through the payments list
+EDITABLE_COLUMNS = tuple(
+    col.name for col in PAYLOAD_COLUMNS
+    if not col.derived and not col.name.startswith('instalment_')
+)
+
+
+# GENERATED STATEMENTS
+
+SLIP_INSERT_COLUMNS = tuple(
+    col.name for col in SLIP_COLUMNS if not col.legacy and col.name != 'row_version'
+)
+SLIP_INSERT_SQL = (
+    f"INSERT INTO purchase_slips ({', '.join(SLIP_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(SLIP_INSERT_COLUMNS))})"
+)
+
+# Full rewrite (PUT): every payload column plus the stored payment totals
+SLIP_UPDATE_COLUMNS = tuple(col.name for col in PAYLOAD_COLUMNS) + ('total_paid_amount', 'balance_amount')
+SLIP_UPDATE_SQL = (
+    f"UPDATE purchase_slips SET {', '.join(f'{name} = %s' for name in SLIP_UPDATE_COLUMNS)}, "
+    f"row_version = row_version + 1, updated_at = %s WHERE id = %s"
+)
+
+SLIP_SELECT_COLUMNS = ('id',) + tuple(col.name for col in SLIP_COLUMNS)
+# Batch queries select the same columns, so a row renders to the same cache key
+SLIP_SELECT_LIST = ', '.join(SLIP_SELECT_COLUMNS)
+SLIP_SELECT_SQL = f"SELECT {SLIP_SELECT_LIST} FROM purchase_slips WHERE id = %s"
+
+
+def slip_row(data, columns=PAYLOAD_COLUMNS):
+    """
+    Typed column values from a payload / calculated slip dict in one pass:
+    each column's parser runs once, missing keys take the column default.
+    """
+    row = {}
+    for col in columns:
+        if col.name in data:
+            row[col.name] = col.parser(data[col.name], col.default)
+        else:
+            row[col.name] = col.default
+    return row
+
+
+def column_ddl(col):
+    """'name TYPE DEFAULT x' for CREATE / ALTER TABLE"""
+    if col.default is None:
+        return f'{col.name} {col.sql_type}'
+    default = f"'{col.default}'" if isinstance(col.default, str) else col.default
+    return f'{col.name} {col.sql_type} DEFAULT {default}'
+
+
+def missing_columns(existing_columns):
+    """Registry columns absent from a live table (for schema checks)"""
+    existing = set(existing_columns)
+    return [col.name for col in SLIP_COLUMNS if col.name not in existing]
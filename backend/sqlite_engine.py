@@ -0,0 +1,259 @@
+"""
+Embedded SQLite storage engine
+
+Drop-in alternative to the MySQL connection pool for single-weighbridge
+installs. The connection objects handed out by this module mimic the parts
+of mysql.connector that the routes use:
+
+- %s placeholders (translated to ? once per statement and cached)
+- cursor(dictionary=True) returning plain dicts
+- cursor.lastrowid / rowcount / description
+- conn.commit() / conn.rollback() / conn.close()
+
+Physical connections are pooled: a checkout takes an idle connection (or
+opens one), close() rolls back anything left uncommitted and puts it back.
+At most SQLITE_POOL_SIZE idle connections are kept; extra ones are closed
+on release, so short-lived threads (Werkzeug's threaded or debug server
+starts one per request) don't pile up open files. Every checkout has its
+own connection and transaction, nested ones included: an inner commit()
+never commits the caller's unfinished work.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, date
+from functools import lru_cache
+from time import perf_counter
+
+from metrics import add_time
+
+# Idle connections kept open between checkouts
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE') or 8)
+
+# Pragmas applied once per physical connection
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('foreign_keys', 'ON'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -20000),          # ~20 MB page cache
+    ('mmap_size', 268435456),        # 256 MB memory-mapped I/O
+    ('busy_timeout', 5000),
+)
+
+
+def _adapt_datetime(value):
+    # Store naive local time like MySQL DATETIME does
+    return value.replace(tzinfo=None).isoformat(' ')
+
+
+def _convert_datetime(value):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+
+_PLACEHOLDER_RE = re.compile(r'%s')
+
+
+@lru_cache(maxsize=512)
+def translate_sql(sql):
+    """Translate MySQL-style %s placeholders to SQLite ? placeholders"""
+    return _PLACEHOLDER_RE.sub('?', sql).replace('%%', '%')
+
+
+class SQLiteCursor:
+    """Cursor wrapper that speaks the mysql.connector cursor dialect"""
+
+    def __init__(self, raw_cursor, dictionary=False):
+        self._cursor = raw_cursor
+        self._dictionary = dictionary
+
+    def _to_row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([col[0] for col in self._cursor.description], row))
+
+    # Time spent in sqlite3 is charged to the request's db time (metrics.py)
+
+    def execute(self, sql, params=()):
+        start = perf_counter()
+        try:
+            self._cursor.execute(translate_sql(sql), params or ())
+        finally:
+            add_time('db', perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        start = perf_counter()
+        try:
+            self._cursor.executemany(translate_sql(sql), seq_of_params)
+        finally:
+            add_time('db', perf_counter() - start)
+        return self
+
+    def fetchone(self):
+        start = perf_counter()
+        row = self._cursor.fetchone()
+        add_time('db', perf_counter() - start)
+        return self._to_row(row)
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = self._cursor.fetchmany(size or self._cursor.arraysize)
+        add_time('db', perf_counter() - start)
+        return [self._to_row(row) for row in rows]
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = self._cursor.fetchall()
+        add_time('db', perf_counter() - start)
+        if not self._dictionary:
+            return rows
+        columns = [col[0] for col in self._cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Checked-out handle on one pooled sqlite3 connection. close() rolls
+    back anything left uncommitted (like pool_reset_session) and returns
+    the connection to the engine.
+    """
+
+    def __init__(self, raw_conn, engine):
+        self._conn = raw_conn
+        self._engine = engine
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self._conn.execute('SELECT 1')
+
+    def is_connected(self):
+        return self._conn is not None
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def close(self):
+        raw_conn, self._conn = self._conn, None
+        if raw_conn is not None:
+            self._engine._release(raw_conn)
+
+
+class SQLiteEngine:
+    """SQLite storage engine with a bounded pool of idle connections"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, pool_size=SQLITE_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        raw_conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=5.0
+        )
+        for pragma, value in SQLITE_PRAGMAS:
+            raw_conn.execute(f'PRAGMA {pragma} = {value}')
+        return raw_conn
+
+    def get_connection(self):
+        with self._lock:
+            raw_conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+        if raw_conn is None:
+            try:
+                raw_conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                raise
+        return SQLiteConnection(raw_conn, self)
+
+    def _release(self, raw_conn):
+        try:
+            if raw_conn.in_transaction:
+                raw_conn.rollback()
+            reusable = True
+        except sqlite3.Error:
+            reusable = False
+        with self._lock:
+            self._in_use -= 1
+            keep = reusable and not self._closed and len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(raw_conn)
+        if not keep:
+            _close_quietly(raw_conn)
+
+    def stats(self):
+        """Open connections: idle in the pool and checked out"""
+        with self._lock:
+            idle = len(self._idle)
+            return {'size': idle + self._in_use, 'idle': idle, 'in_use': self._in_use,
+                    'max_idle': self.pool_size}
+
+    def close_all(self):
+        """Close the idle connections (shutdown); checked-out ones close when released"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for raw_conn in idle:
+            _close_quietly(raw_conn)
+
+
+def _close_quietly(raw_conn):
+    try:
+        raw_conn.close()
+    except sqlite3.Error:
+        pass
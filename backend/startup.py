@@ -0,0 +1,146 @@
+"""
+Startup state and timing
+
+app.py imports quickly and binds the server before the database is touched:
+opening the connection pool and checking the schema run on a background
+thread. `startup` tracks that work:
+
+- phase(name) times one startup step; `python backend/app.py
+  --profile-startup` prints the breakdown (imports, pool, schema,
+  blueprints, ...) once the server is ready
+- the server is ready once both the database step and the listening
+  socket are done. /api/health/ready answers 200 from then on, and app.py
+  prints one machine-readable line on stdout for the desktop shell:
+
+      READY {"url": "http://127.0.0.1:5000", "pid": 1234, "startup_ms": 412}
+
+- API requests that arrive before that wait up to STARTUP_WAIT seconds
+  for the database and are answered 503 after that
+- if the database can't be reached (e.g. MySQL still starting after a
+  reboot) the step is retried every STARTUP_RETRY_DELAY seconds; the last
+  error is shown by /api/health/ready
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# "Launch": when this module was first imported (the first thing app.py does)
+STARTED_AT = time.perf_counter()
+
+STARTUP_WAIT = float(os.environ.get('STARTUP_WAIT') or 15)
+STARTUP_RETRY_DELAY = float(os.environ.get('STARTUP_RETRY_DELAY') or 3)
+
+READY_PREFIX = 'READY '
+
+
+class StartupState:
+    """Phase timings plus the database / listening readiness flags"""
+
+    def __init__(self):
+        self.phases = []
+        self.error = None
+        self.ready_at = None
+        self.database_ready = threading.Event()
+        self.listening = threading.Event()
+        self._lock = threading.Lock()
+        self._on_ready = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, start - STARTED_AT, time.perf_counter() - start))
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - STARTED_AT) * 1000)
+
+    def run_in_background(self, initialize, warm_up=None):
+        """
+        Run initialize() (pool + schema) on a thread until it succeeds, then
+        warm_up() (caches for the first requests) without holding up readiness
+        """
+        def run():
+            while True:
+                try:
+                    initialize()
+                    break
+                except Exception as e:
+                    self.error = f'{type(e).__name__}: {e}'
+                    print(f"❌ Startup failed ({self.error}); retrying in {STARTUP_RETRY_DELAY:g}s")
+                    time.sleep(STARTUP_RETRY_DELAY)
+            self.error = None
+            self.database_ready.set()
+            self._check_ready()
+            if warm_up is not None:
+                with self.phase('warm-up'):
+                    warm_up()
+
+        thread = threading.Thread(target=run, name='startup', daemon=True)
+        thread.start()
+        return thread
+
+    def mark_listening(self):
+        self.listening.set()
+        self._check_ready()
+
+    def on_ready(self, callback):
+        """Call callback() once (immediately if already ready)"""
+        with self._lock:
+            if self.ready_at is None:
+                self._on_ready.append(callback)
+                return
+        callback()
+
+    def _check_ready(self):
+        with self._lock:
+            if self.ready_at is not None or not (self.database_ready.is_set() and self.listening.is_set()):
+                return
+            self.ready_at = self.elapsed_ms()
+            callbacks, self._on_ready = self._on_ready, []
+        for callback in callbacks:
+            callback()
+
+    def is_ready(self):
+        return self.ready_at is not None
+
+    def wait_for_database(self, timeout=STARTUP_WAIT):
+        """True once the database is usable, False after `timeout` seconds"""
+        return self.database_ready.wait(timeout)
+
+    def status(self):
+        """Dict for /api/health/ready"""
+        if self.is_ready():
+            state = 'ready'
+        elif self.database_ready.is_set():
+            state = 'starting: waiting for the server socket'
+        else:
+            state = 'starting: database'
+        status = {'status': state, 'uptime_ms': self.elapsed_ms()}
+        if self.ready_at is not None:
+            status['startup_ms'] = self.ready_at
+        if self.error:
+            status['last_error'] = self.error
+        return status
+
+    def print_ready_line(self, url):
+        """The single stdout line the desktop shell waits for"""
+        line = json.dumps({'url': url, 'pid': os.getpid(), 'startup_ms': self.ready_at})
+        print(READY_PREFIX + line, flush=True)
+
+    def print_profile(self, stream=None):
+        """Per-phase timings, in start order"""
+        stream = stream or sys.stdout
+        print('\nStartup profile (ms since launch / duration):', file=stream)
+        for name, started, duration in sorted(self.phases, key=lambda phase: phase[1]):
+            print(f'  {started * 1000:8.1f}  {duration * 1000:8.1f}  {name}', file=stream)
+        print(f'  ready after {self.ready_at} ms\n', file=stream, flush=True)
+
+
+startup = StartupState()
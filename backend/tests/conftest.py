@@ -0,0 +1,53 @@
+"""
+Test setup: the backend on the embedded SQLite engine, in a throwaway directory
+(database file and render cache)
+
+The environment is set before anything imports database.py / render_cache.py,
+which read it at import time.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEST_DIR = tempfile.mkdtemp(prefix='slips-test-')
+os.environ['DB_ENGINE'] = 'sqlite'
+os.environ['SQLITE_DB_PATH'] = os.path.join(TEST_DIR, 'slips.sqlite3')
+os.environ['RENDER_CACHE_DIR'] = os.path.join(TEST_DIR, 'render_cache')
+sys.path.insert(0, BACKEND_DIR)
+
+# Tables a test may write to; emptied before each test that uses the DB
+DATA_TABLES = ('purchase_slip_payments', 'purchase_slips', 'party_ledger', 'slip_rollups')
+
+
+@pytest.fixture(scope='session')
+def app():
+    import app as app_module
+    from startup import startup
+
+    assert startup.wait_for_database(), 'database did not initialise'
+    return app_module.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def conn(app):
+    from database import get_db_connection, rebuild_row_counter
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    for table in DATA_TABLES:
+        cursor.execute(f'DELETE FROM {table}')
+    rebuild_row_counter(cursor, 'purchase_slips')
+    conn.commit()
+    cursor.close()
+    yield conn
+    conn.close()
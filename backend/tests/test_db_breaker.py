@@ -0,0 +1,99 @@
+import threading
+import time
+
+from db_breaker import CircuitBreaker, DatabaseUnavailable
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def thread_errors(monkeypatch):
+    """Exceptions raised in the probe threads fail the test"""
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', lambda args: errors.append(args.exc_value))
+    yield errors
+    assert errors == []
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError('refused'))
+
+
+def probe_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'test-probe']
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_trips_fails_fast_and_recovers():
+    probes = []
+    breaker = CircuitBreaker(lambda: probes.append('probe'), failure_threshold=2, cooldown=0.05, name='test')
+    trip(breaker)
+
+    with pytest.raises(DatabaseUnavailable) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after >= 1
+    status = breaker.status()
+    assert status['state'] in ('open', 'half_open')
+    assert status['open_for_s'] >= 0 and status['retry_after_s'] >= 1
+
+    wait_until(lambda: breaker.status()['state'] == 'closed')
+    assert probes == ['probe']
+    breaker.before_call()
+
+
+@pytest.mark.parametrize('probe_fails', [False, True])
+def test_reset_during_a_probe(probe_fails):
+    probing, release = threading.Event(), threading.Event()
+
+    def probe():
+        probing.set()
+        release.wait(2)
+        if probe_fails:
+            raise ConnectionError('still down')
+
+    breaker = CircuitBreaker(probe, failure_threshold=1, cooldown=0.01, name='test')
+    trip(breaker)
+    assert probing.wait(2)
+    breaker.reset()
+    assert breaker.status() == {'state': 'closed', 'consecutive_failures': 0, 'trips': 1,
+                                'last_error': 'ConnectionError: refused'}
+    release.set()
+
+    wait_until(lambda: not probe_threads())
+    assert breaker.status()['state'] == 'closed'
+
+
+def test_status_is_consistent_under_concurrent_reset():
+    def failing_probe():
+        raise ConnectionError('still down')
+
+    breaker = CircuitBreaker(failing_probe, failure_threshold=1, cooldown=0.001, name='test')
+    errors = []
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            try:
+                breaker.status()
+                breaker.retry_after()
+            except Exception as e:
+                errors.append(e)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        for _ in range(300):
+            trip(breaker)
+            breaker.reset()
+    finally:
+        stop.set()
+        poller.join()
+    assert errors == []
+    wait_until(lambda: not probe_threads())
@@ -0,0 +1,142 @@
+import pytest
+
+from escpos import Receipt, build_slip_receipt, send_to_printer
+
+HEADER = b'\x1b@' + b'\x1bt\x00'  # ESC @ (init), ESC t 0 (code page 437)
+
+
+def receipt_bytes(width, *lines):
+    receipt = Receipt(width)
+    for line in lines:
+        receipt.line(line)
+    return receipt.to_bytes()
+
+
+def test_receipt_starts_with_init_and_codepage():
+    assert Receipt().to_bytes() == HEADER
+
+
+def test_codepage_437_text():
+    # é is 0x82 in code page 437, the rupee sign is spelled out, Devanagari is not printable
+    assert receipt_bytes(32, 'Café ₹5 राम') == HEADER + b'Caf\x82 Rs.5 ???\n'
+
+
+def test_pair_rule_and_heading():
+    receipt = Receipt(16)
+    receipt.pair('Bags', '100')
+    receipt.rule()
+    receipt.heading('TOTAL')
+    receipt.pair('₹ Paid', '5.00')
+    assert receipt.to_bytes() == (
+        HEADER
+        + b'Bags         100\n'
+        + b'----------------\n'
+        + b'\x1bE\x01TOTAL\n\x1bE\x00'
+        + b'Rs. Paid    5.00\n'
+    )
+
+
+def test_pair_too_long_puts_value_on_its_own_line():
+    receipt = Receipt(16)
+    receipt.pair('Bill No: 1234', 'Date: 01-10-2026')
+    assert receipt.to_bytes() == HEADER + b'Bill No: 1234\nDate: 01-10-2026\n'
+
+    receipt = Receipt(16)
+    receipt.pair('Unloading Godown', 'Godown 2')
+    assert receipt.to_bytes() == HEADER + b'Unloading Godown\n        Godown 2\n'
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', b'\n'),
+    ('twelve chars', b'twelve chars\n'),
+    ('first part payment', b'first part\npayment\n'),
+    ('   NEFT / SBI 1234 ref', b'   NEFT /\n   SBI 1234\n   ref\n'),
+    ('abcdefghijklmnop', b'abcdefghijkl\nmnop\n'),
+])
+def test_long_lines_wrap(text, expected):
+    assert receipt_bytes(12, text) == HEADER + expected
+
+
+SLIP = {
+    'company_name': 'Shree Rice Mill', 'company_address': 'Station Road, Raipur', 'bill_no': 7,
+    'date_formatted': '01-10-2026 10:30', 'vehicle_no': 'CG04AB1234', 'party_name': 'Ram Traders',
+    'bags': 100, 'net_weight_kg': 5000, 'gunny_weight_kg': 50, 'final_weight_kg': 4950,
+    'avg_bag_weight': 49.5, 'weight_quintal': 49.5, 'weight_khandi': 33, 'rate_basis': 'Quintal',
+    'rate_value': 2200, 'total_purchase_amount': 108900, 'batav': 1089, 'batav_percent': 1,
+    'dalali': 500, 'postage': 0, 'total_deduction': 1589, 'payable_amount': 107311,
+    'total_paid_amount': 10000, 'balance_amount': 97311, 'paddy_unloading_godown': 'Godown 2',
+    'payments': [{'date': '02-10-2026 00:00', 'amount': 10000, 'payment_method': 'NEFT',
+                  'payment_bank_account': 'SBI 1234', 'comment': 'first part payment against the slip'}],
+}
+
+
+def test_build_slip_receipt_bytes():
+    assert build_slip_receipt(SLIP, 32) == b''.join([
+        HEADER,
+        b'\x1ba\x01',                                  # centre
+        b'\x1bE\x01\x1d!\x11Shree Rice Mill\n',        # bold, double size
+        b'\x1d!\x00\x1bE\x00Station Road, Raipur\n',
+        b'\x1bE\x01PURCHASE SLIP\n\x1bE\x00',
+        b'\x1ba\x00',                                  # left
+        b'================================\n',
+        b'Bill No: 7\n',
+        b'          Date: 01-10-2026 10:30\n',
+        b'Vehicle No            CG04AB1234\n',
+        b'Party                Ram Traders\n',
+        b'--------------------------------\n',
+        b'\x1bE\x01WEIGHT\n\x1bE\x00',
+        b'Bags                         100\n',
+        b'Net Weight (kg)          5000.00\n',
+        b'Gunny Weight (kg)          50.00\n',
+        b'Final Weight (kg)        4950.00\n',
+        b'Avg Bag Weight (kg)        49.50\n',
+        b'Weight (Quintal)          49.500\n',
+        b'Weight (Khandi)           33.000\n',
+        b'Rate / Quintal           2200.00\n',
+        b'\x1bE\x01Total Purchase Amount  108900.00\n\x1bE\x00',
+        b'--------------------------------\n',
+        b'\x1bE\x01DEDUCTIONS\n\x1bE\x00',
+        b'Batav (1.00%)            1089.00\n',
+        b'Dalali                    500.00\n',
+        b'Total Deduction          1589.00\n',
+        b'================================\n',
+        b'\x1bE\x01PAYABLE (Rs.)          107311.00\n\x1bE\x00',
+        b'Total Paid              10000.00\n',
+        b'Balance                 97311.00\n',
+        b'--------------------------------\n',
+        b'\x1bE\x01INSTALMENTS\n\x1bE\x00',
+        b'1. 02-10-2026 00:00     10000.00\n',
+        b'   NEFT / SBI 1234 / first part\n',
+        b'   payment against the slip\n',
+        b'--------------------------------\n',
+        b'Unloading Godown        Godown 2\n',
+        b'\n\n',
+        b'Prepared By Authorized Signatory\n',
+        b'\x1dVB\x03',                                 # feed and partial cut
+    ])
+
+
+def test_build_slip_receipt_defaults_for_a_bare_row():
+    data = build_slip_receipt({}, 48)
+    assert data.startswith(HEADER + b'\x1ba\x01\x1bE\x01\x1d!\x11COMPANY NAME\n')
+    assert b'Bill No: -' in data
+    assert b'INSTALMENTS' not in data
+    assert data.endswith(b'\x1dVB\x03')
+    assert all(len(line) <= 48 for line in data.split(b'\n')[3:-1] if not line.startswith((b'\x1b', b'\x1d')))
+
+
+def test_send_to_printer_writes_a_file_target(tmp_path):
+    target = tmp_path / 'receipt.bin'
+    data = build_slip_receipt(SLIP, 32)
+    assert send_to_printer(data, str(target)) == str(target)
+    assert target.read_bytes() == data
+
+    # Each job replaces the file's contents
+    send_to_printer(HEADER, str(target))
+    assert target.read_bytes() == HEADER
+
+
+def test_send_to_printer_needs_a_target(monkeypatch):
+    monkeypatch.setattr('escpos.THERMAL_PRINTER', '')
+    with pytest.raises(ValueError):
+        send_to_printer(HEADER)
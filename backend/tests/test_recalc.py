@@ -0,0 +1,74 @@
+import pytest
+
+from aggregates import rebuild_party_ledger, rebuild_rollups
+from recalc import recalculate_slips
+
+SLIP = {
+    'party_name': 'Ram Traders', 'date': '2026-10-01', 'bags': 100, 'net_weight_kg': 5000,
+    'gunny_weight_kg': 50, 'rate_basis': 'Quintal', 'rate_value': 2200, 'dalali_rate': 10,
+    'hammali_rate': 5, 'material_name': 'Paddy', 'broker': 'Mohan',
+    'paddy_unloading_godown': 'Godown A', 'instalment_1_amount': 10000,
+    'instalment_1_date': '2026-10-02',
+}
+
+
+def snapshot(conn):
+    """party_ledger and slip_rollups without their timestamps"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute('''SELECT party_name, slip_count, total_weight_kg, total_payable, total_paid, balance
+                          FROM party_ledger ORDER BY party_name''')
+        ledger = cursor.fetchall()
+        cursor.execute('SELECT * FROM slip_rollups ORDER BY grain, period_start, dimension, dimension_value')
+        rollups = [{key: value for key, value in row.items() if key not in ('id', 'updated_at')}
+                   for row in cursor.fetchall()]
+        return ledger, rollups
+    finally:
+        cursor.close()
+
+
+def rebuilt(conn):
+    cursor = conn.cursor()
+    try:
+        rebuild_party_ledger(cursor)
+        rebuild_rollups(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+    return snapshot(conn)
+
+
+def approx_rows(rows):
+    return [{key: pytest.approx(value) if isinstance(value, float) else value
+             for key, value in row.items()} for row in rows]
+
+
+@pytest.fixture
+def slips(client, conn):
+    for overrides in ({}, {'date': '2026-09-15', 'bags': 80}, {'party_name': 'Shyam', 'date': '2026-10-03'}):
+        response = client.post('/api/add-slip', json=dict(SLIP, **overrides))
+        assert response.status_code == 201, response.get_json()
+
+
+@pytest.mark.parametrize('overrides', [
+    {'bags': 120},
+    {'bags': 90, 'dalali_rate': 15},
+    {'net_weight_kg': 6000, 'rate_basis': 'Khandi'},
+])
+def test_applied_recalc_keeps_aggregates_in_step(conn, slips, overrides):
+    summary = recalculate_slips(conn, filters={'party': 'Ram Traders'}, overrides=overrides, apply=True)
+    assert summary['changed'] == 2
+    assert summary['skipped'] == 0
+
+    ledger, rollups = snapshot(conn)
+    expected_ledger, expected_rollups = rebuilt(conn)
+    assert ledger == approx_rows(expected_ledger)
+    assert rollups == approx_rows(expected_rollups)
+
+
+def test_preview_writes_nothing(conn, slips):
+    before = snapshot(conn)
+    summary = recalculate_slips(conn, overrides={'bags': 120})
+    assert summary['changed'] == 3
+    assert not summary['applied']
+    assert snapshot(conn) == before
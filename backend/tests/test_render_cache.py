@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import render_cache
+
+SLIP = {
+    'party_name': 'Ram Traders', 'date': '2026-10-01', 'bags': 100, 'net_weight_kg': 5000,
+    'rate_basis': 'Quintal', 'rate_value': 2200,
+}
+
+
+@pytest.fixture
+def evicted_after_lookup(monkeypatch):
+    """lookup() finds the entry, but it is evicted before the caller reads it"""
+    lookup = render_cache.lookup
+    hits = []
+
+    def racing_lookup(kind, slip_id, key):
+        path = lookup(kind, slip_id, key)
+        if path is not None:
+            hits.append(path)
+            os.unlink(path)
+        return path
+
+    monkeypatch.setattr(render_cache, 'lookup', racing_lookup)
+    return hits
+
+
+def test_entry_helpers_treat_a_removed_file_as_a_miss(evicted_after_lookup):
+    path = render_cache.store('pdf', 1, 'k' * 64, b'%PDF')
+    assert render_cache.read_entry(path) == b'%PDF'
+    assert render_cache.open_entry('pdf', 1, 'k' * 64) is None
+    assert render_cache.read_entry(path) is None
+
+
+@pytest.fixture
+def pdf_renderer(monkeypatch):
+    import routes.slips
+
+    rendered = []
+
+    def render_pdf(html):
+        rendered.append(html)
+        return b'%PDF-1.4 rendered'
+
+    monkeypatch.setattr(routes.slips, 'PDFKIT_AVAILABLE', True)
+    monkeypatch.setattr(routes.slips, 'render_pdf', render_pdf)
+    monkeypatch.setattr(routes.slips, 'iter_rendered_pdfs', lambda pages: map(render_pdf, pages))
+    monkeypatch.setattr(routes.slips, 'iter_zip_pdfs', lambda names, pdfs: (pdf for pdf in pdfs))
+    return rendered
+
+
+def test_slip_pdf_rerenders_an_entry_evicted_after_lookup(client, conn, pdf_renderer, request):
+    slip_id = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    assert client.get(f'/api/slip/{slip_id}/pdf').status_code == 200
+
+    hits = request.getfixturevalue('evicted_after_lookup')
+    response = client.get(f'/api/slip/{slip_id}/pdf')
+    assert response.status_code == 200
+    assert response.data == b'%PDF-1.4 rendered'
+    assert len(hits) == 1 and len(pdf_renderer) == 2
+
+
+def test_batch_pdf_rerenders_an_entry_evicted_after_lookup(client, conn, pdf_renderer, request):
+    first = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    second = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    assert client.get(f'/api/slip/{first}/pdf').status_code == 200
+
+    hits = request.getfixturevalue('evicted_after_lookup')
+    response = client.get('/api/slips/pdf', query_string={'ids': f'{first},{second}', 'format': 'zip'})
+    assert response.status_code == 200
+    assert response.data == b'%PDF-1.4 rendered' * 2
+    assert len(hits) == 1 and len(pdf_renderer) == 3
+
+
+def test_print_page_rerenders_an_entry_evicted_after_lookup(client, conn, request):
+    slip_id = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    page = client.get(f'/print/{slip_id}').data
+
+    hits = request.getfixturevalue('evicted_after_lookup')
+    response = client.get(f'/print/{slip_id}')
+    assert response.status_code == 200
+    assert response.data == page
+    assert len(hits) == 1
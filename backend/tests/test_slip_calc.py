@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+
+from recalc import recalculate_columns, RECALC_INPUT_COLUMNS, RECALC_DERIVED_COLUMNS
+from slip_calc import calculate_fields, FINANCIAL_INPUTS, FINANCIAL_COLUMNS
+from slip_record import Slip
+
+BASE = {
+    'bags': '100', 'net_weight_kg': '5000', 'gunny_weight_kg': '100', 'rate_basis': 'Quintal',
+    'rate_value': '2200', 'bank_commission': '50', 'postage': '20', 'batav_percent': '1',
+    'shortage_percent': '0.5', 'dalali_rate': '10', 'hammali_rate': '5', 'freight': '300',
+    'rate_diff': '0', 'quality_diff': '0', 'moisture_ded': '0', 'tds': '0',
+}
+
+CASES = [
+    {},
+    {'rate_basis': 'Khandi', 'rate_value': '3300'},
+    {'rate_basis': 'Other'},
+    {'bags': '0'},
+    {'bags': '', 'net_weight_kg': ' ', 'gunny_weight_kg': None},
+    {'gunny_weight_kg': '6000'},
+    {'net_weight_kg': 'abc', 'rate_value': 'x'},
+    {'net_weight_kg': '1234.567', 'gunny_weight_kg': '12.345', 'rate_value': '2187.5'},
+    {'batav_percent': '-1', 'shortage_percent': '0', 'dalali_rate': '-2', 'hammali_rate': '0'},
+    {'net_weight_kg': 10005, 'gunny_weight_kg': 0, 'rate_value': 1.005, 'tds': 0.125},
+    {'freight': '1e3', 'rate_diff': '-15.5', 'quality_diff': '2.25', 'moisture_ded': '7', 'tds': '0.01'},
+]
+
+
+def test_registry_matches_formulas():
+    assert set(FINANCIAL_INPUTS) == set(RECALC_INPUT_COLUMNS)
+    assert set(FINANCIAL_COLUMNS) == set(RECALC_DERIVED_COLUMNS)
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_scalar_record_and_columnar_agree(case):
+    inputs = dict(BASE, **case)
+
+    scalar = calculate_fields(dict(inputs))
+    record = Slip.from_payload(inputs).calculate()
+    columnar = recalculate_columns({name: [value] * 3 for name, value in inputs.items()})
+
+    for name in FINANCIAL_COLUMNS:
+        assert record[name] == scalar[name], name
+        assert columnar[name] == [scalar[name]] * 3, name
+
+
+def test_columnar_empty_chunk():
+    assert recalculate_columns({name: [] for name in FINANCIAL_INPUTS}) == {name: [] for name in FINANCIAL_COLUMNS}
+
+
+def test_record_from_row_parses_inputs_once():
+    # As the drivers return them: NULL columns, DECIMAL from MySQL
+    row = dict(BASE, bags=None, net_weight_kg=Decimal('5000.50'), rate_value=Decimal('2200'), tds=None)
+    slip = Slip.from_row(row)
+    assert (slip.bags, slip.net_weight_kg, slip.rate_value, slip.tds) == (0, 5000.5, 2200.0, 0)
+    assert all(type(slip[name]) in (int, float) for name in FINANCIAL_INPUTS if name != 'rate_basis')
+
+    slip.calculate()
+    scalar = calculate_fields(dict(row))
+    assert [slip[name] for name in FINANCIAL_COLUMNS] == [scalar[name] for name in FINANCIAL_COLUMNS]
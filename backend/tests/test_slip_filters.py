@@ -0,0 +1,28 @@
+import pytest
+
+from slip_filters import build_slip_filters
+
+SLIP = {
+    'date': '2026-10-01', 'bags': 100, 'net_weight_kg': 5000, 'rate_basis': 'Quintal', 'rate_value': 2200,
+}
+
+
+def test_search_is_an_escaped_substring_match():
+    conditions, params = build_slip_filters({'q': ' 50%_off! '})
+    assert conditions == ["(party_name LIKE %s ESCAPE '!' OR material_name LIKE %s ESCAPE '!')"]
+    assert params == ['%50!%!_off!!%'] * 2
+
+
+@pytest.mark.parametrize('term, parties', [
+    ('Ram', ['Ram Traders']),
+    ('traders', ['Shyam Traders', 'Ram Traders']),
+    ('rice', ['Shyam Traders']),
+    ('50%', []),
+])
+def test_list_search_matches_anywhere_in_party_or_material(client, conn, term, parties):
+    for party, material in (('Ram Traders', 'Paddy'), ('Shyam Traders', 'Broken Rice')):
+        assert client.post('/api/add-slip', json=dict(SLIP, party_name=party, material_name=material)).status_code == 201
+
+    result = client.get('/api/slips', query_string={'q': term}).get_json()
+    assert [slip['party_name'] for slip in result['slips']] == parties
+    assert result['pagination']['total'] == len(parties)
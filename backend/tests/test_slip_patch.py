@@ -0,0 +1,46 @@
+import pytest
+
+SLIP = {
+    'party_name': 'Ram Traders', 'date': '2026-10-01', 'bags': 100, 'net_weight_kg': 5000,
+    'rate_basis': 'Quintal', 'rate_value': 2200,
+}
+
+
+@pytest.fixture
+def slip(client, conn):
+    """(id, ETag) of a fresh slip"""
+    slip_id = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    response = client.get(f'/api/slip/{slip_id}')
+    return slip_id, response.headers['ETag']
+
+
+def test_patch_with_if_match_etag(client, slip):
+    slip_id, etag = slip
+    response = client.patch(f'/api/slip/{slip_id}', json={'vehicle_no': 'CG04AB1234'}, headers={'If-Match': etag})
+    assert response.status_code == 200, response.get_json()
+
+    # The old tag is now stale
+    response = client.patch(f'/api/slip/{slip_id}', json={'vehicle_no': 'X'}, headers={'If-Match': etag})
+    assert response.status_code == 409
+
+
+def test_patch_with_another_slips_etag_is_412(client, slip):
+    slip_id, _ = slip
+    other_id = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+    other_etag = client.get(f'/api/slip/{other_id}').headers['ETag']
+
+    response = client.patch(f'/api/slip/{slip_id}', json={'vehicle_no': 'X'}, headers={'If-Match': other_etag})
+    assert response.status_code == 412
+    assert client.get(f'/api/slip/{slip_id}').get_json()['slip']['vehicle_no'] != 'X'
+
+
+@pytest.mark.parametrize('if_match', ['"v1"', '"slip-1"', '"slip-x-v1"', '"slip-1-vx"', '"1-v2"'])
+def test_patch_with_malformed_etag_is_400(client, slip, if_match):
+    slip_id, _ = slip
+    response = client.patch(f'/api/slip/{slip_id}', json={'vehicle_no': 'X'}, headers={'If-Match': if_match})
+    assert response.status_code == 400
+
+
+def test_patch_without_version_is_428(client, slip):
+    slip_id, _ = slip
+    assert client.patch(f'/api/slip/{slip_id}', json={'vehicle_no': 'X'}).status_code == 428
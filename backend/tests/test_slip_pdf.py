@@ -0,0 +1,82 @@
+import pytest
+
+from routes.slips import parse_slip_ids, PDF_BATCH_LIMIT
+
+
+def test_parse_slip_ids_keeps_order_and_drops_duplicates():
+    assert parse_slip_ids('3, 1,2,3,,') == [3, 1, 2]
+
+
+@pytest.mark.parametrize('value', ['', ',', ' , ,', '1,x', '1.5', '-1', '0', '²', '1;2'])
+def test_parse_slip_ids_rejects_empty_and_non_integer_lists(value):
+    with pytest.raises(ValueError):
+        parse_slip_ids(value)
+
+
+def test_parse_slip_ids_caps_the_batch():
+    with pytest.raises(ValueError):
+        parse_slip_ids(','.join(str(number) for number in range(1, PDF_BATCH_LIMIT + 2)))
+
+
+@pytest.mark.parametrize('ids', ['', ',', '1,abc'])
+def test_batch_pdf_answers_400_for_bad_ids(client, rendered_html, ids):
+    response = client.get('/api/slips/pdf', query_string={'ids': ids})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+SLIP = {
+    'party_name': 'Ram Traders', 'date': '2026-10-01', 'bags': 100, 'net_weight_kg': 5000,
+    'rate_basis': 'Quintal', 'rate_value': 2200,
+}
+
+# More than the five fixed instalment_N columns hold
+PAYMENTS = [{'date': f'2026-10-{day:02d}', 'amount': 1000 + day, 'payment_method': 'NEFT',
+             'comment': f'part {day}'} for day in range(1, 8)]
+
+
+@pytest.fixture
+def rendered_html(monkeypatch):
+    """HTML handed to the PDF renderer, per call"""
+    import routes.slips
+
+    pages = []
+
+    def render_pdf(html):
+        pages.append(html)
+        return b'%PDF-1.4 test'
+
+    monkeypatch.setattr(routes.slips, 'PDFKIT_AVAILABLE', True)
+    monkeypatch.setattr(routes.slips, 'render_pdf', render_pdf)
+    monkeypatch.setattr(routes.slips, 'iter_rendered_pdfs', lambda pages_html: map(render_pdf, pages_html))
+    monkeypatch.setattr(routes.slips, 'iter_zip_pdfs', lambda names, pdfs: (pdf for pdf in pdfs))
+    return pages
+
+
+def assert_lists_payments(html):
+    for number, payment in enumerate(PAYMENTS, start=1):
+        assert f'<strong>Instalment {number}:</strong>' in html
+        assert f"₹{payment['amount']:.2f}" in html
+        assert f"({payment['comment']})" in html
+    assert '<strong>Instalment 8:</strong>' not in html
+
+
+def test_slip_pdf_lists_every_payment(client, conn, rendered_html):
+    slip_id = client.post('/api/add-slip', json=dict(SLIP, payments=PAYMENTS)).get_json()['slip_id']
+
+    response = client.get(f'/api/slip/{slip_id}/pdf')
+    assert response.status_code == 200
+    assert len(rendered_html) == 1
+    assert_lists_payments(rendered_html[0])
+
+
+def test_batch_pdf_lists_every_payment(client, conn, rendered_html):
+    with_payments = client.post('/api/add-slip', json=dict(SLIP, payments=PAYMENTS)).get_json()['slip_id']
+    without = client.post('/api/add-slip', json=SLIP).get_json()['slip_id']
+
+    response = client.get('/api/slips/pdf', query_string={'ids': f'{without},{with_payments}', 'format': 'zip'})
+    assert response.status_code == 200
+    response.get_data()
+    assert len(rendered_html) == 2
+    assert 'Payment Instalments' not in rendered_html[0]
+    assert_lists_payments(rendered_html[1])
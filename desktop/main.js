@@ -149,23 +149,76 @@ function createLocalBackupOnly(dbConfig) {
     });
 }
 
+const BACKEND_URL = 'http://localhost:5000';
+const BACKEND_READY_PREFIX = 'READY ';
+const BACKEND_POLL_INTERVAL = 250;
+
+// Resolves once the backend reports ready (see backend/startup.py)
+let backendReady;
+
+/**
+ * GET /api/health/ready; resolves true on 200
+ */
+function checkBackendReady() {
+    const http = require('http');
+    return new Promise((resolve) => {
+        const request = http.get(`${BACKEND_URL}/api/health/ready`, (response) => {
+            response.resume();
+            resolve(response.statusCode === 200);
+        });
+        request.on('error', () => resolve(false));
+        request.setTimeout(1000, () => request.destroy());
+    });
+}
+
 function startPythonBackend() {
     const pythonScript = path.join(__dirname, '..', 'backend', 'app.py');
     pythonProcess = spawn('python', [pythonScript], {
         cwd: path.join(__dirname, '..')
     });
 
-    pythonProcess.stdout.on('data', (data) => {
-        console.log(`Backend: ${data}`);
+    backendReady = new Promise((resolve) => {
+        let done = false;
+        let stdoutBuffer = '';
+        const startedAt = Date.now();
+
+        const markReady = (how) => {
+            if (done) return;
+            done = true;
+            console.log(`Backend started successfully in ${Date.now() - startedAt} ms (${how})`);
+            resolve();
+        };
+
+        // The backend prints one "READY {...}" line when it can serve requests
+        pythonProcess.stdout.on('data', (data) => {
+            console.log(`Backend: ${data}`);
+            stdoutBuffer += data.toString();
+            const lines = stdoutBuffer.split(/\r?\n/);
+            stdoutBuffer = lines.pop();
+            if (lines.some(line => line.startsWith(BACKEND_READY_PREFIX))) {
+                markReady('ready line');
+            }
+        });
+
+        // Fallback if the line is lost (e.g. stdout buffered by a wrapper)
+        const poll = async () => {
+            if (done) return;
+            if (await checkBackendReady()) {
+                markReady('health check');
+            } else if (pythonProcess && pythonProcess.exitCode === null) {
+                setTimeout(poll, BACKEND_POLL_INTERVAL);
+            }
+        };
+        setTimeout(poll, BACKEND_POLL_INTERVAL);
     });
 
     pythonProcess.stderr.on('data', (data) => {
         console.error(`Backend Error: ${data}`);
     });
 
-    setTimeout(() => {
-        console.log('Backend started successfully');
-    }, 3000);
+    pythonProcess.on('exit', (code) => {
+        console.error(`Backend exited with code ${code}`);
+    });
 }
 
 app.on('ready', () => {
@@ -223,7 +276,8 @@ ipcMain.on('print-slip', async (event, data) => {
         });
 
         // Load slip HTML from Flask server
-        await printWindow.loadURL(`http://localhost:5000/print/${slipId}`);
+        await backendReady;
+        await printWindow.loadURL(`${BACKEND_URL}/print/${slipId}`);
 
         // Wait for content to fully render
         await new Promise(resolve => setTimeout(resolve, 1500));
@@ -1,4 +1,8 @@
 -- ============================================================================
+-- SUPERSEDED: these steps are now versioned migrations in
+-- backend/migrations/versions.py and run automatically at startup.
+-- Prefer: python backend/manage.py migrate
+-- ============================================================================
 -- COMPLETE DATABASE SCHEMA MIGRATION SQL
 -- ============================================================================
 -- This SQL file updates the purchase_slips table to the new schema
@@ -7,43 +7,16 @@ Run this AFTER running the migration to verify everything is correct.
 
 import mysql.connector
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Required columns for the new schema
-REQUIRED_COLUMNS = [
-    # Weight System
-    'net_weight_kg',
-    'gunny_weight_kg',
-    'final_weight_kg',
-    'weight_quintal',
-    'weight_khandi',
-
-    # Rate System
-    'rate_basis',
-    'rate_value',
-    'total_purchase_amount',
-
-    # Deductions
-    'postage',
-    'freight',
-    'rate_diff',
-    'quality_diff',
-    'quality_diff_comment',
-    'moisture_ded',
-    'tds',
-
-    # Instalments (just check instalment 1 as example)
-    'instalment_1_date',
-    'instalment_1_amount',
-    'instalment_1_payment_method',
-    'instalment_1_payment_bank_account',
-    'instalment_1_comment',
-
-    # Other
-    'paddy_unloading_godown'
-]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from slip_schema import SLIP_COLUMNS
+
+# Required columns: everything the app reads or writes (backend/slip_schema.py)
+REQUIRED_COLUMNS = [col.name for col in SLIP_COLUMNS if not col.legacy]
 
 def verify_schema():
     print("=" * 70)